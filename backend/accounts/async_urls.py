@@ -0,0 +1,8 @@
+from django.urls import path
+
+from .async_views import AsyncLoginView, AsyncSignUpView
+
+urlpatterns = [
+    path("signup/", AsyncSignUpView.as_view(), name="async-signup"),
+    path("login/", AsyncLoginView.as_view(), name="async-login"),
+]
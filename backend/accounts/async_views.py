@@ -0,0 +1,59 @@
+"""Async versions of the sign-up and login endpoints (see ``core.async_views``)."""
+
+import logging
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import aauthenticate
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.response import Response
+
+from core.async_views import AsyncAPIView
+from core.throttling import LoginRateThrottle
+
+from .serializers import LoginSerializer, SignUpSerializer, UserSerializer
+from .views import login_seconds, signup_seconds, throttle_full_pool
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSignUpView(AsyncAPIView):
+    authentication_required = False
+
+    async def post(self, request):
+        with signup_seconds.time(), throttle_full_pool():
+            # Creating the user runs the default-category signal, so it happens in one thread hop.
+            return Response(await sync_to_async(self.create)(request), status=status.HTTP_201_CREATED)
+
+    def create(self, request):
+        serializer = SignUpSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.save()
+        token, created = Token.objects.get_or_create(user=user)
+        return {"token": token.key, "user": UserSerializer(user).data}
+
+
+class AsyncLoginView(AsyncAPIView):
+    authentication_required = False
+    throttle_classes = [LoginRateThrottle]
+
+    async def post(self, request):
+        with login_seconds.time(), throttle_full_pool():
+            return await self.login(request)
+
+    async def login(self, request):
+        logger.info("Login attempt")
+        serializer = LoginSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        email = serializer.validated_data["email"]
+        password = serializer.validated_data["password"]
+
+        # PooledModelBackend awaits the password hash on the hashing pool, off the event loop.
+        user = await aauthenticate(request._request, username=email, password=password)
+
+        if not user:
+            return Response({"error": "Invalid credentials"}, status=status.HTTP_400_BAD_REQUEST)
+
+        token, created = await Token.objects.aget_or_create(user=user)
+        return Response({"token": token.key, "user": UserSerializer(user).data})
@@ -0,0 +1,144 @@
+"""
+Token authentication with the token lookup cached.
+
+``TokenAuthentication`` joins ``Token`` and ``User`` on every request. Here resolved
+tokens are kept in a bounded in-process LRU, and optionally in a shared Django cache so
+that other workers can skip the query too. Entries expire after ``TTL`` seconds and are
+dropped as soon as the token is deleted or its user changes (logout, password change,
+deactivation); see ``accounts.signals``.
+
+Invalidation reaches the shared cache and the local LRU of the process that handled the
+change. Other processes can keep serving a revoked token from their LRU until it
+expires, so ``TTL`` bounds how long a revocation takes to apply everywhere.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+
+class TokenCache:
+    """LRU of ``token key -> Token`` (with its user), backed by an optional shared cache."""
+
+    key_prefix = "auth:token:"
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return settings.AUTH_TOKEN_CACHE
+
+    @property
+    def shared(self):
+        alias = self.config["SHARED_CACHE"]
+        return caches[alias] if alias else None
+
+    def get(self, key):
+        token = self.get_local(key)
+        if token is not None or self.shared is None:
+            return token
+        token = self.shared.get(self.key_prefix + key)
+        if token is not None:
+            self._store(key, token)
+        return token
+
+    def get_local(self, key):
+        """Look ``key`` up in this process only, without any I/O."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            token, expires = entry
+            if expires <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return token
+
+    def set(self, key, token):
+        self._store(key, token)
+        if self.shared is not None:
+            self.shared.set(self.key_prefix + key, token, self.config["TTL"])
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        if self.shared is not None and keys:
+            self.shared.delete_many([self.key_prefix + key for key in keys])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, key, token):
+        with self._lock:
+            self._entries[key] = (token, time.monotonic() + self.config["TTL"])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.config["MAX_SIZE"]:
+                self._entries.popitem(last=False)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """``TokenAuthentication`` that only queries the database on a cache miss."""
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, token)
+        return self.copy_credentials(token)
+
+    async def aauthenticate(self, request):
+        """
+        Async ``authenticate()`` for ``core.async_views``: a token found in this process is
+        returned without leaving the event loop; anything else is looked up in a thread.
+        """
+        key = self.get_key(request)
+        if key is None:
+            return None
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        token = token_cache.get_local(key)
+        if token is None:
+            return await sync_to_async(self.authenticate_credentials)(key)
+        return self.copy_credentials(token)
+
+    def get_key(self, request):
+        # Mirrors the header parsing of TokenAuthentication.authenticate().
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed(_("Invalid token header. No credentials provided."))
+        if len(auth) > 2:
+            raise exceptions.AuthenticationFailed(_("Invalid token header. Token string should not contain spaces."))
+        try:
+            return auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                _("Invalid token header. Token string should not contain invalid characters.")
+            ) from None
+
+    @staticmethod
+    def copy_credentials(token):
+        # Requests get their own copies, so changes a view makes to request.user
+        # (or request.auth) don't leak into the cache.
+        token = copy.copy(token)
+        token.user = copy.copy(token.user)
+        return token.user, token
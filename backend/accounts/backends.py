@@ -0,0 +1,28 @@
+"""Authentication backends."""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password
+
+from . import hashing
+
+UserModel = get_user_model()
+
+
+class PooledModelBackend(ModelBackend):
+    """``ModelBackend`` whose async path awaits password hashing on the pool (see ``accounts.hashing``)."""
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway, like ModelBackend, so unknown emails take as long to reject.
+            await hashing.arun(make_password, password)
+            return None
+        if await hashing.acheck_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
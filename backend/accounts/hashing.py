@@ -0,0 +1,105 @@
+"""
+Password hashing on a bounded pool.
+
+With Django's default iteration count a PBKDF2 hash costs tens of milliseconds of CPU,
+spent on every login and sign-up (and for unknown emails too, to keep timing even).
+``PooledPBKDF2PasswordHasher`` runs it on a dedicated thread pool of
+``AUTH_HASHING["WORKERS"]`` threads instead of inline, so a burst of logins can't take
+more than that many cores away from note traffic. ``hashlib`` releases the GIL while
+hashing, so the threads run in parallel.
+
+The hasher's interface is synchronous, so its caller still waits for the hash: the pool
+caps how many hashes run at once, it doesn't free the calling thread. Async code awaits
+the pool instead, through ``arun()`` and ``acheck_password()``; the async login does so
+through ``accounts.backends.PooledModelBackend``.
+
+At most ``AUTH_HASHING["QUEUE_SIZE"]`` hashes wait for a free thread. Beyond that the
+hash fails at once with ``HashingPoolFull``, which the login and sign-up endpoints answer
+with 429 and a ``Retry-After`` header instead of queueing the request behind the burst.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, verify_password
+
+from core import metrics
+
+hash_seconds = metrics.histogram("auth_password_hash_seconds", "Time to hash a password, including the queue wait")
+rejected = metrics.counter("auth_password_hash_rejected_total", "Password hashes rejected with a full pool")
+
+
+class HashingPoolFull(Exception):
+    """Raised by password hashing when the pool has no room for another hash."""
+
+
+# Set on the pool's threads, where hashers run inline.
+_worker = threading.local()
+
+
+class HashingPool:
+    """A thread pool that rejects work instead of queueing more than ``queue_size`` items."""
+
+    def __init__(self, workers, queue_size):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hashing")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            rejected.inc()
+            raise HashingPoolFull()
+        try:
+            return self._executor.submit(self._call, fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _call(self, fn, *args):
+        _worker.active = True
+        try:
+            return fn(*args)
+        finally:
+            self._slots.release()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HashingPool(settings.AUTH_HASHING["WORKERS"], settings.AUTH_HASHING["QUEUE_SIZE"])
+        return _pool
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """``PBKDF2PasswordHasher`` (same algorithm and hash format) running on the hashing pool."""
+
+    def encode(self, password, salt, iterations=None):
+        if getattr(_worker, "active", False):
+            return super().encode(password, salt, iterations)
+        future = get_pool().submit(super().encode, password, salt, iterations)
+        with hash_seconds.time():
+            return future.result()
+
+
+async def arun(fn, *args):
+    """Run ``fn`` (hashing code) on the pool and await it without blocking the event loop."""
+    future = get_pool().submit(fn, *args)
+    with hash_seconds.time():
+        return await asyncio.wrap_future(future)
+
+
+async def acheck_password(user, raw_password):
+    """``user.acheck_password()``, with the hashing awaited on the pool."""
+    is_correct, must_update = await arun(verify_password, raw_password, user.password)
+    if is_correct and must_update:
+        await arun(user.set_password, raw_password)
+        # Password hash upgrades shouldn't be considered password changes.
+        user._password = None
+        await user.asave(update_fields=["password"])
+    return is_correct
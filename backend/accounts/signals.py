@@ -0,0 +1,27 @@
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_tokens(sender, instance, created=False, **kwargs):
+    # Any change to the user (password, is_active, ...) may revoke access, and the cached
+    # token carries a copy of the user row.
+    if not created:
+        token_cache.invalidate(*Token.objects.filter(user_id=instance.pk).values_list("key", flat=True))
+
+
+@receiver(user_logged_out)
+def invalidate_logged_out_user(sender, request, user, **kwargs):
+    if user is not None:
+        token_cache.invalidate(*Token.objects.filter(user_id=user.pk).values_list("key", flat=True))
@@ -1,7 +1,24 @@
+import asyncio
+import threading
+from contextlib import contextmanager
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_out
+from django.db import connection
+from django.test import AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import APIException
 from rest_framework.test import APITestCase
 
+from . import hashing
+from .authentication import token_cache
+from .views import login_seconds
+
 
 class SignUpTestCase(APITestCase):
     """Tests for user registration endpoint."""
@@ -60,3 +77,288 @@ class LoginTestCase(APITestCase):
             "/api/auth/login/", {"email": "doesnotexist@example.com", "password": "anypassword"}
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class LoginThrottlingTestCase(APITestCase):
+    """Tests for the login attempt rate limit."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="login@example.com", email="login@example.com", password="testpassword123"
+        )
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {"login": "2/min"}})
+    def test_login_attempts_are_limited_per_address(self):
+        for password in ("wrong", "wrong"):
+            response = self.client.post("/api/auth/login/", {"email": "login@example.com", "password": password})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post("/api/auth/login/", {"email": "login@example.com", "password": "testpassword123"})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn(int(response["Retry-After"]), range(1, 31))
+
+        response = self.client.post(
+            "/api/auth/login/",
+            {"email": "login@example.com", "password": "testpassword123"},
+            REMOTE_ADDR="10.0.0.2",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {"login": "1/min"}})
+    async def test_async_login_is_limited(self):
+        data = {"email": "login@example.com", "password": "testpassword123"}
+        response = await AsyncClient().post("/api/async/auth/login/", data, content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = await AsyncClient().post("/api/async/auth/login/", data, content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn(int(response["Retry-After"]), range(1, 61))
+
+    @override_settings(
+        REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {"login": "2/min"}, "NUM_PROXIES": 1}
+    )
+    def test_forwarded_for_does_not_bypass_the_limit(self):
+        """Only the address added by the trusted proxy counts, not those sent by the client."""
+        data = {"email": "login@example.com", "password": "wrong"}
+        for spoofed in ("10.0.0.1", "10.0.0.2"):
+            response = self.client.post("/api/auth/login/", data, HTTP_X_FORWARDED_FOR=f"{spoofed}, 203.0.113.7")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post("/api/auth/login/", data, HTTP_X_FORWARDED_FOR="10.0.0.3, 203.0.113.7")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        response = self.client.post("/api/auth/login/", data, HTTP_X_FORWARDED_FOR="10.0.0.3, 203.0.113.8")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CachedTokenAuthenticationTestCase(APITestCase):
+    """Tests for the token lookup cache."""
+
+    url = "/api/categories/"
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(
+            username="cached@example.com", email="cached@example.com", password="testpassword123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def tearDown(self):
+        token_cache.clear()
+
+    @contextmanager
+    def assertTokenLookups(self, count):
+        with CaptureQueriesContext(connection) as context:
+            yield
+        lookups = [query for query in context.captured_queries if '"authtoken_token"' in query["sql"]]
+        self.assertEqual(len(lookups), count)
+
+    def test_token_lookup_is_cached(self):
+        """Only the first request with a token queries it."""
+        with self.assertTokenLookups(1):
+            self.client.get(self.url)
+        with self.assertTokenLookups(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get(self.url)
+        self.token.delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_change_invalidates(self):
+        """Password changes and deactivation apply immediately."""
+        self.client.get(self.url)
+        self.user.set_password("newpassword123")
+        self.user.save()
+        with self.assertTokenLookups(1):
+            self.client.get(self.url)
+
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_invalidates(self):
+        self.client.get(self.url)
+        user_logged_out.send(sender=User, request=None, user=self.user)
+        with self.assertTokenLookups(1):
+            self.client.get(self.url)
+
+    @override_settings(AUTH_TOKEN_CACHE={"MAX_SIZE": 1, "TTL": 60, "SHARED_CACHE": None})
+    def test_cache_is_bounded(self):
+        other = User.objects.create_user(username="other@example.com", password="testpassword123")
+        other_token = Token.objects.create(user=other)
+        self.client.get(self.url)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {other_token.key}")
+        self.client.get(self.url)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        with self.assertTokenLookups(1):  # the first token was evicted
+            self.client.get(self.url)
+
+    @override_settings(AUTH_TOKEN_CACHE={"MAX_SIZE": 100, "TTL": 0, "SHARED_CACHE": None})
+    def test_entries_expire(self):
+        self.client.get(self.url)
+        with self.assertTokenLookups(1):
+            self.client.get(self.url)
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "tokens": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tokens"},
+        },
+        AUTH_TOKEN_CACHE={"MAX_SIZE": 100, "TTL": 60, "SHARED_CACHE": "tokens"},
+    )
+    def test_shared_cache(self):
+        """Tokens resolved by another process are found in the shared cache."""
+        self.client.get(self.url)
+        token_cache.clear()  # as if this were another process
+        with self.assertTokenLookups(0):
+            self.client.get(self.url)
+
+        self.token.delete()
+        token_cache.clear()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AsyncAuthViewsTestCase(APITestCase):
+    """Tests for the async sign-up and login endpoints."""
+
+    async def test_signup(self):
+        response = await AsyncClient().post(
+            "/api/async/auth/signup/",
+            {"email": "async@example.com", "password": "securepassword123"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn("token", response.json())
+        self.assertTrue(await User.objects.filter(email="async@example.com").aexists())
+
+    async def test_signup_invalid(self):
+        response = await AsyncClient().post(
+            "/api/async/auth/signup/", {"email": "invalid-email"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("password", response.json())
+
+    async def test_login(self):
+        user = await User.objects.acreate_user(
+            username="login@example.com", email="login@example.com", password="testpassword123"
+        )
+        response = await AsyncClient().post(
+            "/api/async/auth/login/",
+            {"email": "login@example.com", "password": "testpassword123"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["token"], (await Token.objects.aget(user=user)).key)
+
+        response = await AsyncClient().post(
+            "/api/async/auth/login/",
+            {"email": "login@example.com", "password": "wrong"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"error": "Invalid credentials"})
+
+
+class HashingPoolTestCase(APITestCase):
+    """Tests for password hashing on the bounded pool."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="pool@example.com", email="pool@example.com", password="testpassword123"
+        )
+        self.pool = hashing.HashingPool(workers=1, queue_size=0)
+        self.enterContext(mock.patch.object(hashing, "_pool", self.pool))
+
+    def login(self):
+        return self.client.post("/api/auth/login/", {"email": "pool@example.com", "password": "testpassword123"})
+
+    def test_hashes_with_pbkdf2(self):
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+    def test_full_pool_returns_429(self):
+        release = threading.Event()
+        blocker = self.pool.submit(release.wait)
+        try:
+            response = self.login()
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertEqual(response["Retry-After"], "1")
+
+            response = self.client.post(
+                "/api/auth/signup/", {"email": "new@example.com", "password": "securepassword123"}
+            )
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertFalse(User.objects.filter(email="new@example.com").exists())
+        finally:
+            release.set()
+        blocker.result()
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+    async def test_full_pool_returns_429_from_async_views(self):
+        release = threading.Event()
+        blocker = self.pool.submit(release.wait)
+        try:
+            for url, email in (("/api/async/auth/login/", "pool@example.com"), ("/api/async/auth/signup/", "new@x.io")):
+                response = await AsyncClient().post(
+                    url, {"email": email, "password": "testpassword123"}, content_type="application/json"
+                )
+                self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+                self.assertEqual(response["Retry-After"], "1")
+        finally:
+            release.set()
+        await asyncio.wrap_future(blocker)
+
+    def test_full_pool_outside_the_api(self):
+        """Outside DRF (admin login, management commands) a full pool isn't an API error."""
+        release = threading.Event()
+        blocker = self.pool.submit(release.wait)
+        try:
+            with self.assertRaises(hashing.HashingPoolFull) as raised:
+                make_password("password")
+            self.assertNotIsInstance(raised.exception, APIException)
+        finally:
+            release.set()
+        blocker.result()
+
+    async def test_async_login_awaits_the_pool(self):
+        """While the hash waits for a free thread, the event loop keeps running."""
+        pool = hashing.HashingPool(workers=1, queue_size=1)
+        release = threading.Event()
+        blocker = pool.submit(release.wait)
+        # Unblocks the pool even if the loop were stuck, so a failure can't hang the test.
+        timer = threading.Timer(5, release.set)
+        timer.start()
+        self.addCleanup(timer.cancel)
+        submitted = threading.Event()
+        submit = pool.submit
+
+        def submit_hash(fn, *args):
+            submitted.set()
+            return submit(fn, *args)
+
+        with mock.patch.object(hashing, "_pool", pool), mock.patch.object(pool, "submit", submit_hash):
+            login = asyncio.ensure_future(
+                AsyncClient().post(
+                    "/api/async/auth/login/",
+                    {"email": "pool@example.com", "password": "testpassword123"},
+                    content_type="application/json",
+                )
+            )
+            while not submitted.is_set():
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+            self.assertFalse(login.done())
+            release.set()
+            response = await asyncio.wait_for(login, 5)
+        blocker.result()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_login_latency_is_recorded(self):
+        count = login_seconds.value["count"]
+        self.login()
+        self.assertEqual(login_seconds.value["count"], count + 1)
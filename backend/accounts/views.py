@@ -1,16 +1,39 @@
 import logging
+from contextlib import contextmanager
 
 from django.contrib.auth import authenticate
 from drf_spectacular.utils import OpenApiResponse, extend_schema
-from rest_framework import generics, status
+from rest_framework import exceptions, generics, status
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from core import metrics
+from core.throttling import LoginRateThrottle
+
+from .hashing import HashingPoolFull
 from .serializers import LoginSerializer, SignUpSerializer, UserSerializer
 
 logger = logging.getLogger(__name__)
 
+# Auth endpoints are timed on their own: they're dominated by password hashing.
+signup_seconds = metrics.histogram("auth_signup_seconds", "Sign-up request latency")
+login_seconds = metrics.histogram("auth_login_seconds", "Login request latency")
+
+
+class HashingPoolThrottled(exceptions.Throttled):
+    default_detail = "Too many sign-in requests are being processed. Try again shortly."
+    default_code = "hashing_pool_full"
+
+
+@contextmanager
+def throttle_full_pool():
+    """Answer a full password hashing pool (``accounts.hashing``) with 429."""
+    try:
+        yield
+    except HashingPoolFull:
+        raise HashingPoolThrottled(wait=1) from None
+
 
 class SignUpView(generics.CreateAPIView):
     """
@@ -31,7 +54,8 @@ class SignUpView(generics.CreateAPIView):
         },
     )
     def post(self, request, *args, **kwargs):
-        return super().post(request, *args, **kwargs)
+        with signup_seconds.time(), throttle_full_pool():
+            return super().post(request, *args, **kwargs)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -49,6 +73,7 @@ class LoginView(APIView):
     """
 
     permission_classes = []
+    throttle_classes = [LoginRateThrottle]
     serializer_class = LoginSerializer
 
     @extend_schema(
@@ -58,9 +83,14 @@ class LoginView(APIView):
         responses={
             200: OpenApiResponse(description="Login successful, returns token"),
             400: OpenApiResponse(description="Invalid credentials"),
+            429: OpenApiResponse(description="Too many login attempts from this address"),
         },
     )
     def post(self, request, *args, **kwargs):
+        with login_seconds.time(), throttle_full_pool():
+            return self.login(request)
+
+    def login(self, request):
         logger.info("Login attempt")
         serializer = LoginSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -0,0 +1,6 @@
+"""
+Standalone benchmark scripts for the backend.
+
+Each module is run with ``python -m benchmarks.<name>`` from the ``backend`` directory.
+They create a throwaway test database, so they never touch development data.
+"""
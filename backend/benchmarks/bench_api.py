@@ -0,0 +1,274 @@
+"""
+API endpoint benchmark.
+
+Seeds users with several categories and notes of realistic lengths (``manage.py
+seed_notes``), then drives the note list, search, category list, autosave, login and
+sign-up endpoints through Django's test client, in process, and reports requests per
+second, latency percentiles and queries per request::
+
+    uv run python -m benchmarks.bench_api --users 100 --notes 100000 --save before.json
+    uv run python -m benchmarks.bench_api --users 100 --notes 100000 --baseline before.json
+
+Runs on SQLite or PostgreSQL (set DATABASE_URL) and needs no network. Runs with the same
+options and seed send the same requests, so ``--baseline`` shows how a change moved them.
+
+List endpoints are cached per user (``notes.caching``), so they are measured twice: the
+plain scenarios replace the user's cache stamp before every request and so always build
+the page from the database, the ``-cached`` ones are answered from the page cache.
+"""
+
+import argparse
+import io
+import json
+import random
+import time
+from functools import partial
+
+from benchmarks.common import benchmark_database, print_table, setup, summarize
+
+PASSWORD = "bench-password"
+
+
+def seed_dataset(users, categories, notes, seed=0):
+    """Seed with ``manage.py seed_notes`` and give every user a token."""
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from rest_framework.authtoken.models import Token
+
+    call_command(
+        "seed_notes",
+        notes,
+        users=users,
+        categories=categories,
+        seed=seed,
+        email="bench-{n}@example.com",
+        password=PASSWORD,
+        stdout=io.StringIO(),
+    )
+    users = User.objects.filter(username__startswith="bench-")
+    Token.objects.bulk_create(Token(user=user, key=Token.generate_key()) for user in users)
+
+
+class QueryCounter:
+    """Execute wrapper counting the queries of the requests it wraps."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Scenario:
+    """Sends one kind of request, ``run()`` times, and collects latencies and query counts."""
+
+    def __init__(self, name, client, rng, accounts, notes):
+        from notes.seeding import VOCABULARY
+
+        self.words = VOCABULARY
+        self.name = name
+        self.client = client
+        self.rng = rng
+        self.accounts = accounts
+        self.notes = notes
+
+    def run(self, requests, connection):
+        counter = QueryCounter()
+        samples, errors = [], 0
+        with connection.execute_wrapper(counter):
+            for _ in range(requests):
+                self.prepare()
+                start = time.perf_counter()
+                response = self.request()
+                samples.append((time.perf_counter() - start) * 1000)
+                errors += response.status_code >= 400
+        return {
+            "endpoint": self.name,
+            "requests": requests,
+            "errors": errors,
+            "req/s": requests / (sum(samples) / 1000),
+            **summarize(samples),
+            "queries": counter.count / requests,
+        }
+
+    def prepare(self):
+        """Untimed setup before each request."""
+
+    def headers(self, user_id):
+        return {"Authorization": f"Token {self.accounts[user_id]['token']}"}
+
+
+class ListScenario(Scenario):
+    """A cached list, read by a random user: from the database, or from the cache if ``cached``."""
+
+    def __init__(self, *args, cached=False):
+        super().__init__(*args)
+        self.cached = cached
+
+    def prepare(self):
+        from notes.caching import bump
+
+        self.user_id = self.rng.choice(list(self.accounts))
+        if not self.cached:
+            bump(self.user_id)
+
+
+class ListNotes(ListScenario):
+    def request(self):
+        return self.client.get("/api/notes/", headers=self.headers(self.user_id))
+
+
+class ListCards(ListScenario):
+    def request(self):
+        return self.client.get("/api/notes/", {"fields": "card"}, headers=self.headers(self.user_id))
+
+
+class SearchNotes(ListScenario):
+    def request(self):
+        return self.client.get(
+            "/api/notes/", {"search": self.rng.choice(self.words)}, headers=self.headers(self.user_id)
+        )
+
+
+class ListCategories(ListScenario):
+    def request(self):
+        return self.client.get("/api/categories/", headers=self.headers(self.user_id))
+
+
+class Autosave(Scenario):
+    def request(self):
+        note = self.rng.choice(self.notes)
+        response = self.client.patch(
+            f"/api/notes/{note['id']}/",
+            {"body": " ".join(self.rng.choices(self.words, k=60))},
+            content_type="application/json",
+            headers={**self.headers(note["user_id"]), "If-Match": f'"{note["version"]}"'},
+        )
+        if response.status_code == 200:
+            note["version"] = response.json()["version"]
+        return response
+
+
+class Login(Scenario):
+    def request(self):
+        user_id = self.rng.choice(list(self.accounts))
+        return self.client.post(
+            "/api/auth/login/",
+            {"email": self.accounts[user_id]["email"], "password": PASSWORD},
+            content_type="application/json",
+        )
+
+
+class SignUp(Scenario):
+    def __init__(self, *args):
+        from django.contrib.auth.models import User
+
+        super().__init__(*args)
+        # Accounts from earlier runs stay with --keepdb.
+        self.signups = User.objects.filter(username__startswith="signup-").count()
+
+    def request(self):
+        self.signups += 1
+        return self.client.post(
+            "/api/auth/signup/",
+            {"email": f"signup-{self.signups}@example.com", "password": PASSWORD},
+            content_type="application/json",
+        )
+
+
+SCENARIOS = {
+    "notes": ListNotes,
+    "notes-cached": partial(ListNotes, cached=True),
+    "cards": ListCards,
+    "cards-cached": partial(ListCards, cached=True),
+    "search": SearchNotes,
+    "categories": ListCategories,
+    "categories-cached": partial(ListCategories, cached=True),
+    "autosave": Autosave,
+    "login": Login,
+    "signup": SignUp,
+}
+# Password hashing makes these two orders of magnitude slower than the rest.
+AUTH_SCENARIOS = {"login", "signup"}
+
+
+def compare(rows, baseline):
+    """Add the change of p50 and queries per request against a saved run."""
+    before = {row["endpoint"]: row for row in baseline}
+    for row in rows:
+        previous = before.get(row["endpoint"])
+        if previous:
+            row["p50 vs base"] = f"{(row['p50'] / previous['p50'] - 1) * 100:+.0f}%"
+            row["queries vs base"] = f"{row['queries'] - previous['queries']:+.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=50, help="number of users to seed")
+    parser.add_argument("--categories", type=int, default=5, help="categories per user")
+    parser.add_argument("--notes", type=int, default=20_000, help="number of notes to seed")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per endpoint")
+    parser.add_argument("--auth-requests", type=int, default=20, help="timed login and sign-up requests")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per endpoint")
+    parser.add_argument(
+        "--endpoints", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS), help="endpoints to drive"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the data and of the requests")
+    parser.add_argument("--save", metavar="PATH", help="write the results to a JSON file")
+    parser.add_argument("--baseline", metavar="PATH", help="compare with results saved by --save")
+    parser.add_argument("--keepdb", action="store_true", help="reuse the benchmark database between runs")
+    args = parser.parse_args()
+
+    setup()
+
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from django.test.utils import override_settings
+
+    from notes.models import Note
+
+    # Measure the endpoints, not the rate limits or the slow request log. Requests are
+    # served by this one process, so list caching is on even with a local-memory cache.
+    overrides = override_settings(
+        REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {}},
+        PERFORMANCE={**settings.PERFORMANCE, "LATENCY_BUDGET": float("inf"), "QUERY_BUDGET": float("inf")},
+        NOTES_CACHE={**settings.NOTES_CACHE, "ENABLED": True},
+    )
+    with overrides, benchmark_database(keepdb=args.keepdb) as connection:
+        if not Note.objects.exists():
+            print(f"Seeding {args.notes} notes for {args.users} users with {args.categories} categories each...")
+            seed_dataset(args.users, args.categories, args.notes, seed=args.seed)
+        accounts = {
+            user.id: {"email": user.email, "token": user.auth_token.key}
+            for user in User.objects.filter(username__startswith="bench-").select_related("auth_token")
+        }
+        notes = list(Note.objects.filter(user__in=accounts).order_by("id").values("id", "user_id", "version")[:10_000])
+
+        client = Client()
+        rows = []
+        for name in args.endpoints:
+            requests = args.auth_requests if name in AUTH_SCENARIOS else args.requests
+            warmup = min(args.warmup, requests)
+            scenario = SCENARIOS[name](name, client, random.Random(args.seed), accounts, notes)
+            scenario.run(warmup, connection)
+            rows.append(scenario.run(requests, connection))
+
+        vendor, total = connection.vendor, Note.objects.count()
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"options": vars(args), "vendor": vendor, "results": rows}, f, indent=2)
+    columns = ["endpoint", "requests", "errors", "req/s", "mean", "p50", "p95", "p99", "queries"]
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(rows, json.load(f)["results"])
+        columns += ["p50 vs base", "queries vs base"]
+
+    print(f"\n{total} notes on {vendor}, one request at a time, latency in ms\n")
+    print_table(rows, columns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Async views load benchmark.
+
+Starts the ASGI app under gunicorn with uvicorn workers, as in production, and drives
+the sync endpoints (``/api/...``) and their async versions (``/api/async/...``) with the
+same concurrent keep-alive load, reporting requests per second and latency::
+
+    uv run python -m benchmarks.bench_async --workers 4 --concurrency 64 --duration 10
+
+The server needs a database it can reach from another process, so this benchmark only
+runs on PostgreSQL.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.common import benchmark_database, print_table, seed, setup, summarize
+
+ENDPOINTS = {
+    "notes": "notes/",
+    "note": "notes/{note}/",
+    "categories": "categories/",
+}
+
+
+def database_url(settings_dict):
+    return "postgres://{USER}:{PASSWORD}@{HOST}:{PORT}/{NAME}".format(
+        **{key: settings_dict[key] or "" for key in ("USER", "PASSWORD", "HOST", "PORT", "NAME")}
+    )
+
+
+def start_server(url, port, workers):
+    env = {
+        **os.environ,
+        "DATABASE_URL": url,
+        "ALLOWED_HOSTS": "127.0.0.1",
+        "DEBUG": "False",
+        # As in the production image; gunicorn.conf.py starts the relay.
+        "NOTES_EVENTS_BACKEND": "notes.events.RelayBroker",
+    }
+    command = [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        "core.asgi:application",
+        "--bind",
+        f"127.0.0.1:{port}",
+        "--workers",
+        str(workers),
+        "--worker-class",
+        "uvicorn.workers.UvicornWorker",
+        "--log-level",
+        "warning",
+    ]
+    server = subprocess.Popen(command, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("gunicorn did not start")
+
+
+async def request(reader, writer, path, token):
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Token {token}\r\n\r\n".encode())
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(port, paths, deadline, samples, errors):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < deadline:
+            path, token = random.choice(paths)
+            start = time.perf_counter()
+            status = await request(reader, writer, path, token)
+            samples.append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def load(port, paths, concurrency, duration):
+    """Run ``concurrency`` keep-alive clients for ``duration`` seconds."""
+    samples, errors = [], []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(client(port, paths, deadline, samples, errors) for _ in range(concurrency)))
+    return samples, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--notes", type=int, default=100_000, help="number of notes to seed")
+    parser.add_argument("--users", type=int, default=100, help="number of users owning the notes")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn worker processes")
+    parser.add_argument("--concurrency", type=int, default=64, help="concurrent connections")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load per endpoint")
+    parser.add_argument("--port", type=int, default=8765, help="port to run the server on")
+    parser.add_argument("--keepdb", action="store_true", help="reuse the benchmark database between runs")
+    args = parser.parse_args()
+
+    setup()
+
+    from django.contrib.auth.models import User
+    from rest_framework.authtoken.models import Token
+
+    from notes.models import Note
+
+    with benchmark_database(keepdb=args.keepdb) as connection:
+        if connection.vendor != "postgresql":
+            parser.error("this benchmark needs PostgreSQL (set DATABASE_URL)")
+        if not Note.objects.exists():
+            print(f"Seeding {args.notes} notes for {args.users} user(s)...")
+            seed(args.users, args.notes)
+        users = list(User.objects.filter(username__startswith="bench-"))
+        tokens = {user.id: Token.objects.get_or_create(user=user)[0].key for user in users}
+        notes = list(Note.objects.filter(user__in=users).values_list("id", "user_id")[:10_000])
+
+        server = start_server(database_url(connection.settings_dict), args.port, args.workers)
+        try:
+            rows = []
+            for endpoint, template in ENDPOINTS.items():
+                for prefix in ("/api/", "/api/async/"):
+                    if "{note}" in template:
+                        paths = [(prefix + template.format(note=note), tokens[user]) for note, user in notes]
+                    else:
+                        paths = [(prefix + template, token) for token in tokens.values()]
+                    # Warm up connections, token caches and cached pages.
+                    asyncio.run(load(args.port, paths, args.concurrency, 1))
+                    samples, errors = asyncio.run(load(args.port, paths, args.concurrency, args.duration))
+                    rows.append(
+                        {
+                            "endpoint": endpoint,
+                            "views": "async" if "async" in prefix else "sync",
+                            "requests": len(samples),
+                            "errors": len(errors),
+                            "req/s": len(samples) / args.duration,
+                            **summarize(samples),
+                        }
+                    )
+        finally:
+            server.terminate()
+            server.wait()
+
+        print(
+            f"\n{Note.objects.count()} notes on {connection.vendor}, {args.workers} workers, "
+            f"{args.concurrency} connections, latency in ms\n"
+        )
+        print_table(rows, ["endpoint", "views", "requests", "errors", "req/s", "p50", "p95", "p99"])
+
+
+if __name__ == "__main__":
+    main()
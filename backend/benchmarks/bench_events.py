@@ -0,0 +1,112 @@
+"""
+Push channel benchmark.
+
+Opens many idle event subscriptions in one process, as a worker holding that many
+streams would, and reports their memory cost. Then publishes events to one user with
+several open streams (devices) and times the fan-out until every stream has the event,
+for the in-memory broker and the relay broker::
+
+    uv run python -m benchmarks.bench_events --connections 10000 --devices 10
+
+Only the broker side is measured: sockets and the ASGI server add their own per
+connection overhead on top.
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+import tracemalloc
+
+from benchmarks.common import print_table, setup, summarize
+
+
+def start_relay():
+    from notes.events import run_relay
+
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    servers = []
+
+    def on_start(server):
+        servers.append(server)
+        started.set()
+
+    threading.Thread(target=lambda: loop.run_until_complete(run_relay("127.0.0.1", 0, on_start)), daemon=True).start()
+    started.wait(5)
+    return servers[0].sockets[0].getsockname()[1]
+
+
+async def idle(broker, connections, users):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    subscriptions = [broker.subscribe(i % users) for i in range(connections)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    for subscription in subscriptions:
+        subscription.close()
+    return size / connections
+
+
+async def fan_out(broker, devices, rounds):
+    subscriptions = [broker.subscribe(0) for _ in range(devices)]
+    event = {"type": "note.saved", "id": 1, "version": 1}
+    samples = []
+    for _ in range(rounds):
+        waiters = [asyncio.ensure_future(subscription.get()) for subscription in subscriptions]
+        start = time.perf_counter()
+        # Writes publish from the request thread, as the sync views do.
+        await asyncio.to_thread(broker.publish, 0, event)
+        await asyncio.gather(*waiters)
+        samples.append((time.perf_counter() - start) * 1000)
+    for subscription in subscriptions:
+        subscription.close()
+    return samples
+
+
+async def run(args):
+    from django.conf import settings
+    from django.test.utils import override_settings
+
+    from notes.events import InMemoryBroker, RelayBroker
+
+    port = start_relay()
+    with override_settings(NOTES_EVENTS={**settings.NOTES_EVENTS, "QUEUE_SIZE": 1000, "RELAY": f"127.0.0.1:{port}"}):
+        relay = RelayBroker()
+        relay.start()
+        await asyncio.to_thread(relay._connected.wait, 5)
+        brokers = {"memory": InMemoryBroker(), "relay": relay}
+
+        rows = []
+        for name, broker in brokers.items():
+            per_connection = await idle(broker, args.connections, args.users)
+            samples = await fan_out(broker, args.devices, args.rounds)
+            rows.append(
+                {
+                    "broker": name,
+                    "bytes/conn": per_connection,
+                    "devices": args.devices,
+                    **summarize(samples),
+                }
+            )
+        relay.close()
+
+    print(f"\n{args.connections} idle subscriptions over {args.users} users, fan-out latency in ms\n")
+    print_table(rows, ["broker", "bytes/conn", "devices", "mean", "p50", "p95", "p99"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connections", type=int, default=10_000, help="idle subscriptions to open")
+    parser.add_argument("--users", type=int, default=1_000, help="users the idle subscriptions belong to")
+    parser.add_argument("--devices", type=int, default=10, help="open streams of the user receiving events")
+    parser.add_argument("--rounds", type=int, default=200, help="events published per broker")
+    args = parser.parse_args()
+
+    setup()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Response encoding benchmark.
+
+Times serializing and rendering a note list of 100, 1,000 and 10,000 notes with DRF's
+``JSONRenderer`` and ``FastJSONRenderer``, for full notes and for cards (``?fields=card``),
+and reports the bytes on the wire uncompressed, gzipped and (when ``brotli`` is
+installed) brotli-compressed::
+
+    uv run python -m benchmarks.bench_render
+
+Notes are built in memory, so no database is needed.
+"""
+
+import argparse
+import gzip
+import random
+from datetime import UTC, datetime, timedelta
+
+from benchmarks.common import WORDS, measure, print_table, setup, summarize
+
+
+def build_notes(count, seed=0):
+    from django.conf import settings
+    from django.contrib.auth.models import User
+
+    from notes.models import Category, Note
+
+    rng = random.Random(seed)
+    user = User(id=1, username="bench@example.com")
+    categories = [Category(id=i, name=name, color="#FFCCB6", user=user) for i, name in enumerate(WORDS[:5], 1)]
+    now = datetime.now(UTC)
+    notes = []
+    for i in range(count):
+        body = " ".join(rng.choices(WORDS, k=20 + i % 200))
+        note = Note(
+            id=i + 1,
+            title=f"{rng.choice(WORDS).title()} {rng.choice(WORDS)}",
+            body=body,
+            category=categories[i % len(categories)],
+            user=user,
+            version=1,
+            created_at=now - timedelta(seconds=i),
+            updated_at=now - timedelta(seconds=i),
+        )
+        note.snippet = body[: settings.NOTES_CARDS["SNIPPET_LENGTH"] + 1]
+        notes.append(note)
+    return notes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000], help="notes per payload")
+    parser.add_argument("--repeat", type=int, default=10, help="timed runs per case")
+    args = parser.parse_args()
+
+    setup()
+
+    from django.conf import settings
+    from rest_framework.renderers import JSONRenderer
+
+    from core.middleware import brotli
+    from core.renderers import FastJSONRenderer, orjson
+    from notes.serializers import NoteCardSerializer, NoteSerializer
+
+    renderers = {"json": JSONRenderer()}
+    if orjson is not None:
+        renderers["orjson"] = FastJSONRenderer()
+
+    rows = []
+    for size in args.sizes:
+        notes = build_notes(size)
+        for representation, serializer_class in (("full", NoteSerializer), ("card", NoteCardSerializer)):
+            for name, renderer in renderers.items():
+
+                def encode(notes=notes, serializer_class=serializer_class, renderer=renderer):
+                    return renderer.render(serializer_class(notes, many=True).data)
+
+                content = encode()
+                rows.append(
+                    {
+                        "notes": size,
+                        "fields": representation,
+                        "renderer": name,
+                        **summarize(measure(encode, args.repeat)),
+                        "bytes": len(content),
+                        "gzip": len(gzip.compress(content, compresslevel=6)),
+                        "br": (
+                            len(brotli.compress(content, quality=settings.COMPRESSION["BROTLI_QUALITY"]))
+                            if brotli is not None
+                            else None
+                        ),
+                    }
+                )
+
+    print("\nSerialize + render time in ms, response size in bytes\n")
+    print_table(rows, ["notes", "fields", "renderer", "mean", "p50", "p99", "bytes", "gzip", "br"])
+
+
+if __name__ == "__main__":
+    main()
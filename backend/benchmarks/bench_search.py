@@ -0,0 +1,70 @@
+"""
+Search latency benchmark.
+
+Compares the original ``SearchFilter`` (ILIKE) path with the ``fulltext`` and
+``trigram`` modes of ``NoteSearchFilter``, timing the first page of results for a
+set of whole-word, partial-word and misspelled queries::
+
+    uv run python -m benchmarks.bench_search --notes 1000000
+
+On databases other than PostgreSQL only the ILIKE path is measured.
+"""
+
+import argparse
+
+from benchmarks.common import benchmark_database, measure, print_table, seed, setup, summarize
+
+QUERIES = ["roadmap", "kubern", "migraton", "sprint backlog"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--notes", type=int, default=100_000, help="number of notes to seed")
+    parser.add_argument("--users", type=int, default=1, help="number of users owning the notes")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per query")
+    parser.add_argument("--keepdb", action="store_true", help="reuse the benchmark database between runs")
+    args = parser.parse_args()
+
+    setup()
+
+    from django.contrib.auth.models import User
+    from rest_framework.filters import SearchFilter
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from notes.filters import NoteSearchFilter
+    from notes.models import Note
+    from notes.pagination import KeysetPagination
+    from notes.views import NoteListCreateView
+
+    with benchmark_database(keepdb=args.keepdb) as connection:
+        if not Note.objects.exists():
+            print(f"Seeding {args.notes} notes for {args.users} user(s)...")
+            seed(args.users, args.notes)
+        user = User.objects.order_by("id").first()
+        base = Note.objects.filter(user=user).select_related("category").order_by("-updated_at", "-id")
+        factory = APIRequestFactory()
+
+        backends = {"ilike": SearchFilter}
+        if connection.vendor == "postgresql":
+            backends.update(fulltext=NoteSearchFilter, trigram=NoteSearchFilter)
+
+        rows = []
+        for mode, backend in backends.items():
+            for query in QUERIES:
+                params = {"search": query, "search_mode": "trigram" if mode == "trigram" else "fulltext"}
+                request = Request(factory.get("/api/notes/", params))
+
+                def first_page(backend=backend, request=request):
+                    queryset = backend().filter_queryset(request, base, NoteListCreateView)
+                    return KeysetPagination().paginate_queryset(queryset, request)
+
+                hits = len(first_page())
+                rows.append({"mode": mode, "query": query, "hits": hits, **summarize(measure(first_page, args.repeat))})
+
+        print(f"\n{Note.objects.count()} notes on {connection.vendor}, first page latency in ms\n")
+        print_table(rows, ["mode", "query", "hits", "mean", "p50", "p95", "p99"])
+
+
+if __name__ == "__main__":
+    main()
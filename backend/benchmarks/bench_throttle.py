@@ -0,0 +1,72 @@
+"""
+Throttle overhead benchmark.
+
+Times the rate limit check of a request with DRF's ``UserRateThrottle`` (a request log in
+the cache) and with ``RequestRateThrottle`` on its own and with a shared cache tier, for
+requests spread over many users::
+
+    uv run python -m benchmarks.bench_throttle --users 1000
+
+The shared tier uses the local-memory cache, so a networked cache adds its round trips.
+No database is needed.
+"""
+
+import argparse
+
+from benchmarks.common import measure, print_table, setup, summarize
+
+CHECKS = 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1_000, help="users the requests are spread over")
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs of 1,000 checks per throttle")
+    args = parser.parse_args()
+
+    setup()
+
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.test.utils import override_settings
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from rest_framework.throttling import UserRateThrottle
+
+    from core.throttling import RequestRateThrottle, limiter
+
+    requests = []
+    for i in range(CHECKS):
+        request = Request(APIRequestFactory().get("/api/notes/"))
+        request.user = User(id=i % args.users + 1)
+        requests.append(request)
+
+    # Rates high enough that every request passes, so each check does all of its work.
+    rates = {"user": "1000000/min", "read": "1000000/min"}
+    throttles = {
+        "drf": (UserRateThrottle, None),
+        "bucket": (RequestRateThrottle, None),
+        "bucket+shared": (RequestRateThrottle, "default"),
+    }
+    rows = []
+    for name, (throttle_class, shared) in throttles.items():
+        with (
+            override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": rates}),
+            override_settings(THROTTLING={**settings.THROTTLING, "SHARED_CACHE": shared}),
+        ):
+            # UserRateThrottle reads its rates when the class is defined.
+            throttle_class.THROTTLE_RATES = rates
+            limiter.clear()
+
+            def check(throttle_class=throttle_class):
+                for request in requests:
+                    throttle_class().allow_request(request, None)
+
+            rows.append({"throttle": name, **summarize(measure(check, args.repeat))})
+
+    print(f"\nMicroseconds per check, requests spread over {args.users} users\n")
+    print_table(rows, ["throttle", "mean", "p50", "p95", "p99"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Shared helpers for the benchmark scripts."""
+
+import os
+import random
+import statistics
+import time
+from contextlib import contextmanager
+
+import django
+
+WORDS = (
+    "meeting project roadmap deploy kubernetes invoice budget groceries recipe travel "
+    "flight hotel review design sprint backlog retro planning research paper draft "
+    "lecture exam homework garden workout running journal idea feature release bug "
+    "migration database index query cache latency throughput customer contract call"
+).split()
+
+
+def setup():
+    """Configure Django for a script run outside ``manage.py``."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    django.setup()
+
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    """Run the block against a freshly created (or kept) test database."""
+    from django.db import connection
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+
+
+def seed(users, notes, seed=0, batch_size=5000):
+    """
+    Create ``users`` users with one category each and ``notes`` notes spread across them.
+
+    Returns the created users. On PostgreSQL the notes are generated server-side.
+    """
+    from django.contrib.auth.models import User
+    from django.db import connection
+
+    from notes.models import Category, Note
+
+    created = User.objects.bulk_create(User(username=f"bench-{i}@example.com") for i in range(users))
+    categories = Category.objects.bulk_create(Category(user=user, name="Bench") for user in created)
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT setseed(%s)", [(seed % 1000) / 1000])
+            cursor.execute(
+                """
+                INSERT INTO notes_note (title, body, user_id, category_id, created_at, updated_at, version)
+                SELECT
+                    initcap(w[1 + floor(random() * cardinality(w))::int]) || ' '
+                        || w[1 + floor(random() * cardinality(w))::int],
+                    array_to_string(ARRAY(
+                        SELECT w[1 + floor(random() * cardinality(w))::int]
+                        FROM generate_series(1, 20 + (i %% 200))
+                    ), ' '),
+                    u[1 + i %% cardinality(u)],
+                    c[1 + i %% cardinality(c)],
+                    now() - make_interval(secs => i),
+                    now() - make_interval(secs => i),
+                    1
+                FROM generate_series(1, %s) AS i,
+                     (SELECT %s::text[] AS w, %s::bigint[] AS u, %s::bigint[] AS c) AS params
+                """,
+                [notes, list(WORDS), [u.id for u in created], [c.id for c in categories]],
+            )
+            cursor.execute("ANALYZE notes_note")
+        Category.objects.filter(pk__in=[c.id for c in categories]).recount_notes()
+        return created
+
+    rng = random.Random(seed)
+    batch = []
+    for i in range(notes):
+        title = f"{rng.choice(WORDS).title()} {rng.choice(WORDS)}"
+        body = " ".join(rng.choices(WORDS, k=20 + i % 200))
+        batch.append(Note(title=title, body=body, user=created[i % users], category=categories[i % users]))
+        if len(batch) >= batch_size:
+            Note.objects.bulk_create(batch)
+            batch = []
+    Note.objects.bulk_create(batch)
+    return created
+
+
+def measure(fn, repeat=20, warmup=2):
+    """Call ``fn`` ``repeat`` times after ``warmup`` calls and return the durations in ms."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples):
+    """Return mean and p50/p95/p99 for a list of millisecond samples."""
+    ordered = sorted(samples)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))]
+
+    return {
+        "mean": statistics.fmean(ordered),
+        "p50": percentile(50),
+        "p95": percentile(95),
+        "p99": percentile(99),
+    }
+
+
+def print_table(rows, columns):
+    """Print ``rows`` (dicts) as an aligned text table with the given column keys."""
+    cells = [[_format(row.get(column)) for column in columns] for row in rows]
+    widths = [max(len(column), *(len(row[i]) for row in cells)) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths, strict=True)))
+    for row in cells:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths, strict=True)))
+
+
+def _format(value):
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return "" if value is None else str(value)
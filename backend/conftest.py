@@ -1,5 +1,21 @@
 import os
 
+import pytest
+
 # Override DATABASE_URL to use SQLite in-memory for tests if not provided
 if "DATABASE_URL" not in os.environ:
     os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # Cached pages, stamps and throttle buckets are keyed by user id, which the test
+    # database hands out again.
+    yield
+    from django.core.cache import caches
+
+    from core.throttling import limiter
+
+    for cache in caches.all():
+        cache.clear()
+    limiter.clear()
@@ -0,0 +1,120 @@
+"""
+Async API views for the ASGI deployment.
+
+DRF views are synchronous, so under ASGI every request to them is handed to a worker
+thread and back. ``AsyncAPIView`` is a small async counterpart for the hot endpoints,
+served under ``/api/async/``: requests are authenticated, parsed and rendered on the
+event loop, and reads go through Django's async ORM.
+
+Writes still go through the synchronous model and serializer code (transactions, the
+note count and cache-stamp bookkeeping), each in a single ``sync_to_async`` call.
+
+Only token authentication is supported, and responses are always JSON. Requests are
+throttled like DRF's (see ``core.throttling``).
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from accounts.authentication import CachedTokenAuthentication
+
+from .renderers import FastJSONRenderer
+from .throttling import limiter
+
+
+class AsyncAPIView(View):
+    """
+    Base class for async API views.
+
+    Handlers are ``async def`` methods named after the HTTP method. They receive a DRF
+    ``Request`` and return a DRF ``Response``, which is rendered to a plain
+    ``HttpResponse`` here so Django doesn't render it in a thread. Set
+    ``authentication_required = False`` for public endpoints.
+    """
+
+    authentication_required = True
+    authenticator = CachedTokenAuthentication()
+    renderer = FastJSONRenderer()
+
+    @property
+    def throttle_classes(self):
+        # Read per request, so that changes to REST_FRAMEWORK apply; subclasses may
+        # set a list instead.
+        return api_settings.DEFAULT_THROTTLE_CLASSES
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token authentication isn't vulnerable to CSRF, as in DRF's APIView.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(request, parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES])
+        self.request = request
+        self.args = args
+        self.kwargs = kwargs
+        try:
+            handler = getattr(self, request.method.lower(), None)
+            if request.method.lower() not in self.http_method_names or handler is None:
+                raise exceptions.MethodNotAllowed(request.method)
+            if self.authentication_required:
+                await self.authenticate(request)
+            await self.check_throttles(request)
+            await self.initial(request)
+            response = await handler(request, *args, **kwargs)
+        except Http404:
+            response = self.handle_exception(exceptions.NotFound())
+        except exceptions.APIException as exc:
+            response = self.handle_exception(exc)
+        return self.finalize_response(response)
+
+    async def authenticate(self, request):
+        credentials = await self.authenticator.aauthenticate(request)
+        if credentials is None:
+            raise exceptions.NotAuthenticated()
+        request.user, request.auth = credentials
+
+    async def check_throttles(self, request):
+        if limiter.shared is None:
+            waits = self.get_throttle_waits(request)
+        else:
+            # The shared tier queries the cache, which would block the event loop.
+            waits = await sync_to_async(self.get_throttle_waits)(request)
+        if waits:
+            raise exceptions.Throttled(max((wait for wait in waits if wait is not None), default=None))
+
+    def get_throttle_waits(self, request):
+        throttles = [throttle() for throttle in self.throttle_classes]
+        return [throttle.wait() for throttle in throttles if not throttle.allow_request(request, self)]
+
+    async def initial(self, request):
+        """Hook run after authentication and before the handler."""
+
+    def handle_exception(self, exc):
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+        response = Response(data, status=exc.status_code)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            response["WWW-Authenticate"] = self.authenticator.authenticate_header(self.request)
+        if getattr(exc, "wait", None):
+            response["Retry-After"] = f"{exc.wait:.0f}"
+        return response
+
+    def finalize_response(self, response):
+        if not isinstance(response, Response):
+            return response
+        content = b""
+        if response.data is not None and response.status_code not in (
+            status.HTTP_204_NO_CONTENT,
+            status.HTTP_304_NOT_MODIFIED,
+        ):
+            content = self.renderer.render(response.data)
+        rendered = HttpResponse(content, status=response.status_code, content_type=self.renderer.media_type)
+        for header, value in response.items():
+            if header.lower() != "content-type":
+                rendered[header] = value
+        return rendered
@@ -0,0 +1,110 @@
+"""
+Per-request performance stats.
+
+``core.middleware.PerformanceMiddleware`` opens a ``RequestStats`` for every request and
+records it per view in ``core.metrics`` once the response is ready. While a request runs:
+
+* a database execute wrapper, installed on every connection, counts its queries and the
+  time spent in them;
+* serializers using ``TimedSerializerMixin`` (or the ``serializing()`` block) add the
+  time spent building representations.
+
+The stats live in a context variable, so they follow the request into the threads that
+``sync_to_async`` runs ORM calls in under ASGI.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+current_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+class RequestStats:
+    """Where the time of one request went."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self, elapsed):
+        """The stats as a ``Server-Timing`` header value, in milliseconds."""
+        return (
+            f"total;dur={elapsed * 1000:.1f}, "
+            f'db;dur={self.sql_seconds * 1000:.1f};desc="{self.queries} queries", '
+            f"serializer;dur={self.serializer_seconds * 1000:.1f}"
+        )
+
+
+@contextmanager
+def recording():
+    """Collect the stats of the code run in the block, including in ``sync_to_async`` calls."""
+    stats = RequestStats()
+    token = current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_stats.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.sql_seconds += time.perf_counter() - start
+
+
+def instrument(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def instrument_connections():
+    """Instrument this thread's connections opened before the signal receiver existed."""
+    for connection in connections.all(initialized_only=True):
+        instrument(connection)
+
+
+@receiver(connection_created)
+def instrument_new_connection(sender, connection, **kwargs):
+    instrument(connection)
+
+
+@contextmanager
+def serializing():
+    """Count the block as serializer time; nested blocks are only counted once."""
+    stats = current_stats.get()
+    if stats is None or stats.serializing:
+        yield
+        return
+    stats.serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serializer_seconds += time.perf_counter() - start
+        stats.serializing = False
+
+
+class TimedSerializerMixin:
+    """Serializer mixin counting ``to_representation()`` as serializer time."""
+
+    def to_representation(self, instance):
+        with serializing():
+            return super().to_representation(instance)
@@ -0,0 +1,152 @@
+"""
+In-process metrics.
+
+Metrics live in a module-level registry for the lifetime of the worker process and are
+cheap enough to update on every request. A metric may have labels (``{"view": ...}``);
+each combination of label values is registered as a metric of its own. ``exposition()``
+renders the registry in the Prometheus text format, served at ``/metrics/``.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class Counter:
+    """A monotonically increasing value."""
+
+    type = "counter"
+
+    def __init__(self, name, description, labels=None):
+        self.name = name
+        self.description = description
+        self.labels = labels or {}
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+    def reset(self):
+        with self._lock:
+            self._value = 0
+
+    def samples(self):
+        return [f"{self.name}{_format_labels(self.labels)} {self.value}"]
+
+
+class Histogram:
+    """Observed values (durations in seconds, by default) counted into cumulative buckets."""
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    type = "histogram"
+
+    def __init__(self, name, description, buckets=DEFAULT_BUCKETS, labels=None):
+        self.name = name
+        self.description = description
+        self.labels = labels or {}
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def observe(self, value):
+        with self._lock:
+            self._count += 1
+            self._sum += value
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+
+    @contextmanager
+    def time(self):
+        """Observe the wall time of the block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    @property
+    def value(self):
+        with self._lock:
+            return {
+                "count": self._count,
+                "sum": self._sum,
+                "buckets": dict(zip(self.buckets, self._counts, strict=True)),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._count = 0
+            self._sum = 0.0
+            self._counts = [0] * len(self.buckets)
+
+    def samples(self):
+        value = self.value
+        samples = [
+            f"{self.name}_bucket{_format_labels({**self.labels, 'le': bound})} {count}"
+            for bound, count in value["buckets"].items()
+        ]
+        samples.append(f"{self.name}_bucket{_format_labels({**self.labels, 'le': '+Inf'})} {value['count']}")
+        samples.append(f"{self.name}_sum{_format_labels(self.labels)} {value['sum']}")
+        samples.append(f"{self.name}_count{_format_labels(self.labels)} {value['count']}")
+        return samples
+
+
+def _register(cls, name, *args, labels=None):
+    key = (name, tuple(sorted(labels.items())) if labels else ())
+    with _registry_lock:
+        if key not in _registry:
+            _registry[key] = cls(name, *args, labels=labels)
+        return _registry[key]
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def counter(name, description="", labels=None):
+    """Return the counter registered as ``name`` (with ``labels``), creating it on first use."""
+    return _register(Counter, name, description, labels=labels)
+
+
+def histogram(name, description="", buckets=Histogram.DEFAULT_BUCKETS, labels=None):
+    """Return the histogram registered as ``name`` (with ``labels``), creating it on first use."""
+    return _register(Histogram, name, description, buckets, labels=labels)
+
+
+def snapshot():
+    """Return ``{name{labels}: value}`` for every registered metric."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return {metric.name + _format_labels(metric.labels): metric.value for metric in metrics}
+
+
+def exposition():
+    """Every registered metric in the Prometheus text format."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    families = {}
+    for metric in metrics:
+        families.setdefault(metric.name, []).append(metric)
+    lines = []
+    for name, family in families.items():
+        lines.append(f"# HELP {name} {family[0].description}")
+        lines.append(f"# TYPE {name} {family[0].type}")
+        for metric in family:
+            lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
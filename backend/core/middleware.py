@@ -0,0 +1,162 @@
+"""
+Response compression and performance instrumentation.
+
+``CompressionMiddleware`` extends Django's ``GZipMiddleware`` with brotli, used when the
+``brotli`` package is installed and the client accepts it and padded at random like
+Django's gzip (see ``compress_brotli``), and with a configurable size
+threshold (``COMPRESSION["MIN_SIZE"]``): small responses aren't worth the CPU. Streaming
+responses (note exports) are gzipped on the fly, except event streams.
+
+``PerformanceMiddleware`` records the wall time, SQL queries, SQL time, serializer time
+and response size of every request per view (see ``core.instrumentation``), adds them as
+a ``Server-Timing`` header and logs requests over the ``PERFORMANCE`` budgets.
+"""
+
+import logging
+import re
+import secrets
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from . import metrics
+from .instrumentation import instrument_connections, recording
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+re_accepts_brotli = re.compile(r"\bbr\b")
+
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def compress_brotli(content, quality, max_random_bytes):
+    """
+    Brotli-compress ``content`` behind a metadata block of 1 to ``max_random_bytes`` (at
+    most 256) random bytes, which decoders skip (RFC 7932, section 9.2).
+
+    The random length is the BREACH mitigation Django's gzip applies with a random file
+    name: the size of a response no longer tells exactly how well a secret in it
+    compressed against what the requester put next to it.
+    """
+    compressor = brotli.Compressor(quality=quality)
+    # A flush before any input ends the stream header on a byte boundary, where the
+    # metadata block can start.
+    header = compressor.process(b"") + compressor.flush()
+    length = secrets.randbelow(max_random_bytes) + 1
+    # ISLAST 0, MNIBBLES 3 (a metadata block), reserved 0, MSKIPBYTES 1, MSKIPLEN - 1, zero padding
+    metadata = bytes([0b010110 | ((length - 1) & 0b11) << 6, (length - 1) >> 2]) + secrets.token_bytes(length)
+    return header + metadata + compressor.process(content) + compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    def process_response(self, request, response):
+        if response.get("Content-Type", "").startswith("text/event-stream"):
+            # Compressing an event stream would hold events back in the compressor.
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION["MIN_SIZE"]:
+            return response
+        if brotli is not None and not response.streaming and self.accepts_brotli(request, response):
+            return self.brotli_response(response)
+        return super().process_response(request, response)
+
+    def accepts_brotli(self, request, response):
+        return not response.has_header("Content-Encoding") and re_accepts_brotli.search(
+            request.headers.get("Accept-Encoding", "")
+        )
+
+    def brotli_response(self, response):
+        patch_vary_headers(response, ("Accept-Encoding",))
+        compressed = compress_brotli(response.content, settings.COMPRESSION["BROTLI_QUALITY"], self.max_random_bytes)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers["Content-Length"] = str(len(compressed))
+        # The body changed, so a strong ETag no longer identifies it byte for byte.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
+
+
+class PerformanceMiddleware:
+    """
+    Records where the time of each request went. Placed first, so the wall time covers
+    the other middleware and the response size is the size on the wire.
+
+    Streaming responses are measured up to their first byte, and their size isn't known.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        instrument_connections()
+        with recording() as stats:
+            response = self.get_response(request)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        with recording() as stats:
+            response = await self.get_response(request)
+        return self.finish(request, response, stats)
+
+    def finish(self, request, response, stats):
+        elapsed = stats.elapsed
+        config = settings.PERFORMANCE
+        if config["SERVER_TIMING"]:
+            response["Server-Timing"] = stats.server_timing(elapsed)
+        match = request.resolver_match
+        if match is None:
+            # Static files and unknown URLs.
+            return response
+        view = match.view_name
+        size = None if response.streaming else len(response.content)
+        self.record(view, stats, elapsed, size)
+
+        if elapsed > config["LATENCY_BUDGET"] or stats.queries > config["QUERY_BUDGET"]:
+            metrics.counter(
+                "http_requests_over_budget_total", "Requests over the latency or query budget", {"view": view}
+            ).inc()
+            logger.warning(
+                "Slow request %s %s (%s): %.0f ms, %d queries in %.0f ms, serializers %.0f ms",
+                request.method,
+                request.path,
+                view,
+                elapsed * 1000,
+                stats.queries,
+                stats.sql_seconds * 1000,
+                stats.serializer_seconds * 1000,
+            )
+        return response
+
+    def record(self, view, stats, elapsed, size):
+        labels = {"view": view}
+        metrics.histogram("http_request_duration_seconds", "Request wall time", labels=labels).observe(elapsed)
+        metrics.histogram("http_request_queries", "SQL queries per request", QUERY_BUCKETS, labels).observe(
+            stats.queries
+        )
+        metrics.histogram("http_request_db_seconds", "Time spent in SQL queries", labels=labels).observe(
+            stats.sql_seconds
+        )
+        metrics.histogram("http_request_serializer_seconds", "Time spent in serializers", labels=labels).observe(
+            stats.serializer_seconds
+        )
+        if size is not None:
+            metrics.histogram("http_response_size_bytes", "Response body size", SIZE_BUCKETS, labels).observe(size)
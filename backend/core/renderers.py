@@ -0,0 +1,47 @@
+"""
+Fast JSON rendering.
+
+``FastJSONRenderer`` encodes with ``orjson`` when it is installed (the ``speedups``
+extra), several times faster than ``json.dumps`` for large note lists, and falls back to
+DRF's ``JSONRenderer`` otherwise. Output matches DRF's: UTF-8, compact, datetimes in ISO
+8601 with ``Z`` for UTC, and U+2028/U+2029 escaped. Types ``orjson`` doesn't know (lazy
+strings, decimals, querysets, ...) go through DRF's encoder. ``orjson`` writes NaN and
+infinity as ``null``, so data holding them is rendered by DRF instead, which rejects
+them under ``STRICT_JSON``.
+"""
+
+import math
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def has_non_finite(value):
+    """Whether ``value`` holds a NaN or infinite float, at any depth."""
+    if isinstance(value, float):
+        return not math.isfinite(value)
+    if isinstance(value, dict):
+        return any(map(has_non_finite, value.values()))
+    if isinstance(value, list | tuple):
+        return any(map(has_non_finite, value))
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Indented output (the browsable API, ?indent) keeps the stdlib encoder.
+        if (
+            orjson is None
+            or data is None
+            or self.get_indent(accepted_media_type, renderer_context or {})
+            or has_non_finite(data)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        content = orjson.dumps(data, default=JSONEncoder().default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+        # Valid JSON, but not JavaScript; DRF escapes them too.
+        return content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
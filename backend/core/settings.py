@@ -46,6 +46,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     # Third party
     "rest_framework",
     "rest_framework.authtoken",
@@ -58,8 +59,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.PerformanceMiddleware",  # Server-Timing and /metrics/
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # Static files
+    "core.middleware.CompressionMiddleware",  # gzip/brotli
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",  # CORS
     "django.middleware.common.CommonMiddleware",
@@ -97,6 +100,10 @@ WSGI_APPLICATION = "core.wsgi.application"
 
 DATABASES = {"default": env.db(default="postgres://turbo:turbo@db:5432/turbo")}
 
+# Use a shared cache (e.g. redis://) when running more than one worker; the list ETags and
+# cached pages in notes.caching are only enabled with one (see NOTES_CACHE).
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -140,7 +147,7 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "accounts.authentication.CachedTokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
@@ -150,6 +157,172 @@ REST_FRAMEWORK = {
         "django_filters.rest_framework.DjangoFilterBackend",
         "rest_framework.filters.SearchFilter",
     ],
+    # orjson when installed, the stdlib json module otherwise
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "core.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    # Token buckets per user, or per client IP when anonymous (see core.throttling)
+    "DEFAULT_THROTTLE_CLASSES": [
+        "core.throttling.RequestRateThrottle",
+    ],
+    "DEFAULT_THROTTLE_RATES": {
+        "read": env("THROTTLE_READ_RATE", default="1200/min"),
+        # Autosaves arrive in bursts while typing
+        "write": env("THROTTLE_WRITE_RATE", default="600/min"),
+        "search": env("THROTTLE_SEARCH_RATE", default="120/min"),
+        # Per client IP
+        "login": env("THROTTLE_LOGIN_RATE", default="20/min"),
+    },
+    # Client IPs are read from X-Forwarded-For as appended by this many trusted proxies
+    # (Railway's one by default); 0 uses REMOTE_ADDR. Unset, DRF would trust the client.
+    "NUM_PROXIES": env.int("NUM_PROXIES", default=1),
+}
+
+# Rate limiting state (see core.throttling). Buckets are kept per worker; SHARED_CACHE
+# names an entry in CACHES that also enforces the rates across workers.
+THROTTLING = {
+    "MAX_SIZE": env.int("THROTTLING_MAX_SIZE", default=100000),
+    "SHARED_CACHE": env("THROTTLING_SHARED_CACHE", default=None),
+}
+
+# Response compression (see core.middleware.CompressionMiddleware)
+COMPRESSION = {
+    # Smaller responses are sent uncompressed
+    "MIN_SIZE": env.int("COMPRESSION_MIN_SIZE", default=1024),
+    # 0-11; low levels compress dynamic responses nearly as well, much faster
+    "BROTLI_QUALITY": env.int("COMPRESSION_BROTLI_QUALITY", default=4),
+}
+
+# Request instrumentation (see core.middleware.PerformanceMiddleware). Requests slower
+# than LATENCY_BUDGET seconds or running more than QUERY_BUDGET queries are logged.
+PERFORMANCE = {
+    "SERVER_TIMING": env.bool("PERFORMANCE_SERVER_TIMING", default=True),
+    "LATENCY_BUDGET": env.float("PERFORMANCE_LATENCY_BUDGET", default=0.5),
+    "QUERY_BUDGET": env.int("PERFORMANCE_QUERY_BUDGET", default=20),
+    # /metrics/ requires "Authorization: Bearer <token>"; without a token it is disabled
+    "METRICS_TOKEN": env("PERFORMANCE_METRICS_TOKEN", default=None),
+}
+
+# Token lookup cache (see accounts.authentication). SHARED_CACHE names an entry in CACHES
+# to share resolved tokens between workers; TTL also bounds how long a revoked token can
+# still be accepted by other workers.
+AUTH_TOKEN_CACHE = {
+    "MAX_SIZE": env.int("AUTH_TOKEN_CACHE_SIZE", default=10000),
+    "TTL": env.float("AUTH_TOKEN_CACHE_TTL", default=60.0),
+    "SHARED_CACHE": env("AUTH_TOKEN_SHARED_CACHE", default=None),
+}
+
+# Password hashing pool (see accounts.hashing): WORKERS hashes run at once and up to
+# QUEUE_SIZE more may wait; further logins and sign-ups get 429.
+AUTH_HASHING = {
+    "WORKERS": env.int("AUTH_HASHING_WORKERS", default=4),
+    "QUEUE_SIZE": env.int("AUTH_HASHING_QUEUE_SIZE", default=32),
+}
+
+# Django's defaults, with PBKDF2 (which existing hashes use too) replaced by its pooled
+# version; both register as pbkdf2_sha256, so only one of them can be listed.
+PASSWORD_HASHERS = [
+    "accounts.hashing.PooledPBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
+# ModelBackend, awaiting the hashing pool on the async login instead of blocking the loop
+AUTHENTICATION_BACKENDS = ["accounts.backends.PooledModelBackend"]
+
+# Per-user ETags and cached list pages (see notes.caching)
+NOTES_CACHE = {
+    "ALIAS": env("NOTES_CACHE_ALIAS", default="default"),
+    # Seconds a serialized page stays cached
+    "TIMEOUT": env.int("NOTES_CACHE_TIMEOUT", default=300),
+    # ETags and cached pages; by default only with a cache shared by all workers, since a
+    # process-local one doesn't see other workers' writes. Set to true for a single worker.
+    "ENABLED": env.bool("NOTES_CACHE_ENABLED", default=None),
+}
+
+# Categories every new user starts with (see notes.signals)
+NOTES_DEFAULT_CATEGORIES = [
+    {"name": "Random Thoughts", "color": "#FFCCB6"},  # Soft Orange/Peach
+    {"name": "School", "color": "#FDFD96"},  # Soft Yellow
+    {"name": "Personal", "color": "#B8E0D2"},  # Soft Green
+]
+
+# Keyset pagination for the notes list
+NOTES_PAGINATION = {
+    "PAGE_SIZE": env.int("NOTES_PAGE_SIZE", default=50),
+    "MAX_PAGE_SIZE": env.int("NOTES_MAX_PAGE_SIZE", default=200),
+}
+
+# Dashboard card lists (?fields=card, see notes.serializers.NoteCardSerializer)
+NOTES_CARDS = {
+    # Characters of the body sent as the card snippet
+    "SNIPPET_LENGTH": env.int("NOTES_CARD_SNIPPET_LENGTH", default=200),
+}
+
+# Note search (see notes.filters.NoteSearchFilter)
+NOTES_SEARCH = {
+    # Minimum word similarity for search_mode=trigram
+    "TRIGRAM_THRESHOLD": env.float("NOTES_TRIGRAM_THRESHOLD", default=0.3),
+}
+
+# Delta sync (see notes.views.NoteSyncView)
+NOTES_SYNC = {
+    # Seconds of changes resent on every sync, so writes that committed after the previous
+    # sync but carry an earlier timestamp aren't missed.
+    "OVERLAP": env.float("NOTES_SYNC_OVERLAP", default=5.0),
+    # Tombstones older than this are pruned; older sync tokens get 410 and must resync.
+    "TOMBSTONE_DAYS": env.int("NOTES_TOMBSTONE_DAYS", default=30),
+}
+
+# Bulk note operations (see notes.views.NoteBulkView)
+NOTES_BULK = {
+    "MAX_OPERATIONS": env.int("NOTES_BULK_MAX_OPERATIONS", default=10000),
+}
+
+# Streaming exports (see notes.export): rows fetched and encoded per chunk
+NOTES_EXPORT = {
+    "CHUNK_SIZE": env.int("NOTES_EXPORT_CHUNK_SIZE", default=2000),
+}
+
+# Push channel (see notes.events). BACKEND is notes.events.InMemoryBroker for a single
+# worker, or notes.events.RelayBroker to share events between workers through the relay
+# at RELAY (manage.py run_event_relay).
+NOTES_EVENTS = {
+    "BACKEND": env("NOTES_EVENTS_BACKEND", default="notes.events.InMemoryBroker"),
+    "RELAY": env("NOTES_EVENTS_RELAY", default="127.0.0.1:8766"),
+    # Seconds between keep-alive comments on idle streams
+    "HEARTBEAT": env.float("NOTES_EVENTS_HEARTBEAT", default=15.0),
+    # Events a slow stream may fall behind before it is told to resync
+    "QUEUE_SIZE": env.int("NOTES_EVENTS_QUEUE_SIZE", default=100),
+    # Events waiting to be sent to the relay before new ones are dropped
+    "SEND_QUEUE_SIZE": env.int("NOTES_EVENTS_SEND_QUEUE_SIZE", default=10000),
+    # Seconds a stream ticket (POST /api/notes/events/ticket/) can be used for
+    "TICKET_TTL": env.float("NOTES_EVENTS_TICKET_TTL", default=30.0),
+}
+
+# Note imports (see notes.importing)
+NOTES_IMPORT = {
+    "BATCH_SIZE": env.int("NOTES_IMPORT_BATCH_SIZE", default=1000),
+    # Category for records that don't name one
+    "DEFAULT_CATEGORY": env("NOTES_IMPORT_DEFAULT_CATEGORY", default="Imported"),
+    # Markdown files larger than this (in bytes) are skipped
+    "MAX_MARKDOWN_SIZE": env.int("NOTES_IMPORT_MAX_MARKDOWN_SIZE", default=1024 * 1024),
+}
+
+# Autosave write coalescing (see notes.coalescing). The buffer is process-local, so only
+# enable it with a single worker or sticky routing. A FLUSH_INTERVAL of 0 disables the
+# background flush; pending writes are then flushed on the user's next request only.
+NOTES_AUTOSAVE = {
+    "COALESCE": env.bool("NOTES_AUTOSAVE_COALESCE", default=False),
+    "FLUSH_INTERVAL": env.float("NOTES_AUTOSAVE_FLUSH_INTERVAL", default=2.0),
 }
 
 # Swagger/Spectacular Configuration
@@ -0,0 +1,166 @@
+"""
+Request rate limiting.
+
+Each client gets a token bucket per scope: a budget of ``N`` requests that refills at
+``N`` per period (``"600/min"``), so short bursts pass while sustained traffic is held to
+the rate. Scopes and their rates are set in ``REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]``:
+
+* ``read`` and ``write``, by request method, and ``search`` for reads with a ``search``
+  parameter, which cost far more than other reads;
+* ``login``, for the login endpoints only, per client IP to slow down password guessing.
+
+Authenticated requests are counted per user and anonymous ones per client IP, taken from
+the ``X-Forwarded-For`` entry added by the last of ``REST_FRAMEWORK["NUM_PROXIES"]``
+trusted proxies, so clients can't pick their own address by sending the header. A scope
+without a rate isn't limited. Rejected requests get 429 with ``Retry-After``.
+
+Buckets live in each worker process, so a check takes microseconds and no I/O, but with
+N workers a client can get up to N times its budget. ``THROTTLING["SHARED_CACHE"]`` names
+an entry in ``CACHES`` that also enforces the rates across workers, with a sliding window
+counter, at the cost of two cache round trips per request that passes the local check.
+"""
+
+import contextlib
+import threading
+import time
+from collections import OrderedDict
+from functools import cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+@cache
+def parse_rate(rate):
+    """``"600/min"`` -> ``(600, 60)``, like DRF's rates; ``None`` -> ``None``."""
+    if rate is None:
+        return None
+    count, _, period = rate.partition("/")
+    try:
+        return int(count), PERIODS[period.strip()[:1]]
+    except (KeyError, ValueError):
+        raise ImproperlyConfigured(f"Invalid throttle rate {rate!r}, expected e.g. '600/min'.") from None
+
+
+class RateLimiter:
+    """Token buckets keyed by ``(scope, client)``, backed by an optional shared cache."""
+
+    key_prefix = "throttle:"
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return settings.THROTTLING
+
+    @property
+    def shared(self):
+        alias = self.config["SHARED_CACHE"]
+        return caches[alias] if alias else None
+
+    def hit(self, scope, ident, limit, period):
+        """Count a request; return 0 if it is allowed, otherwise the seconds to wait."""
+        wait = self.hit_local(scope, ident, limit, period)
+        if wait or self.shared is None:
+            return wait
+        return self.hit_shared(scope, ident, limit, period)
+
+    def hit_local(self, scope, ident, limit, period):
+        now = time.monotonic()
+        key = (scope, ident)
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (limit, now))
+            tokens = min(limit, tokens + (now - updated) * limit / period)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) * period / limit
+            self._buckets[key] = (tokens, now)
+            # Buckets unused for longest go first; they have usually refilled anyway.
+            if len(self._buckets) > self.config["MAX_SIZE"]:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def hit_shared(self, scope, ident, limit, period):
+        """
+        Sliding window counter: the requests of the current window, plus those of the
+        previous one weighted by how much of it still overlaps the last ``period`` seconds.
+        Concurrent workers may let a few requests over the limit through.
+        """
+        window, elapsed = divmod(time.time(), period)
+        key = f"{self.key_prefix}{scope}:{ident}:"
+        current_key, previous_key = f"{key}{window:.0f}", f"{key}{window - 1:.0f}"
+        counts = self.shared.get_many([current_key, previous_key])
+        current = counts.get(current_key, 0)
+        previous = counts.get(previous_key, 0)
+        if current + previous * (1 - elapsed / period) + 1 > limit:
+            free = limit - 1 - current
+            if free >= 0 and previous:
+                # Wait until enough of the previous window has slid out.
+                return period * (1 - free / previous) - elapsed
+            return period - elapsed
+        if current_key in counts or not self.shared.add(current_key, 1, timeout=period * 2):
+            # A missing key here has just expired, so the request goes uncounted.
+            with contextlib.suppress(ValueError):
+                self.shared.incr(current_key)
+        return 0
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+limiter = RateLimiter()
+
+
+class BucketThrottle(BaseThrottle):
+    """Limits requests to the rate of their scope, per user (or client IP when anonymous)."""
+
+    scope = None
+
+    def get_scope(self, request, view):
+        return self.scope
+
+    def get_ident(self, request):
+        user = request.user
+        if user and user.is_authenticated:
+            return user.pk
+        return super().get_ident(request)
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rate = parse_rate(api_settings.DEFAULT_THROTTLE_RATES.get(scope))
+        if rate is None:
+            return True
+        self._wait = limiter.hit(scope, self.get_ident(request), *rate)
+        return not self._wait
+
+    def wait(self):
+        return self._wait
+
+
+class RequestRateThrottle(BucketThrottle):
+    """The default throttle: ``read``, ``search`` or ``write``, by request."""
+
+    def get_scope(self, request, view):
+        if request.method not in SAFE_METHODS:
+            return "write"
+        return "search" if request.query_params.get("search") else "read"
+
+
+class LoginRateThrottle(BucketThrottle):
+    """Login attempts per client IP, whoever they try to log in as."""
+
+    scope = "login"
+
+    def get_ident(self, request):
+        return BaseThrottle.get_ident(self, request)
@@ -15,21 +15,39 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.conf import settings
 from django.contrib import admin
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.urls import include, path
+from django.utils.crypto import constant_time_compare
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from . import metrics
+
 
 def health_check(request):
     return JsonResponse({"status": "healthy"})
 
 
+def metrics_view(request):
+    # Per-route latencies and user activity aren't public: without a token there's no endpoint.
+    token = settings.PERFORMANCE["METRICS_TOKEN"]
+    if not token:
+        raise Http404
+    if not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponse(status=401, headers={"WWW-Authenticate": "Bearer"})
+    return HttpResponse(metrics.exposition(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 urlpatterns = [
     path("health/", health_check, name="health-check"),
+    path("metrics/", metrics_view, name="metrics"),
     path("admin/", admin.site.urls),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
     path("api/auth/", include("accounts.urls")),
     path("api/", include("notes.urls")),
+    # Async versions of the hot endpoints for ASGI deployments (see core.async_views)
+    path("api/async/auth/", include("accounts.async_urls")),
+    path("api/async/", include("notes.async_urls")),
 ]
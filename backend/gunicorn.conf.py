@@ -0,0 +1,66 @@
+"""
+Gunicorn hooks for the production image (``backend/Dockerfile``); gunicorn reads this
+file from its working directory.
+
+Push events (``notes.events``) must reach the streams of every worker. The master
+therefore refuses to start several workers with a process-local broker, and with
+``RelayBroker`` and a relay on this host (the default ``NOTES_EVENTS["RELAY"]``) it runs
+``manage.py run_event_relay`` next to the workers for as long as it runs itself. A relay
+on another host is left to whoever runs it.
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+
+relay = None
+
+
+def on_starting(server):
+    global relay
+
+    from django.conf import settings
+    from django.utils.module_loading import import_string
+
+    from notes.events import RelayBroker, relay_address
+
+    broker = import_string(settings.NOTES_EVENTS["BACKEND"])
+    if broker.process_local and server.cfg.workers > 1:
+        server.log.error(
+            "%s only delivers push events within one worker; set NOTES_EVENTS_BACKEND=notes.events.RelayBroker "
+            "to run %d workers",
+            settings.NOTES_EVENTS["BACKEND"],
+            server.cfg.workers,
+        )
+        sys.exit(1)
+
+    address = relay_address()
+    if issubclass(broker, RelayBroker) and address[0] in LOCAL_HOSTS:
+        relay = subprocess.Popen([sys.executable, Path(__file__).with_name("manage.py"), "run_event_relay"])
+        wait_for_relay(server, address)
+
+
+def wait_for_relay(server, address, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while relay.poll() is None and time.monotonic() < deadline:
+        try:
+            socket.create_connection(address, timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    server.log.error("The event relay did not start on %s:%d", *address)
+    on_exit(server)
+    sys.exit(1)
+
+
+def on_exit(server):
+    if relay is not None and relay.poll() is None:
+        relay.terminate()
+        relay.wait()
@@ -10,11 +10,6 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ("name", "user__username")
     readonly_fields = ("note_count",)
 
-    def note_count(self, obj):
-        return obj.notes.count()
-
-    note_count.short_description = "Number of Notes"
-
 
 @admin.register(Note)
 class NoteAdmin(admin.ModelAdmin):
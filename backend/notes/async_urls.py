@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .async_views import AsyncCategoryListView, AsyncNoteDetailView, AsyncNoteListCreateView
+
+urlpatterns = [
+    path("categories/", AsyncCategoryListView.as_view(), name="async-category-list"),
+    path("notes/", AsyncNoteListCreateView.as_view(), name="async-note-list-create"),
+    path("notes/<int:pk>/", AsyncNoteDetailView.as_view(), name="async-note-detail"),
+]
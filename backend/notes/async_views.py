@@ -0,0 +1,191 @@
+"""
+Async versions of the note and category endpoints (see ``core.async_views``).
+
+They behave like their counterparts in ``notes.views``, including keyset pagination,
+ETags and cached pages, and autosave, and are served under ``/api/async/``.
+"""
+
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import exceptions, status
+from rest_framework.response import Response
+
+from core.async_views import AsyncAPIView
+
+from .caching import aget_stamp, caching_enabled, etag_matches, get_cache, list_etag, page_key, patch_list_headers
+from .coalescing import AsyncFlushAutosavesMixin
+from .events import get_broker
+from .filters import NoteFilter, NoteSearchFilter
+from .models import Category, EventStreamTicket, Note
+from .pagination import KeysetPagination
+from .serializers import CategorySerializer, NoteCardSerializer, NoteSerializer
+from .views import NoteDetailView, is_autosave, is_card_list, note_etag, parse_if_match
+
+
+class AsyncConditionalListMixin:
+    """Async ``ConditionalListMixin``: 304s and cached pages without a thread hop."""
+
+    async def list(self, request):
+        if not caching_enabled():
+            return Response(await self.get_list_data(request))
+        stamp = await aget_stamp(request.user.id)
+        etag = list_etag(stamp)
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache = get_cache()
+            key = page_key(request, type(self).__name__, stamp)
+            data = await cache.aget(key)
+            if data is None:
+                data = await self.get_list_data(request)
+                await cache.aset(key, data, settings.NOTES_CACHE["TIMEOUT"])
+            response = Response(data)
+
+        patch_list_headers(response, etag)
+        return response
+
+
+class AsyncCategoryListView(AsyncConditionalListMixin, AsyncAPIView):
+    async def get(self, request):
+        return await self.list(request)
+
+    async def get_list_data(self, request):
+        categories = [category async for category in Category.objects.filter(user=request.user)]
+        return CategorySerializer(categories, many=True).data
+
+    async def post(self, request):
+        serializer = CategorySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        await sync_to_async(serializer.save)(user=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class AsyncNoteListCreateView(AsyncFlushAutosavesMixin, AsyncConditionalListMixin, AsyncAPIView):
+    filter_backends = [DjangoFilterBackend, NoteSearchFilter]
+    filterset_class = NoteFilter
+    search_fields = ["title", "body"]
+
+    async def get(self, request):
+        return await self.list(request)
+
+    async def get_list_data(self, request):
+        queryset = Note.objects.filter(user=request.user).select_related("category").order_by("-updated_at", "-id")
+        if request.query_params.get("search_mode") == "trigram":
+            # Trigram search sets the similarity threshold on the connection first.
+            queryset = await sync_to_async(self.filter_queryset)(request, queryset)
+        else:
+            queryset = self.filter_queryset(request, queryset)
+        serializer_class = NoteSerializer
+        if is_card_list(request):
+            serializer_class = NoteCardSerializer
+            queryset = NoteCardSerializer.get_queryset(queryset)
+
+        paginator = KeysetPagination()
+        page = paginator.build_page([note async for note in paginator.get_page_queryset(queryset, request)])
+        return paginator.get_paginated_response(serializer_class(page, many=True).data).data
+
+    def filter_queryset(self, request, queryset):
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(request, queryset, self)
+        return queryset
+
+    async def post(self, request):
+        return Response(await sync_to_async(self.create)(request), status=status.HTTP_201_CREATED)
+
+    def create(self, request):
+        serializer = NoteSerializer(data=request.data, context={"request": request})
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user)
+        return serializer.data
+
+
+class AsyncNoteDetailView(AsyncFlushAutosavesMixin, AsyncAPIView):
+    async def get_object(self, request, pk):
+        try:
+            return await Note.objects.filter(user=request.user).select_related("category").aget(pk=pk)
+        except Note.DoesNotExist:
+            raise Http404 from None
+
+    async def get(self, request, pk):
+        return Response(NoteSerializer(await self.get_object(request, pk)).data)
+
+    async def put(self, request, pk):
+        note = await self.get_object(request, pk)
+        return Response(await sync_to_async(self.update)(request, note, partial=False))
+
+    async def patch(self, request, pk):
+        if self.is_autosave(request):
+            version = parse_if_match(request.headers["If-Match"])
+            return await sync_to_async(NoteDetailView(kwargs={"pk": pk}).autosave)(request, version)
+        note = await self.get_object(request, pk)
+        return Response(await sync_to_async(self.update)(request, note, partial=True))
+
+    async def delete(self, request, pk):
+        await (await self.get_object(request, pk)).adelete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def is_autosave(self, request):
+        return is_autosave(request)
+
+    def update(self, request, note, partial):
+        serializer = NoteSerializer(note, data=request.data, partial=partial, context={"request": request})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return serializer.data
+
+    def finalize_response(self, response):
+        # As NoteDetailView, autosaves included, so clients can chain their next If-Match.
+        if isinstance(response, Response) and isinstance(response.data, dict) and "version" in response.data:
+            response["ETag"] = note_etag(response.data["version"])
+        return super().finalize_response(response)
+
+
+class NoteEventStreamView(AsyncAPIView):
+    """
+    Server-sent events with the user's note and category changes (see ``notes.events``).
+
+    Browsers' ``EventSource`` can't send headers, so the stream may also be opened with
+    ``?ticket=`` from ``POST /api/notes/events/ticket/`` (see ``EventStreamTicket``). The
+    stream starts with a ``ready`` event, after which the client should sync once to
+    catch up with changes made while it was disconnected.
+    """
+
+    async def authenticate(self, request):
+        ticket = request.query_params.get("ticket")
+        if ticket is None:
+            return await super().authenticate(request)
+        user = await EventStreamTicket.aredeem(ticket)
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed("Invalid or expired stream ticket.")
+        request.user, request.auth = user, None
+
+    async def get(self, request):
+        subscription = get_broker().subscribe(request.user.id)
+        response = StreamingHttpResponse(self.stream(subscription), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # Tell nginx not to buffer the stream.
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def stream(self, subscription):
+        heartbeat = settings.NOTES_EVENTS["HEARTBEAT"]
+        try:
+            yield self.encode({"type": "ready"})
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), heartbeat)
+                except TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                yield self.encode(event)
+        finally:
+            subscription.close()
+
+    @staticmethod
+    def encode(event):
+        return f"event: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n".encode()
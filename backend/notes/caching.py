@@ -0,0 +1,130 @@
+"""
+Conditional GETs and cached pages for the list endpoints.
+
+Every user has a version stamp in the cache, replaced whenever one of their notes or
+categories changes (see ``bump``). List responses carry it as a weak ETag, so an
+unchanged list is answered with 304 without touching the database, and serialized pages
+are cached under it, so a stamp change makes every cached page of that user unreachable
+at once.
+
+Stamps must live in a cache shared by all workers (``NOTES_CACHE["ALIAS"]``): a worker
+using a process-local cache never sees the bumps made by the others and would keep
+answering with the list from before their writes. So with the default local-memory
+cache, lists are served without ETags or cached pages, unless ``NOTES_CACHE["ENABLED"]``
+says otherwise (e.g. for a single worker).
+"""
+
+import hashlib
+import secrets
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def get_cache():
+    return caches[settings.NOTES_CACHE["ALIAS"]]
+
+
+def _stamp_key(user_id):
+    return f"notes:stamp:{user_id}"
+
+
+def caching_enabled():
+    """``NOTES_CACHE["ENABLED"]``, or by default whether the cache is shared by all workers."""
+    enabled = settings.NOTES_CACHE["ENABLED"]
+    if enabled is None:
+        return not isinstance(get_cache(), LocMemCache)
+    return enabled
+
+
+def get_stamp(user_id):
+    cache = get_cache()
+    stamp = cache.get(_stamp_key(user_id))
+    if stamp is None:
+        # First request, or the stamp was evicted: anything cached under an old stamp is
+        # unreachable anyway.
+        cache.add(_stamp_key(user_id), secrets.token_hex(8), None)
+        stamp = cache.get(_stamp_key(user_id))
+    return stamp
+
+
+async def aget_stamp(user_id):
+    cache = get_cache()
+    stamp = await cache.aget(_stamp_key(user_id))
+    if stamp is None:
+        await cache.aadd(_stamp_key(user_id), secrets.token_hex(8), None)
+        stamp = await cache.aget(_stamp_key(user_id))
+    return stamp
+
+
+def bump(*user_ids):
+    """
+    Give users a new stamp, invalidating their ETags and cached pages.
+
+    Inside a transaction the stamp is replaced again on commit, so that a page read by
+    another request before the commit isn't left cached under the new stamp.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids or not caching_enabled():
+        return
+
+    def replace():
+        get_cache().set_many({_stamp_key(user_id): secrets.token_hex(8) for user_id in user_ids}, None)
+
+    replace()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(replace)
+
+
+def list_etag(stamp):
+    return f'W/"{stamp}"'
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def page_key(request, view_name, stamp):
+    url = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+    return f"notes:page:{request.user.id}:{stamp}:{view_name}:{url}"
+
+
+def patch_list_headers(response, etag):
+    response["ETag"] = etag
+    patch_vary_headers(response, ["Authorization"])
+    patch_cache_control(response, private=True, no_cache=True)
+
+
+class ConditionalListMixin:
+    """
+    Answer ``list()`` from the user's stamp: 304 for a matching ``If-None-Match``,
+    otherwise the cached page for the request URL, serializing only on a miss.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not caching_enabled():
+            return super().list(request, *args, **kwargs)
+        stamp = get_stamp(request.user.id)
+        etag = list_etag(stamp)
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache = get_cache()
+            key = page_key(request, type(self).__name__, stamp)
+            data = cache.get(key)
+            if data is None:
+                response = super().list(request, *args, **kwargs)
+                cache.set(key, response.data, settings.NOTES_CACHE["TIMEOUT"])
+            else:
+                response = Response(data)
+
+        patch_list_headers(response, etag)
+        return response
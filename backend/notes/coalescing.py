@@ -0,0 +1,186 @@
+"""
+Write coalescing for autosaves.
+
+While a note is being edited, autosaves after the first are merged into a pending entry
+in this process instead of each running an UPDATE. Pending changes are written in one
+UPDATE per note every ``FLUSH_INTERVAL`` seconds, and before any other request of the
+same user reads or writes notes, so the user always reads their own writes. Other writes
+(full updates, moves, bulk operations, deletes) change versions behind the buffer, so
+the user's entries are forgotten once flushed and the next autosave starts afresh from
+the database.
+
+The buffer is process-local: it is only safe when all of a user's requests reach the
+same worker process (a single worker, or sticky routing). If another process changes a
+note first, the pending changes lose the version check at flush time, are dropped and
+counted as conflicts.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from rest_framework.permissions import SAFE_METHODS
+
+from core import metrics
+
+from .models import Note
+
+logger = logging.getLogger(__name__)
+
+absorbed_writes = metrics.counter("notes_autosave_absorbed_total", "Autosaves merged into a pending write")
+direct_writes = metrics.counter("notes_autosave_direct_total", "Autosaves written straight to the database")
+flushed_writes = metrics.counter("notes_autosave_flushed_total", "Pending autosaves written to the database")
+conflicts = metrics.counter("notes_autosave_conflicts_total", "Pending autosaves dropped on a version conflict")
+
+
+class StaleVersion(Exception):
+    def __init__(self, version):
+        super().__init__(version)
+        self.version = version
+
+
+@dataclass
+class PendingWrite:
+    user_id: int
+    base_version: int  # Version stored in the database
+    version: int  # Version clients have been given
+    updated_at: datetime
+    changes: dict = field(default_factory=dict)
+
+
+class AutosaveBuffer:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        # Held for the whole of a flush, so a reader's flush waits for an in-flight one.
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+
+    @property
+    def enabled(self):
+        return settings.NOTES_AUTOSAVE["COALESCE"]
+
+    def absorb(self, note_id, user_id, version, changes):
+        """
+        Merge an autosave into the note's pending entry.
+
+        Returns the new ``(version, updated_at)``, or ``None`` when the note has no entry;
+        the caller then writes to the database and calls ``track()``. Raises
+        ``StaleVersion`` if ``version`` is not the note's current version.
+        """
+        with self._lock:
+            entry = self._entries.get(note_id)
+            if entry is None or entry.user_id != user_id:
+                return None
+            if entry.version != version:
+                raise StaleVersion(entry.version)
+            entry.changes.update(changes)
+            entry.version += 1
+            entry.updated_at = timezone.now()
+            result = entry.version, entry.updated_at
+        absorbed_writes.inc()
+        return result
+
+    def track(self, note_id, user_id, version, updated_at):
+        """Start coalescing a note after an autosave wrote ``version`` to the database."""
+        with self._lock:
+            self._entries[note_id] = PendingWrite(user_id, version, version, updated_at)
+        direct_writes.inc()
+        self._ensure_flusher()
+
+    def flush(self, user_id=None, forget=False):
+        """
+        Write pending changes to the database.
+
+        With ``user_id`` only that user's notes are flushed, and with ``forget`` they
+        also stop being buffered. A full flush also forgets notes that had no new
+        changes since the previous one.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = []
+                for note_id, entry in list(self._entries.items()):
+                    if user_id is not None and entry.user_id != user_id:
+                        continue
+                    changed = bool(entry.changes)
+                    if changed:
+                        batch.append(
+                            (note_id, entry.user_id, entry.base_version, entry.version, entry.updated_at, entry.changes)
+                        )
+                        entry.base_version = entry.version
+                        entry.changes = {}
+                    if forget or (user_id is None and not changed):
+                        del self._entries[note_id]
+
+            for note_id, owner_id, base_version, version, updated_at, changes in batch:
+                written = Note.objects.filter(pk=note_id, user_id=owner_id, version=base_version).update(
+                    **changes, version=version, updated_at=updated_at
+                )
+                if written:
+                    flushed_writes.inc()
+                    continue
+                conflicts.inc()
+                logger.warning("Dropped pending autosave for note %s: version %s is stale", note_id, base_version)
+                with self._lock:
+                    self._entries.pop(note_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _ensure_flusher(self):
+        interval = settings.NOTES_AUTOSAVE["FLUSH_INTERVAL"]
+        if interval <= 0 or (self._flusher is not None and self._flusher.is_alive()):
+            return
+        with self._lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._run, args=(interval,), name="autosave-flush", daemon=True)
+                self._flusher.start()
+                atexit.register(self.flush)
+
+    def _run(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Autosave flush failed")
+            finally:
+                close_old_connections()
+
+
+buffer = AutosaveBuffer()
+
+
+class FlushAutosavesMixin:
+    """
+    Flush the user's pending autosaves before a view reads or writes their notes, and
+    forget them too before it writes.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if buffer.enabled and request.user.is_authenticated and not self.is_autosave(request):
+            buffer.flush(user_id=request.user.id, forget=request.method not in SAFE_METHODS)
+
+    def is_autosave(self, request):
+        return False
+
+
+class AsyncFlushAutosavesMixin:
+    """``FlushAutosavesMixin`` for ``core.async_views.AsyncAPIView``."""
+
+    async def initial(self, request):
+        await super().initial(request)
+        if buffer.enabled and not self.is_autosave(request):
+            await sync_to_async(buffer.flush)(user_id=request.user.id, forget=request.method not in SAFE_METHODS)
+
+    def is_autosave(self, request):
+        return False
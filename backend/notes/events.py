@@ -0,0 +1,261 @@
+"""
+Per-user change events for the push channel (``GET /api/notes/events/``).
+
+Note and category writes publish small events (``{"type": "note.saved", "id": 3}``) once
+their transaction commits; see ``notes.signals``. Events are hints rather than data: a
+client that receives one fetches the changes through delta sync, and one that
+reconnects or gets ``resync`` syncs from its last token. A lost event therefore only
+delays an update until the next one.
+
+Events reach the open streams through a broker, chosen by ``NOTES_EVENTS["BACKEND"]``:
+
+* ``InMemoryBroker`` delivers to streams in the publishing process; enough for a single
+  worker. ``gunicorn.conf.py`` refuses to start more than one worker with it.
+* ``RelayBroker`` sends every event through a relay (``manage.py run_event_relay``) that
+  forwards it to all connected workers, so several workers (or hosts) can share users.
+  It is a local stand-in for a production pub/sub such as Redis. The production image
+  uses it, with the relay started next to the workers by ``gunicorn.conf.py``.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import queue
+import socket
+import threading
+from collections import defaultdict
+from functools import cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    The events of one user for one open stream, consumed on the stream's event loop.
+
+    A consumer that falls ``NOTES_EVENTS["QUEUE_SIZE"]`` events behind gets a single
+    ``resync`` event in place of its backlog.
+    """
+
+    def __init__(self, broker, user_id, loop):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(settings.NOTES_EVENTS["QUEUE_SIZE"])
+
+    def put(self, event):
+        """Queue ``event``; safe to call from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The stream's loop is gone; the subscription is about to be closed.
+            pass
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+def relay_address():
+    """``NOTES_EVENTS["RELAY"]`` as a ``(host, port)`` pair."""
+    host, _, port = settings.NOTES_EVENTS["RELAY"].rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class Broker:
+    """Base class: keeps this process's subscriptions and delivers events to them."""
+
+    # Whether events only reach streams in the publishing process
+    process_local = False
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        """Subscribe to ``user_id``'s events; call from the event loop of the consumer."""
+        subscription = Subscription(self, user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def publish(self, user_id, event):
+        """Send ``event`` to every stream of ``user_id``, in any process using this broker."""
+        raise NotImplementedError
+
+    def deliver(self, user_id, event):
+        """Hand ``event`` to the streams of ``user_id`` in this process."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+
+class InMemoryBroker(Broker):
+    process_local = True
+
+    def publish(self, user_id, event):
+        self.deliver(user_id, event)
+
+
+class RelayBroker(Broker):
+    """
+    Publishes through a relay at ``NOTES_EVENTS["RELAY"]`` (``host:port``) and delivers
+    what the relay forwards, including this process's own events.
+
+    A single connection is used for both directions. It is opened on first use and
+    reopened after a failure. ``publish()`` only queues the event for a sender thread, so
+    commits never wait on the relay; events are dropped when
+    ``NOTES_EVENTS["SEND_QUEUE_SIZE"]`` are already waiting, or when the relay has been
+    down for ``reconnect_delay`` seconds.
+    """
+
+    reconnect_delay = 1.0
+
+    def __init__(self):
+        super().__init__()
+        self.address = relay_address()
+        self._socket = None
+        self._send_lock = threading.Lock()
+        self._outbox = queue.Queue(settings.NOTES_EVENTS["SEND_QUEUE_SIZE"])
+        self._connected = threading.Event()
+        self._closed = threading.Event()
+        self._threads = []
+        self._start_lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        self.start()
+        return super().subscribe(user_id)
+
+    def publish(self, user_id, event):
+        self.start()
+        line = json.dumps({"user": user_id, "event": event}, separators=(",", ":")).encode() + b"\n"
+        try:
+            self._outbox.put_nowait(line)
+        except queue.Full:
+            logger.warning("Event relay send queue full, dropped %s for user %s", event.get("type"), user_id)
+
+    def close(self):
+        self._closed.set()
+        with self._send_lock, contextlib.suppress(OSError):
+            if self._socket is not None:
+                self._socket.shutdown(socket.SHUT_RDWR)
+
+    def start(self):
+        with self._start_lock:
+            if not self._threads:
+                for target, name in ((self._read, "event-relay"), (self._send, "event-relay-send")):
+                    thread = threading.Thread(target=target, name=name, daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+
+    def _send(self):
+        while not self._closed.is_set():
+            try:
+                lines = [self._outbox.get(timeout=self.reconnect_delay)]
+            except queue.Empty:
+                continue
+            # Whatever else is waiting goes out in the same write.
+            with contextlib.suppress(queue.Empty):
+                while True:
+                    lines.append(self._outbox.get_nowait())
+            if not self._connected.wait(timeout=self.reconnect_delay):
+                logger.warning("Event relay unavailable, dropped %d events", len(lines))
+                continue
+            with self._send_lock:
+                try:
+                    self._socket.sendall(b"".join(lines))
+                except OSError:
+                    logger.warning("Event relay unavailable, dropped %d events", len(lines))
+
+    def _read(self):
+        while not self._closed.is_set():
+            try:
+                with socket.create_connection(self.address) as connection:
+                    self._socket = connection
+                    self._connected.set()
+                    for line in connection.makefile("rb"):
+                        message = json.loads(line)
+                        self.deliver(message["user"], message["event"])
+            except (OSError, ValueError, KeyError) as exc:
+                if not self._closed.is_set():
+                    logger.warning("Event relay connection lost: %s", exc)
+            self._connected.clear()
+            self._closed.wait(self.reconnect_delay)
+
+
+async def run_relay(host, port, started=None):
+    """Forward every line received from a worker to all connected workers."""
+    writers = set()
+
+    async def handle(reader, writer):
+        writers.add(writer)
+        try:
+            while line := await reader.readline():
+                for peer in list(writers):
+                    peer.write(line)
+        except ConnectionError:
+            pass
+        finally:
+            writers.discard(writer)
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    if started is not None:
+        started(server)
+    async with server:
+        await server.serve_forever()
+
+
+@cache
+def get_broker():
+    return import_string(settings.NOTES_EVENTS["BACKEND"])()
+
+
+@receiver(setting_changed)
+def reset_broker(setting, **kwargs):
+    if setting == "NOTES_EVENTS":
+        get_broker.cache_clear()
+
+
+def publish(user_ids, event):
+    """Publish ``event`` to ``user_ids`` once the current transaction commits."""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+
+    def send():
+        broker = get_broker()
+        for user_id in user_ids:
+            broker.publish(user_id, event)
+
+    transaction.on_commit(send)
@@ -1,11 +1,135 @@
+import re
+
 import django_filters
+from django import forms
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Greatest, Lower
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import SearchFilter
+
+from .models import Category, Note
+
 
-from .models import Note
+class IdInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    field_class = forms.IntegerField
 
 
 class NoteFilter(django_filters.FilterSet):
-    category = django_filters.CharFilter(field_name="category__name", lookup_expr="iexact")
+    """
+    Category and date-range filters.
+
+    ``category_id__in`` takes comma-separated category ids and ``category`` a category
+    name (case-insensitive). Both are served by the ``(user, category, updated_at)`` index;
+    names are first resolved to ids through the ``(user, LOWER(name))`` index.
+
+    Ranges take ISO 8601 dates or datetimes and are half-open: ``*_after`` is inclusive and
+    ``*_before`` exclusive. They are served by the ``(user, updated_at)`` and
+    ``(user, created_at)`` indexes.
+    """
+
+    category = django_filters.CharFilter(method="filter_category_name")
+    category_id__in = IdInFilter(field_name="category_id", lookup_expr="in")
+    updated_after = django_filters.DateTimeFilter(field_name="updated_at", lookup_expr="gte")
+    updated_before = django_filters.DateTimeFilter(field_name="updated_at", lookup_expr="lt")
+    created_after = django_filters.DateTimeFilter(field_name="created_at", lookup_expr="gte")
+    created_before = django_filters.DateTimeFilter(field_name="created_at", lookup_expr="lt")
 
     class Meta:
         model = Note
-        fields = ["category"]
+        fields = ["category", "category_id__in", "updated_after", "updated_before", "created_after", "created_before"]
+
+    def filter_category_name(self, queryset, name, value):
+        # A join on category__name__iexact compares UPPER(name) row by row; the subquery
+        # looks the ids up in the functional index instead.
+        categories = (
+            Category.objects.filter(user=self.request.user)
+            .alias(name_lower=Lower("name"))
+            .filter(name_lower=Lower(Value(value)))
+        )
+        return queryset.filter(category__in=categories.values("pk"))
+
+
+class NoteSearchFilter(SearchFilter):
+    """
+    Ranked note search on PostgreSQL, in one of two modes selected by ``search_mode``.
+
+    ``fulltext`` (the default) matches the generated ``search_vector`` column through its
+    GIN index. Every term is matched as a prefix so results narrow while the user is
+    typing, and title matches rank first.
+
+    ``trigram`` matches partial words, code fragments and typos through the ``pg_trgm``
+    GIN indexes on ``title`` and ``body``, ordered by word similarity. Rows below the
+    similarity threshold (``NOTES_SEARCH["TRIGRAM_THRESHOLD"]`` or the ``threshold``
+    parameter) are discarded by the index itself.
+
+    Other databases, such as the SQLite test settings, fall back to ``SearchFilter``
+    over the view's ``search_fields`` in either mode.
+    """
+
+    search_mode_param = "search_mode"
+    threshold_param = "threshold"
+    search_modes = ("fulltext", "trigram")
+    search_config = "english"
+
+    def filter_queryset(self, request, queryset, view):
+        mode = self.get_search_mode(request)
+        if connections[queryset.db].vendor != "postgresql":
+            return super().filter_queryset(request, queryset, view)
+
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        if mode == "trigram":
+            return self.trigram_search(queryset, " ".join(terms), self.get_threshold(request))
+        return self.fulltext_search(queryset, terms)
+
+    def get_search_mode(self, request):
+        mode = request.query_params.get(self.search_mode_param) or self.search_modes[0]
+        if mode not in self.search_modes:
+            raise ValidationError({self.search_mode_param: f"Must be one of: {', '.join(self.search_modes)}."})
+        return mode
+
+    def get_threshold(self, request):
+        value = request.query_params.get(self.threshold_param)
+        if value is None:
+            return settings.NOTES_SEARCH["TRIGRAM_THRESHOLD"]
+        try:
+            threshold = float(value)
+        except ValueError:
+            threshold = -1
+        if not 0 <= threshold <= 1:
+            raise ValidationError({self.threshold_param: "Must be a number between 0 and 1."})
+        return threshold
+
+    def fulltext_search(self, queryset, terms):
+        tokens = [token for term in terms for token in re.findall(r"\w+", term)]
+        if not tokens:
+            return queryset
+
+        vector = RawSQL(f'"{Note._meta.db_table}"."search_vector"', [], output_field=SearchVectorField())
+        query = SearchQuery(" & ".join(f"{token}:*" for token in tokens), search_type="raw", config=self.search_config)
+        return (
+            queryset.alias(search_vector=vector)
+            .filter(search_vector=query)
+            # ts_rank is a float4; casting keeps the value exact when it round-trips
+            # through a pagination cursor.
+            .annotate(search_rank=Cast(SearchRank(vector, query), FloatField()))
+            .order_by("-search_rank", "-updated_at", "-id")
+        )
+
+    def trigram_search(self, queryset, text, threshold):
+        # The %> operator compares against the session threshold rather than taking it as
+        # an argument; an explicit word_similarity() > x comparison couldn't use the index.
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, false)", [str(threshold)])
+
+        similarity = Greatest(TrigramWordSimilarity(text, "title"), TrigramWordSimilarity(text, "body"))
+        return (
+            queryset.filter(Q(title__trigram_word_similar=text) | Q(body__trigram_word_similar=text))
+            .annotate(search_rank=Cast(similarity, FloatField()))
+            .order_by("-search_rank", "-updated_at", "-id")
+        )
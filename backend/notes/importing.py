@@ -0,0 +1,172 @@
+"""
+Streaming note imports.
+
+Archives are parsed one record at a time and notes are written in ``bulk_create``
+batches of ``NOTES_IMPORT["BATCH_SIZE"]``, so memory use depends on the batch size and
+not on the size of the archive. Categories are looked up, and created if missing, once
+per batch.
+
+Two formats are read:
+
+* ``ndjson``: one JSON object per line with ``title``, ``body`` and optionally
+  ``category`` (a category name), as written by the NDJSON export.
+* ``markdown``: a zip of ``.md`` files. A leading ``# heading`` becomes the title
+  (otherwise the file name does), and the top-level folder names the category.
+"""
+
+import json
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Category, Note
+
+FORMATS = ("ndjson", "markdown")
+MARKDOWN_SUFFIXES = (".md", ".markdown")
+
+
+class ImportFormatError(Exception):
+    """The archive can't be read at all (as opposed to a single bad record)."""
+
+
+def detect_format(filename):
+    return "markdown" if filename.lower().endswith(".zip") else "ndjson"
+
+
+def parse_ndjson(lines):
+    """Yield ``(line number, record or error message)`` for each non-empty line."""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except (UnicodeDecodeError, ValueError):
+            yield number, "Invalid JSON."
+            continue
+        yield number, record if isinstance(record, dict) else "Expected a JSON object."
+
+
+def parse_markdown_zip(file):
+    """Yield ``(member name, record or error message)`` for each Markdown file in a zip."""
+    try:
+        archive = zipfile.ZipFile(file)
+    except zipfile.BadZipFile as exc:
+        raise ImportFormatError("Not a valid zip file.") from exc
+
+    max_size = settings.NOTES_IMPORT["MAX_MARKDOWN_SIZE"]
+    with archive:
+        for member in archive.infolist():
+            path = PurePosixPath(member.filename)
+            if member.is_dir() or path.suffix.lower() not in MARKDOWN_SUFFIXES or path.name.startswith("."):
+                continue
+            if member.file_size > max_size:
+                yield member.filename, f"Larger than {max_size} bytes."
+                continue
+            try:
+                text = archive.read(member).decode("utf-8-sig")
+            except UnicodeDecodeError:
+                yield member.filename, "Not UTF-8 text."
+                continue
+
+            title, body = path.stem, text.strip()
+            first, _, rest = body.partition("\n")
+            if first.startswith("# "):
+                title, body = first[2:].strip(), rest.strip()
+            record = {"title": title, "body": body}
+            if len(path.parts) > 1:
+                record["category"] = path.parts[0]
+            yield member.filename, record
+
+
+def parse(file, import_format):
+    if import_format == "markdown":
+        return parse_markdown_zip(file)
+    return parse_ndjson(file)
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    skipped: int = 0
+    errors: list = field(default_factory=list)
+
+
+class NoteImporter:
+    """
+    Write parsed records for ``user`` in batches.
+
+    ``progress`` is called with the running ``ImportResult`` after every batch. Each batch
+    is committed on its own, so an interrupted import keeps the batches already written.
+    """
+
+    max_errors = 100
+
+    def __init__(self, user, batch_size=None, default_category=None, progress=None):
+        self.user = user
+        self.batch_size = batch_size or settings.NOTES_IMPORT["BATCH_SIZE"]
+        self.default_category = default_category or settings.NOTES_IMPORT["DEFAULT_CATEGORY"]
+        self.progress = progress
+        self.categories = {}
+        self.result = ImportResult()
+        self._batch = []
+
+    def run(self, records):
+        for source, record in records:
+            self.add(source, record)
+        self.flush()
+        return self.result
+
+    def add(self, source, record):
+        error = record if isinstance(record, str) else self.validate(record)
+        if error:
+            self.result.skipped += 1
+            if len(self.result.errors) < self.max_errors:
+                self.result.errors.append({"source": source, "error": error})
+            return
+        category = (record.get("category") or "").strip() or self.default_category
+        self._batch.append((category, record["title"], record["body"]))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def validate(self, record):
+        title, body, category = record.get("title"), record.get("body"), record.get("category")
+        if not isinstance(title, str) or not title.strip():
+            return "A title is required."
+        if len(title) > Note._meta.get_field("title").max_length:
+            return "The title is too long."
+        if not isinstance(body, str) or not body.strip():
+            return "A body is required."
+        if category is not None and (
+            not isinstance(category, str) or len(category) > Category._meta.get_field("name").max_length
+        ):
+            return "Invalid category."
+        return None
+
+    def flush(self):
+        if not self._batch:
+            return
+        with transaction.atomic():
+            self.resolve_categories({category for category, _, _ in self._batch})
+            Note.objects.bulk_create(
+                Note(title=title, body=body, category_id=self.categories[category], user=self.user)
+                for category, title, body in self._batch
+            )
+        self.result.created += len(self._batch)
+        self._batch = []
+        if self.progress is not None:
+            self.progress(self.result)
+
+    def resolve_categories(self, names):
+        missing = names - self.categories.keys()
+        if missing:
+            self.categories.update(Category.objects.filter(user=self.user, name__in=missing).values_list("name", "pk"))
+            missing -= self.categories.keys()
+        if missing:
+            # ignore_conflicts covers categories created concurrently, e.g. through the API.
+            Category.objects.bulk_create(
+                [Category(user=self.user, name=name) for name in missing], ignore_conflicts=True
+            )
+            self.categories.update(Category.objects.filter(user=self.user, name__in=missing).values_list("name", "pk"))
@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.importing import FORMATS, ImportFormatError, NoteImporter, detect_format, parse
+
+
+class Command(BaseCommand):
+    help = "Import notes for a user from an NDJSON file or a zip of Markdown files."
+
+    def add_arguments(self, parser):
+        parser.add_argument("email", help="Email of the user who will own the notes.")
+        parser.add_argument("path", help="File to import.")
+        parser.add_argument("--format", choices=FORMATS, help="Archive format (detected from the file name).")
+        parser.add_argument("--batch-size", type=int, help="Notes inserted per batch.")
+        parser.add_argument("--default-category", help="Category for records that don't name one.")
+
+    def handle(self, *args, email, path, format, batch_size, default_category, **options):
+        try:
+            user = User.objects.get(username=email)
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {email}.") from None
+
+        def progress(result):
+            self.stdout.write(f"Imported {result.created} notes ({result.skipped} skipped)")
+
+        importer = NoteImporter(user, batch_size=batch_size, default_category=default_category, progress=progress)
+        try:
+            with open(path, "rb") as file:
+                result = importer.run(parse(file, format or detect_format(path)))
+        except (OSError, ImportFormatError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        for error in result.errors:
+            self.stderr.write(f"{error['source']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(f"Imported {result.created} notes, skipped {result.skipped}."))
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from notes.models import NoteTombstone
+
+
+class Command(BaseCommand):
+    help = "Delete note tombstones older than NOTES_SYNC['TOMBSTONE_DAYS']."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report expired tombstones without deleting them.")
+
+    def handle(self, *args, dry_run, **options):
+        cutoff = timezone.now() - timedelta(days=settings.NOTES_SYNC["TOMBSTONE_DAYS"])
+        expired = NoteTombstone.objects.filter(deleted_at__lt=cutoff)
+        if dry_run:
+            self.stdout.write(f"Found {expired.count()} expired tombstones.")
+            return
+        deleted, _ = expired.delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired tombstones."))
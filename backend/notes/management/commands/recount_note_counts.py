@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+
+from notes.models import Category
+
+
+class Command(BaseCommand):
+    help = "Recompute Category.note_count from the notes table and repair any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report drifted categories without fixing them.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Categories repaired per transaction.")
+
+    def handle(self, *args, dry_run, batch_size, **options):
+        drifted = list(
+            Category.objects.annotate(actual=Count("notes"))
+            .exclude(note_count=F("actual"))
+            .values_list("pk", flat=True)
+            .order_by("pk")
+        )
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("All note counts are correct."))
+            return
+
+        self.stdout.write(f"Found {len(drifted)} categories with a drifted note count.")
+        if dry_run:
+            return
+
+        for start in range(0, len(drifted), batch_size):
+            with transaction.atomic():
+                Category.objects.filter(pk__in=drifted[start : start + batch_size]).recount_notes()
+        self.stdout.write(self.style.SUCCESS(f"Repaired {len(drifted)} categories."))
@@ -0,0 +1,21 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from notes.events import relay_address, run_relay
+
+
+class Command(BaseCommand):
+    help = "Run the relay that forwards push events between workers using notes.events.RelayBroker."
+
+    def add_arguments(self, parser):
+        host, port = relay_address()
+        parser.add_argument("--host", default=host, help="Interface to listen on.")
+        parser.add_argument("--port", type=int, default=port, help="Port to listen on.")
+
+    def handle(self, *args, host, port, **options):
+        self.stdout.write(f"Relaying note events on {host}:{port}")
+        try:
+            asyncio.run(run_relay(host, port))
+        except KeyboardInterrupt:
+            pass
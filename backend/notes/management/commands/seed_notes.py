@@ -0,0 +1,61 @@
+import os
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from notes.seeding import Seeder
+
+
+class Command(BaseCommand):
+    help = "Create users, categories and notes with realistic sizes for load tests (see notes.seeding)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("notes", type=int, help="Number of notes to create.")
+        parser.add_argument("--users", type=int, default=1000, help="Number of users owning the notes.")
+        parser.add_argument("--categories", type=int, default=5, help="Categories per user.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed creates the same data.")
+        parser.add_argument("--days", type=int, default=365, help="Notes are spread over this many past days.")
+        parser.add_argument(
+            "--email",
+            default="seed-{n}@example.com",
+            help="Email template; {n} is replaced by the user's number (default: seed-{n}@example.com).",
+        )
+        parser.add_argument("--start", type=int, default=1, help="Number of the first user.")
+        parser.add_argument(
+            "--password",
+            help="Password shared by all the users, hashed once. Without it passwords are unusable.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=min(os.cpu_count() or 1, 8),
+            help="Processes writing notes on PostgreSQL; other databases use one.",
+        )
+
+    def handle(self, *args, notes, users, categories, seed, days, email, start, password, workers, **options):
+        if "{n}" not in email:
+            raise CommandError("--email must contain {n}.")
+        if users < 1 or categories < 1:
+            raise CommandError("--users and --categories must be positive.")
+        emails = [email.format(n=n) for n in range(start, start + users)]
+        for first in range(0, users, 1000):
+            if User.objects.filter(username__in=emails[first : first + 1000]).exists():
+                raise CommandError("Some of the users already exist; pick another --email or --start.")
+
+        seeder = Seeder(users, categories, notes, seed=seed, days=days, email=email, start=start, password=password)
+        began = time.monotonic()
+        seeder.create_users()
+        self.stdout.write(f"Created {users} users with {categories} categories each")
+
+        def progress(written):
+            if written % 100_000 < 10_000 or written == notes:
+                rate = written / (time.monotonic() - began)
+                self.stdout.write(f"Created {written} notes ({rate:.0f}/s)")
+
+        seeder.write_all(workers if connection.vendor == "postgresql" else 1, progress)
+        seeder.finish()
+        self.stdout.write(
+            self.style.SUCCESS(f"Created {users} users and {notes} notes in {time.monotonic() - began:.1f}s.")
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notes", "0002_alter_category_color"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="note",
+            index=models.Index(fields=["user", "-updated_at", "-id"], name="note_user_updated_idx"),
+        ),
+    ]
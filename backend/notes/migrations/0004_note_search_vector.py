@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:40
+
+from django.db import migrations
+
+# The tsvector column is maintained by PostgreSQL itself, so it is not declared on the
+# model and is only created on PostgreSQL. Title terms are weighted above body terms.
+CREATE_SEARCH_VECTOR = """
+ALTER TABLE notes_note ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A')
+    || setweight(to_tsvector('english', coalesce(body, '')), 'B')
+) STORED;
+CREATE INDEX note_search_vector_idx ON notes_note USING GIN (search_vector);
+"""
+
+DROP_SEARCH_VECTOR = """
+DROP INDEX IF EXISTS note_search_vector_idx;
+ALTER TABLE notes_note DROP COLUMN IF EXISTS search_vector;
+"""
+
+
+def create_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_SEARCH_VECTOR)
+
+
+def drop_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_SEARCH_VECTOR)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notes", "0003_note_user_updated_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_vector, drop_search_vector),
+    ]
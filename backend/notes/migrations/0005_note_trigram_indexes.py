@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:05
+
+from django.db import migrations
+
+# Like the search vector, these are PostgreSQL-only and created outside the model state.
+CREATE_TRIGRAM_INDEXES = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX note_title_trgm_idx ON notes_note USING GIN (title gin_trgm_ops);
+CREATE INDEX note_body_trgm_idx ON notes_note USING GIN (body gin_trgm_ops);
+"""
+
+DROP_TRIGRAM_INDEXES = """
+DROP INDEX IF EXISTS note_title_trgm_idx;
+DROP INDEX IF EXISTS note_body_trgm_idx;
+"""
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_TRIGRAM_INDEXES)
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_TRIGRAM_INDEXES)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notes", "0004_note_search_vector"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:30
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_note_counts(apps, schema_editor):
+    Category = apps.get_model("notes", "Category")
+    Note = apps.get_model("notes", "Note")
+    actual = (
+        Note.objects.filter(category=OuterRef("pk"))
+        .order_by()
+        .values("category")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    Category.objects.update(note_count=Coalesce(Subquery(actual), 0))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notes", "0005_note_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="note_count",
+            field=models.IntegerField(default=0, editable=False, verbose_name="number of notes"),
+        ),
+        migrations.RunPython(populate_note_counts, migrations.RunPython.noop),
+    ]
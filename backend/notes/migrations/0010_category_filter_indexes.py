@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:25
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notes", "0009_note_user_created_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(
+                models.F("user"), django.db.models.functions.text.Lower("name"), name="category_user_name_lower_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="note",
+            index=models.Index(fields=["user", "category", "-updated_at", "-id"], name="note_user_category_idx"),
+        ),
+    ]
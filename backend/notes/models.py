@@ -1,19 +1,168 @@
+import secrets
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Lookup, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Lower
+from django.db.models.sql.where import AND
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .caching import bump
+
+# Sent by the note writes that don't send post_save (deletes and bulk writes), with the
+# affected ``user_ids`` and the ``event`` to push to them (see notes.events).
+notes_changed = Signal()
+
+
+def scoped_user_ids(queryset):
+    """
+    Return the users a queryset is limited to by a top-level ``user=``/``user__in=``
+    filter, or ``None`` if it isn't.
+    """
+    where = queryset.query.where
+    if where.connector != AND or where.negated:
+        return None
+    user_field = queryset.model._meta.get_field("user")
+    for child in where.children:
+        if not isinstance(child, Lookup) or getattr(child.lhs, "target", None) != user_field:
+            continue
+        if child.lookup_name == "exact":
+            return {child.rhs}
+        if child.lookup_name == "in" and isinstance(child.rhs, (list, tuple, set)):
+            return set(child.rhs)
+    return None
+
+
+class CategoryQuerySet(models.QuerySet):
+    def create_defaults(self, users):
+        """Create the ``NOTES_DEFAULT_CATEGORIES`` of all ``users`` in a single INSERT."""
+        return self.bulk_create(
+            self.model(user=user, **category) for user in users for category in settings.NOTES_DEFAULT_CATEGORIES
+        )
+
+    def adjust_note_counts(self, deltas):
+        """
+        Apply ``{category_id: delta}`` to ``note_count`` in a single UPDATE.
+
+        The increment is computed by the database from the current value, so concurrent
+        writers can't overwrite each other's changes.
+        """
+        deltas = {pk: delta for pk, delta in deltas.items() if pk is not None and delta}
+        if not deltas:
+            return 0
+        change = Case(*(When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()), default=Value(0))
+        return self.filter(pk__in=deltas).update(note_count=F("note_count") + change)
+
+    def recount_notes(self):
+        """Recompute ``note_count`` from the notes table for the categories in this queryset."""
+        actual = (
+            Note.objects.filter(category=OuterRef("pk"))
+            .order_by()
+            .values("category")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        updated = self.update(note_count=Coalesce(Subquery(actual), 0))
+        bump(*self.values_list("user_id", flat=True).distinct().order_by())
+        return updated
 
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="categories")
     color = models.CharField(max_length=9, default="#FFFFFF")  # Hex color code with alpha (#rrggbbaa)
+    # Denormalized count of notes, maintained by Note and NoteQuerySet writes.
+    note_count = models.IntegerField("number of notes", default=0, editable=False)
+
+    objects = CategoryQuerySet.as_manager()
 
     class Meta:
         unique_together = ("user", "name")
+        indexes = [
+            # Serves the case-insensitive category name filter: WHERE user = ? AND LOWER(name) = LOWER(?)
+            models.Index(F("user"), Lower("name"), name="category_user_name_lower_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.user.username})"
 
 
+class NoteQuerySet(models.QuerySet):
+    """
+    Bulk write paths that keep ``Category.note_count`` in step.
+
+    Each method adjusts the affected counters in the same transaction as the write, and
+    bumps the cache stamps of the affected users (see ``notes.caching``).
+    """
+
+    def affected_user_ids(self):
+        user_ids = scoped_user_ids(self)
+        if user_ids is None:
+            user_ids = set(self.order_by().values_list("user_id", flat=True).distinct())
+        return user_ids
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db, savepoint=False):
+            created = super().bulk_create(objs, *args, **kwargs)
+            category_ids = {obj.category_id for obj in objs}
+            if kwargs.get("ignore_conflicts") or kwargs.get("update_conflicts"):
+                # Which rows were actually inserted is unknown, so count them instead.
+                Category.objects.filter(pk__in=category_ids).recount_notes()
+            else:
+                Category.objects.adjust_note_counts(Counter(obj.category_id for obj in objs))
+            bump(*{obj.user_id for obj in objs})
+            notes_changed.send(Note, user_ids={obj.user_id for obj in objs}, event={"type": "notes.changed"})
+        return created
+
+    def update(self, **kwargs):
+        # Any change invalidates the version token clients hold for autosave.
+        kwargs.setdefault("version", F("version") + 1)
+        if "category" not in kwargs and "category_id" not in kwargs:
+            user_ids = self.affected_user_ids()
+            updated = super().update(**kwargs)
+            if updated:
+                bump(*user_ids)
+                notes_changed.send(Note, user_ids=user_ids, event={"type": "notes.changed"})
+            return updated
+
+        target = kwargs.get("category", kwargs.get("category_id"))
+        with transaction.atomic(using=self.db, savepoint=False):
+            rows = list(self.select_for_update().values_list("pk", "category_id", "user_id"))
+            updated = super().update(**kwargs)
+            if hasattr(target, "resolve_expression"):
+                # The new categories are computed by the database (e.g. by bulk_update).
+                moved = self.model._base_manager.using(self.db).filter(pk__in=[pk for pk, _, _ in rows])
+                deltas = Counter(moved.values_list("category_id", flat=True))
+            else:
+                deltas = Counter({target.pk if isinstance(target, Category) else target: updated})
+            deltas.subtract(category_id for _, category_id, _ in rows)
+            Category.objects.adjust_note_counts(deltas)
+            bump(*{user_id for _, _, user_id in rows})
+            notes_changed.send(Note, user_ids={user_id for _, _, user_id in rows}, event={"type": "notes.changed"})
+        return updated
+
+    update.alters_data = True
+
+    def delete(self):
+        with transaction.atomic(using=self.db, savepoint=False):
+            rows = list(self.select_for_update().values_list("pk", "category_id", "user_id"))
+            result = super().delete()
+            previous = Counter(category_id for _, category_id, _ in rows)
+            Category.objects.adjust_note_counts({pk: -count for pk, count in previous.items()})
+            NoteTombstone.objects.bulk_create(NoteTombstone(note_id=pk, user_id=user_id) for pk, _, user_id in rows)
+            bump(*{user_id for _, _, user_id in rows})
+            notes_changed.send(Note, user_ids={user_id for _, _, user_id in rows}, event={"type": "notes.changed"})
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class Note(models.Model):
     title = models.CharField(max_length=200)
     body = models.TextField()
@@ -21,6 +170,113 @@ class Note(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="notes")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped on every write; clients send it back in If-Match to detect stale autosaves.
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    objects = NoteQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Serves the keyset-paginated list: WHERE user = ? ORDER BY updated_at DESC, id DESC,
+            # and updated_after/updated_before ranges on it.
+            models.Index(fields=["user", "-updated_at", "-id"], name="note_user_updated_idx"),
+            # Serves created_after/created_before: WHERE user = ? AND created_at BETWEEN ...
+            models.Index(fields=["user", "created_at"], name="note_user_created_idx"),
+            # Serves the category filters: WHERE user = ? AND category IN (...) ORDER BY updated_at DESC, id DESC
+            models.Index(fields=["user", "category", "-updated_at", "-id"], name="note_user_category_idx"),
+        ]
 
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        moves = update_fields is None or "category" in update_fields or "category_id" in update_fields
+        adding = self._state.adding
+        if not adding:
+            self.version += 1
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "version"}
+
+        using = kwargs.get("using") or self._state.db
+        with transaction.atomic(using=using, savepoint=False):
+            if not adding and moves:
+                # The stored category, locked until the save commits: another request may
+                # have moved the note since this instance was loaded.
+                stored = type(self)._base_manager.using(using).select_for_update().filter(pk=self.pk)
+                previous = stored.values_list("category_id", flat=True).first()
+            super().save(*args, **kwargs)
+            if adding:
+                Category.objects.adjust_note_counts({self.category_id: 1})
+            elif moves and previous != self.category_id:
+                Category.objects.adjust_note_counts({previous: -1, self.category_id: 1})
+            bump(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        pk, category_id = self.pk, self.category_id
+        with transaction.atomic(using=kwargs.get("using") or self._state.db, savepoint=False):
+            result = super().delete(*args, **kwargs)
+            Category.objects.adjust_note_counts({category_id: -1})
+            NoteTombstone.objects.create(note_id=pk, user_id=self.user_id)
+            bump(self.user_id)
+            notes_changed.send(Note, user_ids=[self.user_id], event={"type": "note.deleted", "id": pk})
+        return result
+
+
+class NoteTombstone(models.Model):
+    """
+    Records a deleted note so that syncing clients learn about the deletion.
+
+    Written by every delete path, including notes deleted along with their category.
+    Old tombstones are removed by the ``prune_note_tombstones`` command.
+    """
+
+    note_id = models.BigIntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Serves the sync query: WHERE user = ? AND deleted_at > ?
+            models.Index(fields=["user", "deleted_at"], name="tombstone_user_deleted_idx"),
+        ]
+
+    def __str__(self):
+        return f"Deleted note {self.note_id}"
+
+
+class EventStreamTicket(models.Model):
+    """
+    A short-lived, single-use credential for the event stream (``GET /api/notes/events/``).
+
+    ``EventSource`` can't send headers, so the stream is opened with a ticket in the query
+    string rather than the API token, which would end up in access logs and browser
+    history. Tickets expire after ``NOTES_EVENTS["TICKET_TTL"]`` seconds; expired ones
+    are removed as new ones are issued.
+    """
+
+    key = models.CharField(max_length=64, primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    @staticmethod
+    def cutoff():
+        return timezone.now() - timedelta(seconds=settings.NOTES_EVENTS["TICKET_TTL"])
+
+    @classmethod
+    def issue(cls, user):
+        cls.objects.filter(created_at__lt=cls.cutoff()).delete()
+        return cls.objects.create(key=secrets.token_urlsafe(32), user=user)
+
+    @classmethod
+    async def aredeem(cls, key):
+        """Use up the ticket ``key``; return its user, or ``None`` if it is unknown, used or expired."""
+        ticket = await cls.objects.select_related("user").filter(key=key, created_at__gte=cls.cutoff()).afirst()
+        if ticket is None:
+            return None
+        # Of two requests racing with the same ticket, only one deletes it.
+        deleted, _ = await cls.objects.filter(key=key).adelete()
+        return ticket.user if deleted else None
+
+    def __str__(self):
+        return f"Event stream ticket for {self.user}"
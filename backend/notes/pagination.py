@@ -0,0 +1,222 @@
+import base64
+import json
+from collections import OrderedDict
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_token(payload):
+    """Encode a JSON payload as an opaque URL-safe token."""
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_token(encoded):
+    """Decode a token made by ``encode_token``. Raises ``ValueError`` if it is malformed."""
+    try:
+        padded = encoded + "=" * (-len(encoded) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Malformed token") from exc
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over the queryset ordering.
+
+    Unlike offset pagination, every page is fetched with a ``WHERE (key) < (last key)``
+    predicate that an index on the ordering columns can satisfy directly, so the cost of
+    a page depends only on the page size and never on how deep the client has scrolled.
+
+    The ordering is taken from the queryset (so filter backends may rank results) and
+    falls back to ``ordering``. The last ordering field must be unique.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+    ordering = ("-updated_at", "-id")
+
+    @property
+    def page_size(self):
+        return settings.NOTES_PAGINATION["PAGE_SIZE"]
+
+    @property
+    def max_page_size(self):
+        return settings.NOTES_PAGINATION["MAX_PAGE_SIZE"]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request)
+        if page_queryset is None:
+            return None
+        return self.build_page(list(page_queryset))
+
+    def get_page_queryset(self, queryset, request):
+        """
+        Return the lazy queryset for the requested page (``page_size + 1`` rows).
+
+        Split from ``build_page`` so that callers can evaluate it however they need to.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.limit = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.key, self.reverse, inclusive = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [self._invert(field) for field in ordering]
+
+        queryset = queryset.order_by(*ordering)
+        if self.key is not None:
+            try:
+                queryset = queryset.filter(self.seek_filter(ordering, self.key, inclusive))
+            except (ValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message) from None
+        return queryset[: self.limit + 1]
+
+    def build_page(self, rows):
+        has_more = len(rows) > self.limit
+        page = rows[: self.limit]
+
+        if self.reverse:
+            page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.key is not None
+
+        self.page = page
+        return page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        ordering = [field for field in queryset.query.order_by if isinstance(field, str)]
+        ordering = ordering or list(self.ordering)
+        if ordering[-1].lstrip("-") not in ("id", "pk"):
+            descending = ordering[0].startswith("-")
+            ordering.append("-id" if descending else "id")
+        return ordering
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self._key_of(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Paged past the end: the previous page is the one ending at our cursor.
+            return self.encode_cursor(self.key, reverse=True, inclusive=True)
+        return self.encode_cursor(self._key_of(self.page[0]), reverse=True)
+
+    def encode_cursor(self, key, reverse, inclusive=False):
+        payload = {"k": [self._encode_value(value) for value in key]}
+        if reverse:
+            payload["r"] = 1
+        if inclusive:
+            payload["i"] = 1
+        return replace_query_param(self.base_url, self.cursor_query_param, encode_token(payload))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False, False
+        try:
+            payload = decode_token(encoded)
+            key = payload["k"]
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message) from None
+        if not isinstance(key, list) or len(key) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return key, bool(payload.get("r")), bool(payload.get("i"))
+
+    @staticmethod
+    def seek_filter(ordering, key, inclusive=False):
+        """Build ``(a, b, c) > (x, y, z)`` as ``a > x OR (a = x AND b > y) OR ...``."""
+        condition = Q()
+        equal = Q()
+        for index, (field, value) in enumerate(zip(ordering, key, strict=True)):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            if inclusive and index == len(ordering) - 1:
+                lookup += "e"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+
+        # The OR expansion alone is only usable as a filter, which would make the planner
+        # walk the index from the top. The redundant bound on the leading column gives it
+        # an index condition to seek on.
+        first = ordering[0]
+        bound = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": key[0]})
+        return bound & condition
+
+    def _key_of(self, instance):
+        return [getattr(instance, field.lstrip("-")) for field in self.ordering]
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def _encode_value(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
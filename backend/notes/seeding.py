@@ -0,0 +1,216 @@
+"""
+Synthetic notes for load tests and benchmarks (``manage.py seed_notes``).
+
+The data aims at the shape of real usage rather than uniform noise:
+
+* a few users own most notes, and in each user's list the first categories get most
+  of them (both Zipf-like);
+* body lengths are log-normal: most notes are a paragraph or two, a few are long
+  documents; words follow a Zipf distribution over a fixed vocabulary;
+* notes were created over the past ``days``, more of them recently, and most have been
+  edited since, with ``version`` bumped accordingly.
+
+Notes are generated in chunks of ``CHUNK_SIZE``, each from its own random generator
+seeded from ``seed`` and the chunk number, so a seed always produces the same notes
+whatever the number of worker processes. Chunks are written with ``COPY`` on
+PostgreSQL and with batched INSERTs elsewhere. Both bypass ``Note``'s bookkeeping
+(note counts, cache stamps, push events) for speed; ``Seeder.finish()`` recounts the
+categories once at the end.
+"""
+
+import csv
+import io
+import itertools
+import multiprocessing
+import random
+from dataclasses import dataclass, field
+from datetime import timedelta
+from functools import cached_property
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from .models import Category, Note
+
+CHUNK_SIZE = 10_000
+
+VOCABULARY = (
+    "the to and a of in is for on that with it this be as at have from or you we not are "
+    "meeting project notes plan team week today tomorrow review update call idea list todo "
+    "draft check follow send email client budget report design deadline sprint task issue "
+    "release deploy fix bug test feature roadmap goal question answer research paper read "
+    "book chapter lecture exam homework class study summary outline reminder groceries milk "
+    "bread coffee recipe dinner lunch travel flight hotel booking trip weekend family friend "
+    "birthday gift doctor appointment gym workout running journal thoughts feeling morning "
+    "evening garden movie music podcast article link password account invoice payment tax "
+    "contract meeting agenda minutes decision action owner status blocked progress done "
+    "database query index cache latency migration server api endpoint frontend backend"
+).split()
+
+CATEGORIES = [
+    ("Random Thoughts", "#FFCCB6"),
+    ("School", "#FDFD96"),
+    ("Personal", "#B8E0D2"),
+    ("Work", "#C8CFA0"),
+    ("Ideas", "#EF9C66"),
+    ("Recipes", "#FCDC94"),
+    ("Travel", "#B5C0D0"),
+    ("Reading", "#E6A4B4"),
+    ("Projects", "#A5DD9B"),
+    ("Journal", "#D6C7F7"),
+]
+
+COLUMNS = ("title", "body", "user", "category", "created_at", "updated_at", "version")
+
+
+def zipf_weights(count, exponent=1.0):
+    """Cumulative weights of ``count`` ranks under a Zipf distribution, for ``random.choices``."""
+    return list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+
+WORD_WEIGHTS = zipf_weights(len(VOCABULARY))
+
+
+@dataclass
+class Seeder:
+    """Creates users, their categories and ``notes`` notes among them."""
+
+    users: int
+    categories: int
+    notes: int
+    seed: int = 0
+    days: int = 365
+    email: str = "seed-{n}@example.com"
+    start: int = 1
+    password: str = None
+    # Filled in by create_users()
+    owners: list = field(default_factory=list, repr=False)
+
+    def create_users(self, batch_size=1000):
+        """Create the users and their categories; return the number of users created."""
+        encoded = make_password(self.password)
+        for first in range(self.start, self.start + self.users, batch_size):
+            emails = [self.email.format(n=n) for n in range(first, min(first + batch_size, self.start + self.users))]
+            with transaction.atomic():
+                users = User.objects.bulk_create(
+                    User(username=email, email=email, password=encoded) for email in emails
+                )
+                categories = Category.objects.bulk_create(
+                    Category(user=user, name=name, color=color)
+                    for user in users
+                    for name, color in self.category_names()
+                )
+            for i, user in enumerate(users):
+                owned = categories[i * self.categories : (i + 1) * self.categories]
+                self.owners.append((user.id, [category.id for category in owned]))
+        return len(self.owners)
+
+    def category_names(self):
+        for i in range(self.categories):
+            name, color = CATEGORIES[i % len(CATEGORIES)]
+            yield (name if i < len(CATEGORIES) else f"{name} {i // len(CATEGORIES) + 1}"), color
+
+    @cached_property
+    def owner_weights(self):
+        return zipf_weights(len(self.owners), 0.8)
+
+    def chunks(self):
+        return range((self.notes + CHUNK_SIZE - 1) // CHUNK_SIZE)
+
+    def generate(self, chunk, now):
+        """Yield the rows of ``chunk`` as tuples of ``COLUMNS``."""
+        rng = random.Random(f"{self.seed}:{chunk}")
+        owner_weights = self.owner_weights
+        category_weights = zipf_weights(self.categories)
+        span = self.days * 86400
+        count = min(CHUNK_SIZE, self.notes - chunk * CHUNK_SIZE)
+        for user_id, categories in rng.choices(self.owners, cum_weights=owner_weights, k=count):
+            title_words = min(8, 1 + int(rng.expovariate(0.5)))
+            body_words = max(1, min(5000, round(rng.lognormvariate(4.0, 1.0))))
+            age = rng.random() ** 2 * span
+            edited = rng.random() < 0.6
+            created_at = now - timedelta(seconds=age)
+            yield (
+                " ".join(rng.choices(VOCABULARY, cum_weights=WORD_WEIGHTS, k=title_words)).capitalize(),
+                " ".join(rng.choices(VOCABULARY, cum_weights=WORD_WEIGHTS, k=body_words)),
+                user_id,
+                rng.choices(categories, cum_weights=category_weights)[0],
+                created_at,
+                created_at + timedelta(seconds=rng.random() * age) if edited else created_at,
+                1 + rng.randint(1, 20) if edited else 1,
+            )
+
+    def write(self, chunk, now):
+        """Insert the notes of ``chunk`` in one transaction; return how many were written."""
+        rows = list(self.generate(chunk, now))
+        table = connection.ops.quote_name(Note._meta.db_table)
+        columns = ", ".join(connection.ops.quote_name(Note._meta.get_field(name).column) for name in COLUMNS)
+        with transaction.atomic(), connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                self.copy(cursor, f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", rows)
+            else:
+                placeholders = ", ".join(["%s"] * len(COLUMNS))
+                adapt = connection.ops.adapt_datetimefield_value
+                cursor.executemany(
+                    f"INSERT INTO {table} ({columns}) VALUES ({placeholders})",
+                    [(*row[:4], adapt(row[4]), adapt(row[5]), row[6]) for row in rows],
+                )
+        return len(rows)
+
+    @staticmethod
+    def copy(cursor, sql, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        if hasattr(cursor.cursor, "copy_expert"):  # psycopg2
+            cursor.cursor.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with cursor.cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+    def write_all(self, workers=1, progress=None):
+        """Write every chunk, with ``workers`` processes on PostgreSQL; return the notes written."""
+        global _seeder
+
+        now = timezone.now()
+        if workers > 1 and connection.vendor == "postgresql" and "fork" in multiprocessing.get_all_start_methods():
+            # Forked workers inherit the seeder (and its users) instead of receiving it with
+            # every chunk, and each opens its own connection.
+            _seeder = self
+            self.owner_weights  # noqa: B018 - computed once, before forking
+            connections.close_all()
+            try:
+                with multiprocessing.get_context("fork").Pool(workers) as pool:
+                    results = pool.imap_unordered(_write_chunk, ((chunk, now) for chunk in self.chunks()))
+                    return self._tally(results, progress)
+            finally:
+                _seeder = None
+        # SQLite allows one writer at a time, so other databases are written in-process.
+        return self._tally((self.write(chunk, now) for chunk in self.chunks()), progress)
+
+    def _tally(self, results, progress):
+        written = 0
+        for count in results:
+            written += count
+            if progress is not None:
+                progress(written)
+        return written
+
+    def finish(self, batch_size=1000):
+        """Recompute the note counts of the seeded categories."""
+        for first in range(0, len(self.owners), batch_size):
+            user_ids = [user_id for user_id, _ in self.owners[first : first + batch_size]]
+            with transaction.atomic():
+                Category.objects.filter(user__in=user_ids).recount_notes()
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(Note._meta.db_table)}")
+
+
+_seeder = None
+
+
+def _write_chunk(args):
+    return _seeder.write(*args)
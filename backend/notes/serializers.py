@@ -1,9 +1,13 @@
+from django.conf import settings
+from django.db.models.functions import Left
 from rest_framework import serializers
 
+from core.instrumentation import TimedSerializerMixin, serializing
+
 from .models import Category, Note
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     note_count = serializers.IntegerField(read_only=True)
 
     class Meta:
@@ -11,7 +15,7 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ["id", "name", "color", "note_count"]
 
 
-class NoteSerializer(serializers.ModelSerializer):
+class NoteSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all(), source="category", write_only=True
     )
@@ -19,11 +23,12 @@ class NoteSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Note
-        fields = ["id", "title", "body", "category", "category_id", "created_at", "updated_at"]
-        read_only_fields = ["created_at", "updated_at"]
+        fields = ["id", "title", "body", "category", "category_id", "version", "created_at", "updated_at"]
+        read_only_fields = ["version", "created_at", "updated_at"]
 
     def validate_category_id(self, value):
-        if value.user != self.context["request"].user:
+        # Compare ids so validation doesn't fetch the category's user.
+        if value.user_id != self.context["request"].user.id:
             raise serializers.ValidationError("You cannot create a note in a category that does not belong to you.")
         return value
 
@@ -31,3 +36,113 @@ class NoteSerializer(serializers.ModelSerializer):
         user = self.context["request"].user
         validated_data["user"] = user
         return super().create(validated_data)
+
+
+class NoteCardSerializer:
+    """
+    Read-only note representation for dashboard cards (``?fields=card``).
+
+    Notes must come from ``get_queryset()``, which loads only the card's columns and the
+    start of the body, cut in SQL, so full bodies never leave the database. Built by hand
+    rather than as a ``ModelSerializer``: a list page is serialized at a fraction of the
+    cost of ``NoteSerializer``.
+    """
+
+    fields = ("id", "title", "version", "updated_at", "category", "category__name", "category__color")
+    date_field = serializers.DateTimeField()
+
+    def __init__(self, instance=None, many=False, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.snippet_length = settings.NOTES_CARDS["SNIPPET_LENGTH"]
+
+    @classmethod
+    def get_queryset(cls, queryset):
+        # One character more than the snippet, to tell whether the body was cut.
+        snippet_length = settings.NOTES_CARDS["SNIPPET_LENGTH"]
+        return queryset.only(*cls.fields).annotate(snippet=Left("body", snippet_length + 1))
+
+    @property
+    def data(self):
+        with serializing():
+            if self.many:
+                return [self.to_representation(note) for note in self.instance]
+            return self.to_representation(self.instance)
+
+    def to_representation(self, note):
+        category = note.category
+        return {
+            "id": note.id,
+            "title": note.title,
+            "snippet": note.snippet[: self.snippet_length],
+            "truncated": len(note.snippet) > self.snippet_length,
+            "category": {"id": category.id, "name": category.name, "color": category.color},
+            "version": note.version,
+            "updated_at": self.date_field.to_representation(note.updated_at),
+        }
+
+
+class NoteAutosaveSerializer(serializers.ModelSerializer):
+    """
+    Validates an autosave PATCH without touching the database.
+
+    ``category_id`` is taken as a plain integer; ownership is only checked when the note
+    actually moves (see ``NoteDetailView.autosave``).
+    """
+
+    category_id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = Note
+        fields = ["title", "body", "category_id"]
+
+
+class NoteBulkOperationSerializer(serializers.Serializer):
+    """
+    One operation of a bulk request.
+
+    Only the shape is checked here; ``NoteBulkView`` looks up the notes and categories of
+    the whole batch at once.
+    """
+
+    REQUIRED = {
+        "create": {"title", "body", "category_id"},
+        "update": {"id"},
+        "move": {"id", "category_id"},
+        "delete": {"id"},
+    }
+
+    op = serializers.ChoiceField(choices=list(REQUIRED))
+    id = serializers.IntegerField(required=False)
+    title = serializers.CharField(max_length=200, required=False)
+    body = serializers.CharField(required=False)
+    category_id = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        op = attrs["op"]
+        missing = self.REQUIRED[op] - attrs.keys()
+        if missing:
+            raise serializers.ValidationError(dict.fromkeys(sorted(missing), "This field is required."))
+        if op == "create" and "id" in attrs:
+            raise serializers.ValidationError({"id": "New notes cannot have an id."})
+        if op == "update" and attrs.keys() == {"op", "id"}:
+            raise serializers.ValidationError("Nothing to update.")
+        return attrs
+
+
+class NoteBulkSerializer(serializers.Serializer):
+    operations = NoteBulkOperationSerializer(many=True, allow_empty=False)
+
+    def validate_operations(self, operations):
+        limit = settings.NOTES_BULK["MAX_OPERATIONS"]
+        if len(operations) > limit:
+            raise serializers.ValidationError(f"At most {limit} operations are allowed per request.")
+        return operations
+
+
+class NoteImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    import_format = serializers.ChoiceField(
+        choices=["ndjson", "markdown"], required=False, help_text="Detected from the file name when omitted."
+    )
+    default_category = serializers.CharField(max_length=100, required=False)
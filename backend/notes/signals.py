@@ -1,17 +1,52 @@
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 
-from .models import Category
+from . import events
+from .caching import bump
+from .models import Category, Note, NoteTombstone, notes_changed
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_category_owner(sender, instance, **kwargs):
+    bump(instance.user_id)
+
+
+@receiver(post_save, sender=Category)
+def publish_category_saved(sender, instance, **kwargs):
+    events.publish([instance.user_id], {"type": "category.saved", "id": instance.pk})
+
+
+@receiver(post_delete, sender=Category)
+def publish_category_deleted(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, User) or getattr(origin, "model", None) is User:
+        return
+    events.publish([instance.user_id], {"type": "category.deleted", "id": instance.pk})
+
+
+@receiver(post_save, sender=Note)
+def publish_note_saved(sender, instance, **kwargs):
+    events.publish([instance.user_id], {"type": "note.saved", "id": instance.pk, "version": instance.version})
+
+
+@receiver(notes_changed)
+def publish_notes_changed(sender, user_ids, event, **kwargs):
+    events.publish(user_ids, event)
 
 
 @receiver(post_save, sender=User)
 def create_default_categories(sender, instance, created, **kwargs):
     if created:
-        default_categories = [
-            ("Random Thoughts", "#FFCCB6"),  # Soft Orange/Peach
-            ("School", "#FDFD96"),  # Soft Yellow
-            ("Personal", "#B8E0D2"),  # Soft Green
-        ]
-        for category_name, color in default_categories:
-            Category.objects.create(user=instance, name=category_name, color=color)
+        Category.objects.create_defaults([instance])
+
+
+@receiver(pre_delete, sender=Category)
+def record_cascaded_note_deletions(sender, instance, origin=None, **kwargs):
+    # The category's notes are deleted by the cascade, bypassing Note.delete(). When the
+    # whole user is being deleted there is nobody left to sync.
+    if isinstance(origin, User) or getattr(origin, "model", None) is User:
+        return
+    NoteTombstone.objects.bulk_create(
+        NoteTombstone(note_id=pk, user_id=instance.user_id) for pk in instance.notes.values_list("pk", flat=True)
+    )
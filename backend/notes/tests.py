@@ -1,9 +1,45 @@
+import asyncio
+import contextlib
+import csv
+import dataclasses
+import gzip
+import io
+import json
+import runpy
+import tempfile
+import threading
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.test import AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
 from rest_framework import status
 from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 
-from .models import Category, Note
+from core import metrics, middleware
+from core.renderers import FastJSONRenderer
+from core.throttling import RateLimiter, limiter
+
+from . import events, export
+from .coalescing import absorbed_writes, conflicts, flushed_writes
+from .coalescing import buffer as autosave_buffer
+from .models import Category, EventStreamTicket, Note, NoteTombstone
+from .seeding import Seeder
 
 
 class CategoryTestCase(APITestCase):
@@ -76,8 +112,8 @@ class NoteTestCase(APITestCase):
         """Authenticated user can list their notes."""
         response = self.client.get("/api/notes/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["title"], "Test Note")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["title"], "Test Note")
 
     def test_create_note(self):
         """Authenticated user can create a note."""
@@ -113,7 +149,7 @@ class NoteTestCase(APITestCase):
         )
 
         response = self.client.get("/api/notes/")
-        self.assertEqual(len(response.data), 1)  # Only sees own note
+        self.assertEqual(len(response.data["results"]), 1)  # Only sees own note
 
         # Cannot access other user's note directly
         response = self.client.get(f"/api/notes/{other_note.id}/")
@@ -141,31 +177,1766 @@ class NoteFilterTestCase(APITestCase):
         """Can filter notes by category name."""
         response = self.client.get("/api/notes/?category=FilterWork")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data["results"]), 2)
 
     def test_filter_by_category_case_insensitive(self):
         """Category filter is case-insensitive."""
         response = self.client.get("/api/notes/?category=filterwork")
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data["results"]), 2)
 
     def test_search_in_title(self):
         """Search finds notes by title."""
         response = self.client.get("/api/notes/?search=grocery")
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["title"], "Grocery List")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["title"], "Grocery List")
 
     def test_search_in_body(self):
         """Search finds notes by body content."""
         response = self.client.get("/api/notes/?search=milk")
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
 
     def test_search_case_insensitive(self):
         """Search is case-insensitive."""
         response = self.client.get("/api/notes/?search=GROCERY")
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
 
     def test_combined_filters(self):
         """Can combine category filter with search."""
         response = self.client.get("/api/notes/?category=FilterWork&search=report")
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["title"], "Work Report")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["title"], "Work Report")
+
+    def test_invalid_search_mode(self):
+        """An unknown search mode is rejected."""
+        response = self.client.get("/api/notes/?search=report&search_mode=regex")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_by_category_ids(self):
+        """Can filter notes by one or more category ids."""
+        self.assertEqual(self.titles({"category_id__in": str(self.category1.id)}), ["Work Meeting", "Work Report"])
+        self.assertEqual(len(self.titles({"category_id__in": f"{self.category1.id},{self.category2.id}"})), 3)
+
+    def test_filter_by_other_users_category(self):
+        """Neither filter reaches another user's notes."""
+        other = User.objects.create_user(username="other-filter@example.com")
+        category = Category.objects.create(name="FilterWork", user=other)
+        Note.objects.create(title="Other", body="Body", category=category, user=other)
+        self.assertEqual(self.titles({"category_id__in": str(category.id)}), [])
+        self.assertEqual(self.titles({"category": "FilterWork"}), ["Work Meeting", "Work Report"])
+
+    def test_invalid_category_ids(self):
+        """Category ids must be integers."""
+        response = self.client.get("/api/notes/", {"category_id__in": "1,abc"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def date_range_notes(self):
+        Note.objects.filter(title="Work Meeting").update(
+            created_at="2026-01-05T10:00:00Z", updated_at="2026-03-01T10:00Z"
+        )
+        Note.objects.filter(title="Grocery List").update(
+            created_at="2026-02-05T10:00:00Z", updated_at="2026-02-06T10:00Z"
+        )
+        Note.objects.filter(title="Work Report").update(
+            created_at="2026-03-05T10:00:00Z", updated_at="2026-03-06T10:00Z"
+        )
+
+    def titles(self, params):
+        response = self.client.get("/api/notes/", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(note["title"] for note in response.data["results"])
+
+    def test_filter_by_updated_range(self):
+        """Updated ranges include the start and exclude the end."""
+        self.date_range_notes()
+        self.assertEqual(self.titles({"updated_after": "2026-03-01T10:00:00Z"}), ["Work Meeting", "Work Report"])
+        self.assertEqual(self.titles({"updated_before": "2026-03-01T10:00:00Z"}), ["Grocery List"])
+        self.assertEqual(
+            self.titles({"updated_after": "2026-02-01", "updated_before": "2026-03-02"}),
+            ["Grocery List", "Work Meeting"],
+        )
+
+    def test_filter_by_created_range(self):
+        """Created ranges accept dates."""
+        self.date_range_notes()
+        self.assertEqual(self.titles({"created_after": "2026-02-01", "created_before": "2026-03-01"}), ["Grocery List"])
+
+    def test_date_range_with_category_and_search(self):
+        """Date ranges combine with the category filter and search."""
+        self.date_range_notes()
+        self.assertEqual(
+            self.titles({"updated_after": "2026-02-01", "category": "FilterWork"}), ["Work Meeting", "Work Report"]
+        )
+        self.assertEqual(
+            self.titles({"created_after": "2026-02-01", "category": "FilterWork", "search": "work"}), ["Work Report"]
+        )
+
+    def test_invalid_date(self):
+        """An unparseable date is rejected."""
+        response = self.client.get("/api/notes/", {"updated_after": "yesterday"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class NotePaginationTestCase(APITestCase):
+    """Tests for keyset pagination of the note list."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="pages@example.com", email="pages@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        category = Category.objects.create(name="Pages", color="#FFCC00", user=self.user)
+        self.notes = [
+            Note.objects.create(title=f"Note {i}", body="Body", category=category, user=self.user) for i in range(7)
+        ]
+        # Give several notes the same timestamp so pages must break ties on id.
+        Note.objects.filter(id__in=[n.id for n in self.notes[2:5]]).update(updated_at=self.notes[2].updated_at)
+        self.expected = list(
+            Note.objects.filter(user=self.user).order_by("-updated_at", "-id").values_list("id", flat=True)
+        )
+
+    def _ids(self, response):
+        return [note["id"] for note in response.data["results"]]
+
+    def test_first_page(self):
+        """The first page holds the most recently updated notes and links forward only."""
+        response = self.client.get("/api/notes/?page_size=3")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._ids(response), self.expected[:3])
+        self.assertIsNotNone(response.data["next"])
+        self.assertIsNone(response.data["previous"])
+
+    def test_walk_forward_and_back(self):
+        """Following next then previous links visits every note exactly once in order."""
+        seen = []
+        url = "/api/notes/?page_size=3"
+        pages = []
+        while url:
+            response = self.client.get(url)
+            pages.append(self._ids(response))
+            seen.extend(self._ids(response))
+            last = response
+            url = response.data["next"]
+        self.assertEqual(seen, self.expected)
+
+        response = self.client.get(last.data["previous"])
+        self.assertEqual(self._ids(response), pages[-2])
+        response = self.client.get(response.data["previous"])
+        self.assertEqual(self._ids(response), pages[-3])
+        self.assertIsNone(response.data["previous"])
+
+    def test_page_size_is_capped(self):
+        """page_size above the configured maximum is clamped."""
+        with self.settings(NOTES_PAGINATION={"PAGE_SIZE": 2, "MAX_PAGE_SIZE": 4}):
+            self.assertEqual(len(self.client.get("/api/notes/").data["results"]), 2)
+            self.assertEqual(len(self.client.get("/api/notes/?page_size=100").data["results"]), 4)
+
+    def test_invalid_cursor(self):
+        """A tampered cursor is rejected rather than raising a server error."""
+        for cursor in ["garbage", "eyJrIjpbImJhZCIsMV19"]:
+            response = self.client.get(f"/api/notes/?cursor={cursor}")
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class NoteCardListTestCase(APITestCase):
+    """Tests for the card representation of the note list."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="cards@example.com", email="cards@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.category = Category.objects.create(name="Cards", color="#FFCC00", user=self.user)
+        self.long = Note.objects.create(title="Long", body="x" * 500, category=self.category, user=self.user)
+        self.short = Note.objects.create(title="Short", body="Short body", category=self.category, user=self.user)
+
+    def test_cards(self):
+        response = self.client.get("/api/notes/", {"fields": "card"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        short, long = response.data["results"]
+        self.assertEqual(
+            short,
+            {
+                "id": self.short.id,
+                "title": "Short",
+                "snippet": "Short body",
+                "truncated": False,
+                "category": {"id": self.category.id, "name": "Cards", "color": "#FFCC00"},
+                "version": self.short.version,
+                "updated_at": self.client.get(f"/api/notes/{self.short.id}/").data["updated_at"],
+            },
+        )
+        self.assertEqual(long["snippet"], "x" * 200)
+        self.assertTrue(long["truncated"])
+
+    @override_settings(NOTES_CARDS={"SNIPPET_LENGTH": 5})
+    def test_snippet_length(self):
+        response = self.client.get("/api/notes/", {"fields": "card", "search": "short"})
+        self.assertEqual(response.data["results"][0]["snippet"], "Short")
+        self.assertTrue(response.data["results"][0]["truncated"])
+
+    def test_body_is_not_loaded(self):
+        self.client.get("/api/categories/")  # warm the token cache
+        with self.assertNumQueries(1) as queries:
+            self.client.get("/api/notes/", {"fields": "card", "page_size": 1})
+        # Only SUBSTR(body) is selected, never the column itself.
+        self.assertNotRegex(queries.captured_queries[0]["sql"], r'(SELECT|,) "notes_note"\."body"')
+
+    def test_paginates(self):
+        response = self.client.get("/api/notes/", {"fields": "card", "page_size": 1})
+        response = self.client.get(response.data["next"])
+        self.assertEqual([card["title"] for card in response.data["results"]], ["Long"])
+
+    def test_unknown_fields(self):
+        response = self.client.get("/api/notes/", {"fields": "title"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_async_cards(self):
+        headers = {"Authorization": f"Token {self.token.key}"}
+        response = await AsyncClient().get("/api/async/notes/", {"fields": "card"}, headers=headers)
+        sync_response = await AsyncClient().get("/api/notes/", {"fields": "card"}, headers=headers)
+        self.assertEqual(response.json(), sync_response.json())
+
+
+class NoteQueryCountTestCase(APITestCase):
+    """
+    Regression tests for query counts on the note endpoints.
+
+    Each endpoint must run the same number of queries however many notes the user owns,
+    so a reintroduced N+1 (e.g. a missing select_related) fails here. Token lookups are
+    cached, so authentication adds no queries once the token has been seen.
+    """
+
+    sizes = [1, 100, 1000]
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="queries@example.com", email="queries@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.client.get("/api/categories/")  # warm the token cache
+        self.category = Category.objects.create(name="Queries", color="#FFCC00", user=self.user)
+        self.other_category = Category.objects.create(name="Other Queries", color="#00CCFF", user=self.user)
+
+    def _seed(self, count):
+        Note.objects.filter(user=self.user).delete()
+        categories = [self.category, self.other_category]
+        Note.objects.bulk_create(
+            Note(title=f"Note {i}", body="Body", category=categories[i % 2], user=self.user) for i in range(count)
+        )
+        return Note.objects.filter(user=self.user).latest("id")
+
+    def test_list_query_count(self):
+        """Listing notes is one joined query."""
+        for size in self.sizes:
+            with self.subTest(notes=size):
+                self._seed(size)
+                with self.assertNumQueries(1):
+                    response = self.client.get("/api/notes/?page_size=200")
+                self.assertEqual(len(response.data["results"]), min(size, 200))
+
+    def test_filtered_list_query_count(self):
+        """Filtering and searching do not add per-row queries."""
+        for size in self.sizes:
+            with self.subTest(notes=size):
+                self._seed(size)
+                with self.assertNumQueries(1):
+                    self.client.get("/api/notes/?page_size=200&category=Queries&search=note")
+
+    def test_retrieve_query_count(self):
+        """Retrieving a note is one joined query."""
+        for size in self.sizes:
+            with self.subTest(notes=size):
+                note = self._seed(size)
+                with self.assertNumQueries(1):
+                    response = self.client.get(f"/api/notes/{note.id}/")
+                self.assertEqual(response.data["category"]["name"], note.category.name)
+
+    def test_create_query_count(self):
+        """Creating a note is category lookup + insert + note count update."""
+        for size in self.sizes:
+            with self.subTest(notes=size):
+                self._seed(size)
+                with self.assertNumQueries(3):
+                    response = self.client.post(
+                        "/api/notes/", {"title": "New", "body": "Body", "category_id": self.category.id}
+                    )
+                self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_update_query_count(self):
+        """Moving a note is joined fetch + category lookup + locked category read + update + note count update."""
+        for size in self.sizes:
+            with self.subTest(notes=size):
+                note = self._seed(size)
+                target = self.category if note.category_id == self.other_category.id else self.other_category
+                with self.assertNumQueries(5):
+                    response = self.client.patch(f"/api/notes/{note.id}/", {"title": "Moved", "category_id": target.id})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.data["category"]["id"], target.id)
+
+    def test_delete_query_count(self):
+        """Deleting a note is fetch + delete + note count update + tombstone."""
+        for size in self.sizes:
+            with self.subTest(notes=size):
+                note = self._seed(size)
+                with self.assertNumQueries(4):
+                    response = self.client.delete(f"/api/notes/{note.id}/")
+                self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_category_list_query_count(self):
+        """Listing categories with note counts is one query."""
+        for size in self.sizes:
+            with self.subTest(notes=size):
+                self._seed(size)
+                with self.assertNumQueries(1):
+                    response = self.client.get("/api/categories/")
+                self.assertEqual(sum(category["note_count"] for category in response.data), size)
+
+    def test_category_owned_by_another_user_is_rejected(self):
+        """A note cannot be filed under another user's category."""
+        other_user = User.objects.create_user(username="intruder@example.com", password="password")
+        foreign = Category.objects.create(name="Foreign", color="#000000", user=other_user)
+        response = self.client.post("/api/notes/", {"title": "New", "body": "Body", "category_id": foreign.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CategoryNoteCountTestCase(APITestCase):
+    """Tests for the denormalized Category.note_count."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="counts@example.com", email="counts@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.work = Category.objects.create(name="Work", color="#FF0000", user=self.user)
+        self.home = Category.objects.create(name="Home", color="#00FF00", user=self.user)
+
+    def assertCounts(self, work, home):
+        self.work.refresh_from_db()
+        self.home.refresh_from_db()
+        self.assertEqual((self.work.note_count, self.home.note_count), (work, home))
+
+    def test_api_create_move_delete(self):
+        """Creating, moving and deleting notes through the API keeps counts in step."""
+        response = self.client.post("/api/notes/", {"title": "A", "body": "B", "category_id": self.work.id})
+        note_id = response.data["id"]
+        self.assertCounts(1, 0)
+
+        self.client.patch(f"/api/notes/{note_id}/", {"category_id": self.home.id})
+        self.assertCounts(0, 1)
+
+        self.client.patch(f"/api/notes/{note_id}/", {"title": "Renamed"})
+        self.assertCounts(0, 1)
+
+        self.client.delete(f"/api/notes/{note_id}/")
+        self.assertCounts(0, 0)
+
+    def test_bulk_paths(self):
+        """bulk_create, update, bulk_update and queryset delete keep counts in step."""
+        notes = Note.objects.bulk_create(
+            Note(title=f"Note {i}", body="Body", category=self.work, user=self.user) for i in range(6)
+        )
+        self.assertCounts(6, 0)
+
+        Note.objects.filter(pk__in=[n.pk for n in notes[:2]]).update(category=self.home)
+        self.assertCounts(4, 2)
+
+        moved = list(Note.objects.filter(category=self.work)[:3])
+        for note in moved:
+            note.category = self.home
+        Note.objects.bulk_update(moved, ["category"])
+        self.assertCounts(1, 5)
+
+        Note.objects.filter(category=self.home).delete()
+        self.assertCounts(1, 0)
+
+    def test_concurrent_moves(self):
+        """A save moves the note from its stored category, not the one it was loaded with."""
+        note = Note.objects.create(title="A", body="B", category=self.work, user=self.user)
+        first, second = Note.objects.get(pk=note.pk), Note.objects.get(pk=note.pk)
+        first.category = self.home
+        first.save()
+        second.category = self.home
+        second.save()
+        self.assertCounts(0, 1)
+
+        second.category = self.work
+        second.save()
+        first.title = "Renamed"
+        first.save()  # writes its stale category back: a move from work to home
+        self.assertCounts(0, 1)
+
+    def test_api_reads_stored_count(self):
+        """The category list reports the stored count."""
+        Note.objects.create(title="A", body="B", category=self.work, user=self.user)
+        response = self.client.get("/api/categories/")
+        counts = {category["name"]: category["note_count"] for category in response.data}
+        self.assertEqual((counts["Work"], counts["Home"]), (1, 0))
+
+    def test_recount_command_repairs_drift(self):
+        """recount_note_counts fixes counters that drifted from the notes table."""
+        Note.objects.create(title="A", body="B", category=self.work, user=self.user)
+        Category.objects.filter(pk=self.work.pk).update(note_count=7)
+        Category.objects.filter(pk=self.home.pk).update(note_count=-2)
+
+        out = StringIO()
+        call_command("recount_note_counts", "--dry-run", stdout=out)
+        self.assertIn("Found 2 categories", out.getvalue())
+        self.assertCounts(7, -2)
+
+        call_command("recount_note_counts", stdout=out)
+        self.assertCounts(1, 0)
+
+
+class NoteAutosaveTestCase(APITestCase):
+    """Tests for versioned autosave PATCHes (If-Match)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="autosave@example.com", email="autosave@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.category = Category.objects.create(name="Drafts", color="#FFCC00", user=self.user)
+        self.other_category = Category.objects.create(name="Final", color="#00CCFF", user=self.user)
+        self.note = Note.objects.create(title="Draft", body="First", category=self.category, user=self.user)
+        self.url = f"/api/notes/{self.note.id}/"
+
+    def autosave(self, data, version):
+        return self.client.patch(self.url, data, HTTP_IF_MATCH=f'"{version}"')
+
+    def test_retrieve_returns_version_etag(self):
+        """Reads expose the version as a field and as an ETag."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["version"], 1)
+        self.assertEqual(response["ETag"], '"1"')
+
+    def test_autosave_is_a_single_update(self):
+        """An autosave runs auth + one UPDATE and returns the new version."""
+        with self.assertNumQueries(2):
+            response = self.autosave({"body": "Second"}, 1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["version"], 2)
+        self.assertEqual(response["ETag"], '"2"')
+
+        self.note.refresh_from_db()
+        self.assertEqual((self.note.title, self.note.body, self.note.version), ("Draft", "Second", 2))
+
+    def test_unchanged_category_skips_lookup(self):
+        """Sending the current category does not add a category query."""
+        with self.assertNumQueries(2):
+            response = self.autosave({"body": "Second", "category_id": self.category.id}, 1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_autosave_moves_category(self):
+        """Changing the category checks ownership and keeps note counts in step."""
+        response = self.autosave({"category_id": self.other_category.id}, 1)
+        self.assertEqual(response.data["version"], 2)
+        self.other_category.refresh_from_db()
+        self.assertEqual(self.other_category.note_count, 1)
+
+        other_user = User.objects.create_user(username="thief@example.com", password="password")
+        foreign = Category.objects.create(name="Foreign", color="#000000", user=other_user)
+        response = self.autosave({"category_id": foreign.id}, 2)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stale_version_is_rejected(self):
+        """A write based on an old version fails with 412 and leaves the note alone."""
+        self.autosave({"body": "Second"}, 1)
+        response = self.autosave({"body": "Stale"}, 1)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(response.data["version"], 2)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.body, "Second")
+
+    def test_full_update_bumps_version(self):
+        """Regular updates also invalidate older versions."""
+        self.client.patch(self.url, {"title": "Edited"})
+        response = self.autosave({"body": "Stale"}, 1)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+    def test_missing_note(self):
+        """Autosaving another user's or a missing note is a 404."""
+        response = self.client.patch("/api/notes/999999/", {"body": "x"}, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_if_match(self):
+        """If-Match must carry a version."""
+        for value in ('"draft"', "3", '"1", "2"'):
+            with self.subTest(value=value):
+                response = self.client.patch(self.url, {"body": "x"}, HTTP_IF_MATCH=value)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_if_match_any(self):
+        """``If-Match: *`` matches any version: a plain update of an existing note."""
+        for url in (self.url, f"/api/async/notes/{self.note.id}/"):
+            with self.subTest(url=url):
+                version = Note.objects.get(pk=self.note.pk).version
+                response = self.client.patch(url, {"body": "Any"}, format="json", HTTP_IF_MATCH="*")
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.json()["title"], "Draft")
+                self.assertEqual(response["ETag"], f'"{version + 1}"')
+        response = self.client.patch("/api/notes/999999/", {"body": "x"}, HTTP_IF_MATCH="*")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_validation(self):
+        """Autosave still validates field values."""
+        response = self.autosave({"title": "x" * 201}, 1)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(NOTES_AUTOSAVE={"COALESCE": True, "FLUSH_INTERVAL": 0})
+class NoteAutosaveCoalescingTestCase(APITestCase):
+    """Tests for the autosave write-coalescing buffer."""
+
+    def setUp(self):
+        autosave_buffer.clear()
+        for metric in (absorbed_writes, flushed_writes, conflicts):
+            metric.reset()
+        self.user = User.objects.create_user(
+            username="coalesce@example.com", email="coalesce@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.category = Category.objects.create(name="Drafts", color="#FFCC00", user=self.user)
+        self.note = Note.objects.create(title="Draft", body="", category=self.category, user=self.user)
+        self.url = f"/api/notes/{self.note.id}/"
+
+    def tearDown(self):
+        autosave_buffer.clear()
+
+    def autosave(self, data, version):
+        return self.client.patch(self.url, data, HTTP_IF_MATCH=f'"{version}"')
+
+    def test_consecutive_autosaves_are_absorbed(self):
+        """Only the first autosave of a burst reaches the database."""
+        self.autosave({"body": "a"}, 1)
+        with self.assertNumQueries(0):
+            self.autosave({"body": "ab"}, 2)
+            response = self.autosave({"body": "abc", "title": "Typed"}, 3)
+        self.assertEqual(response.data["version"], 4)
+        self.assertEqual(absorbed_writes.value, 2)
+
+        self.note.refresh_from_db()
+        self.assertEqual((self.note.body, self.note.version), ("a", 2))
+
+    def test_reads_see_pending_writes(self):
+        """The user's next read flushes pending autosaves first."""
+        self.autosave({"body": "a"}, 1)
+        self.autosave({"body": "ab"}, 2)
+
+        response = self.client.get(self.url)
+        self.assertEqual((response.data["body"], response.data["version"]), ("ab", 3))
+        response = self.client.get("/api/notes/")
+        self.assertEqual(response.data["results"][0]["body"], "ab")
+        self.assertEqual(flushed_writes.value, 1)
+
+    def test_stale_version_against_buffer(self):
+        """Stale versions are rejected from the pending entry without a query."""
+        self.autosave({"body": "a"}, 1)
+        self.autosave({"body": "ab"}, 2)
+        response = self.autosave({"body": "stale"}, 2)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(response.data["version"], 3)
+
+    def test_conflicting_write_drops_pending_changes(self):
+        """A write that bypassed the buffer wins; the pending changes are counted as a conflict."""
+        self.autosave({"body": "a"}, 1)
+        self.autosave({"body": "ab"}, 2)
+        Note.objects.filter(pk=self.note.pk).update(body="elsewhere")
+
+        autosave_buffer.flush()
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.body, "elsewhere")
+        self.assertEqual(conflicts.value, 1)
+
+    def test_autosave_after_move(self):
+        """An autosave that moves the note re-tracks it at the version it wrote."""
+        other = Category.objects.create(name="Other", color="#00FF00", user=self.user)
+        self.autosave({"body": "a"}, 1)
+        response = self.autosave({"category_id": other.id}, 2)
+        self.assertEqual(response.data["version"], 3)
+        response = self.autosave({"body": "ab"}, 3)
+        self.assertEqual((response.status_code, response.data["version"]), (status.HTTP_200_OK, 4))
+
+        autosave_buffer.flush()
+        self.note.refresh_from_db()
+        self.assertEqual((self.note.body, self.note.category_id, self.note.version), ("ab", other.id, 4))
+        self.assertEqual(conflicts.value, 0)
+
+    def test_other_writes_forget_the_note(self):
+        """After a full update the next autosave starts from the version it stored."""
+        self.autosave({"body": "a"}, 1)
+        self.autosave({"body": "ab"}, 2)
+        response = self.client.patch(self.url, {"title": "Renamed"})
+        self.assertEqual(response.data["version"], 4)
+
+        response = self.autosave({"body": "abc"}, 4)
+        self.assertEqual((response.status_code, response.data["version"]), (status.HTTP_200_OK, 5))
+        self.note.refresh_from_db()
+        self.assertEqual((self.note.title, self.note.body, self.note.version), ("Renamed", "abc", 5))
+
+    def test_autosave_after_delete(self):
+        self.autosave({"body": "a"}, 1)
+        self.client.delete(self.url)
+        response = self.autosave({"body": "ab"}, 2)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_full_flush_forgets_idle_notes(self):
+        """Notes without new changes since the last flush stop being buffered."""
+        self.autosave({"body": "a"}, 1)
+        autosave_buffer.flush()
+        with self.assertNumQueries(1):
+            self.autosave({"body": "ab"}, 2)
+
+
+# The tests run in one process, where a local-memory cache is safe to enable.
+@override_settings(NOTES_CACHE={**settings.NOTES_CACHE, "ENABLED": True})
+class NoteListCachingTestCase(APITestCase):
+    """Tests for conditional GETs and cached pages on the list endpoints."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="etag@example.com", email="etag@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.category = Category.objects.create(name="Cached", color="#FFCC00", user=self.user)
+        self.note = Note.objects.create(title="First", body="Body", category=self.category, user=self.user)
+
+    def test_unchanged_list_is_not_modified(self):
+        for url in ("/api/notes/", "/api/categories/"):
+            with self.subTest(url=url):
+                etag = self.client.get(url)["ETag"]
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+                self.assertEqual(response["ETag"], etag)
+
+    @override_settings(NOTES_CACHE={**settings.NOTES_CACHE, "ENABLED": None})
+    def test_off_with_a_process_local_cache(self):
+        """Other workers' writes don't reach a local-memory cache, so lists aren't cached in it."""
+        self.client.get("/api/notes/")
+        for url in ("/api/notes/", "/api/async/notes/", "/api/categories/"):
+            with self.subTest(url=url), self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertFalse(response.has_header("ETag"))
+
+    def test_pages_are_cached_per_url(self):
+        self.client.get("/api/notes/")
+        self.client.get("/api/notes/?search=nothing")
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/notes/")
+            filtered = self.client.get("/api/notes/?search=nothing")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(filtered.data["results"], [])
+
+    def test_writes_invalidate(self):
+        """API writes, bulk writes and category changes all change the stamp."""
+        writes = [
+            lambda: self.client.post("/api/notes/", {"title": "New", "body": "Body", "category_id": self.category.id}),
+            lambda: self.client.patch(f"/api/notes/{self.note.id}/", {"body": "a"}, HTTP_IF_MATCH='"1"'),
+            lambda: Note.objects.filter(category=self.category).update(title="Bulk"),
+            lambda: Note.objects.bulk_create([Note(title="B", body="", category=self.category, user=self.user)]),
+            lambda: Category.objects.create(name="Another", user=self.user),
+            lambda: Category.objects.filter(pk=self.category.pk).recount_notes(),
+            lambda: self.note.delete(),
+        ]
+        for write in writes:
+            etag = self.client.get("/api/notes/")["ETag"]
+            write()
+            response = self.client.get("/api/notes/", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(response["ETag"], etag)
+
+    def test_other_users_are_unaffected(self):
+        etag = self.client.get("/api/notes/")["ETag"]
+        other = User.objects.create_user(username="other-etag@example.com", password="password")
+        Note.objects.create(title="Other", body="", category=other.categories.first(), user=other)
+        response = self.client.get("/api/notes/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+@override_settings(NOTES_SYNC={"OVERLAP": 0, "TOMBSTONE_DAYS": 30})
+class NoteSyncTestCase(APITestCase):
+    """Tests for the delta sync endpoint."""
+
+    url = "/api/notes/sync/"
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="sync@example.com", email="sync@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.category = Category.objects.create(name="Synced", color="#FFCC00", user=self.user)
+        self.notes = [
+            Note.objects.create(title=f"Note {i}", body="Body", category=self.category, user=self.user)
+            for i in range(3)
+        ]
+
+    def sync(self, token=None, **params):
+        if token is not None:
+            params["since"] = token
+        return self.client.get(self.url, params)
+
+    def test_full_sync(self):
+        response = self.sync()
+        self.assertEqual([note["id"] for note in response.data["notes"]], [note.id for note in self.notes])
+        self.assertEqual(response.data["deleted"], [])
+        self.assertFalse(response.data["has_more"])
+
+    def test_delta_sync(self):
+        """Only changes since the token are returned, including deletions."""
+        token = self.sync().data["token"]
+        self.assertEqual(self.sync(token).data["notes"], [])
+
+        self.client.patch(f"/api/notes/{self.notes[0].id}/", {"body": "Edited"})
+        created = Note.objects.create(title="New", body="Body", category=self.category, user=self.user)
+        self.client.delete(f"/api/notes/{self.notes[1].id}/")
+        Note.objects.filter(pk=self.notes[2].pk).delete()
+
+        response = self.sync(token)
+        self.assertEqual([note["id"] for note in response.data["notes"]], [self.notes[0].id, created.id])
+        self.assertEqual(response.data["deleted"], [self.notes[1].id, self.notes[2].id])
+
+        response = self.sync(response.data["token"])
+        self.assertEqual((response.data["notes"], response.data["deleted"]), ([], []))
+
+    def test_paged_sync(self):
+        response = self.sync(page_size=2)
+        self.assertTrue(response.data["has_more"])
+        response = self.sync(response.data["token"], page_size=2)
+        self.assertEqual([note["id"] for note in response.data["notes"]], [self.notes[2].id])
+        self.assertFalse(response.data["has_more"])
+
+    def test_late_deletions_are_resent(self):
+        """A deletion committed after a sync, but stamped before it, comes with the next one."""
+        with override_settings(NOTES_SYNC={"OVERLAP": 5, "TOMBSTONE_DAYS": 30}):
+            token = self.sync().data["token"]
+            deleted = self.notes[0].id
+            self.notes[0].delete()
+            NoteTombstone.objects.update(deleted_at=timezone.now() - timedelta(seconds=2))
+            response = self.sync(token)
+        self.assertEqual(response.data["deleted"], [deleted])
+
+    def test_category_delete_records_tombstones(self):
+        token = self.sync().data["token"]
+        self.category.delete()
+        response = self.sync(token)
+        self.assertEqual(sorted(response.data["deleted"]), [note.id for note in self.notes])
+
+    def test_deleting_user_skips_tombstones(self):
+        self.user.delete()
+        self.assertFalse(NoteTombstone.objects.exists())
+
+    def test_invalid_token(self):
+        for token in ("garbage", "eyJrIjoxfQ"):
+            with self.subTest(token=token):
+                response = self.sync(token)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expired_token(self):
+        token = self.sync().data["token"]
+        with override_settings(NOTES_SYNC={"OVERLAP": 0, "TOMBSTONE_DAYS": -1}):
+            response = self.sync(token)
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    def test_prune_tombstones(self):
+        self.notes[0].delete()
+        NoteTombstone.objects.update(deleted_at=timezone.now() - timedelta(days=31))
+        kept = self.notes[1].id
+        self.notes[1].delete()
+        call_command("prune_note_tombstones", stdout=StringIO())
+        self.assertEqual(list(NoteTombstone.objects.values_list("note_id", flat=True)), [kept])
+
+
+class NoteBulkTestCase(APITestCase):
+    """Tests for the bulk operations endpoint."""
+
+    url = "/api/notes/bulk/"
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="bulk@example.com", email="bulk@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.source = Category.objects.create(name="Source", color="#FFCC00", user=self.user)
+        self.target = Category.objects.create(name="Target", color="#00CCFF", user=self.user)
+        self.notes = [
+            Note.objects.create(title=f"Note {i}", body="Body", category=self.source, user=self.user) for i in range(3)
+        ]
+
+    def bulk(self, operations):
+        return self.client.post(self.url, {"operations": operations}, format="json")
+
+    def test_mixed_operations(self):
+        response = self.bulk(
+            [
+                {"op": "create", "title": "New", "body": "Body", "category_id": self.target.id},
+                {"op": "update", "id": self.notes[0].id, "body": "Edited"},
+                {"op": "move", "id": self.notes[1].id, "category_id": self.target.id},
+                {"op": "delete", "id": self.notes[2].id},
+            ]
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual([result["op"] for result in results], ["create", "update", "move", "delete"])
+        self.assertEqual(results[1], {"op": "update", "id": self.notes[0].id, "version": 2})
+
+        created = Note.objects.get(pk=results[0]["id"])
+        self.assertEqual((created.title, created.category_id), ("New", self.target.id))
+        self.notes[0].refresh_from_db()
+        self.assertEqual((self.notes[0].body, self.notes[0].version), ("Edited", 2))
+        self.assertEqual(Note.objects.get(pk=self.notes[1].id).category_id, self.target.id)
+        self.assertFalse(Note.objects.filter(pk=self.notes[2].id).exists())
+        self.assertTrue(NoteTombstone.objects.filter(note_id=self.notes[2].id).exists())
+
+        self.source.refresh_from_db()
+        self.target.refresh_from_db()
+        self.assertEqual((self.source.note_count, self.target.note_count), (1, 2))
+
+    def test_move_query_count(self):
+        """Moving notes takes the same queries however many notes move."""
+        for size in [10, 100]:
+            with self.subTest(notes=size):
+                notes = Note.objects.bulk_create(
+                    Note(title="Move", body="Body", category=self.source, user=self.user) for _ in range(size)
+                )
+                operations = [{"op": "move", "id": note.id, "category_id": self.target.id} for note in notes]
+                self.bulk([operations[0]])  # warm the token cache
+                # categories + notes + bulk_update (lock, update, re-read, note counts), and the
+                # transaction's savepoint and release
+                with self.assertNumQueries(8):
+                    response = self.bulk(operations[1:])
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.target.refresh_from_db()
+        self.assertEqual(self.target.note_count, 110)
+
+    def test_invalid_batch_is_not_applied(self):
+        other = User.objects.create_user(username="bulk-other@example.com", password="password")
+        foreign = Category.objects.create(name="Foreign", user=other)
+        response = self.bulk(
+            [
+                {"op": "update", "id": self.notes[0].id, "title": "Applied?"},
+                {"op": "move", "id": self.notes[1].id, "category_id": foreign.id},
+                {"op": "delete", "id": 999999},
+                {"op": "delete", "id": self.notes[0].id},
+            ]
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data["operations"]
+        self.assertEqual(errors[0], {})
+        self.assertIn("category_id", errors[1])
+        self.assertIn("id", errors[2])
+        self.assertIn("id", errors[3])
+        self.notes[0].refresh_from_db()
+        self.assertEqual(self.notes[0].title, "Note 0")
+
+    def test_operation_shape(self):
+        for operation in [
+            {"op": "create", "title": "No body", "category_id": self.source.id},
+            {"op": "move", "id": self.notes[0].id},
+            {"op": "update", "id": self.notes[0].id},
+            {"op": "rename", "id": self.notes[0].id},
+        ]:
+            with self.subTest(operation=operation):
+                self.assertEqual(self.bulk([operation]).status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(NOTES_BULK={"MAX_OPERATIONS": 1})
+    def test_batch_size_is_limited(self):
+        operations = [{"op": "delete", "id": note.id} for note in self.notes]
+        self.assertEqual(self.bulk(operations).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(NOTES_EXPORT={"CHUNK_SIZE": 2})
+class NoteExportTestCase(APITestCase):
+    """Tests for the streaming export endpoint."""
+
+    url = "/api/notes/export/"
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="export@example.com", email="export@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.category = Category.objects.create(name="Archive", color="#FFCC00", user=self.user)
+        self.notes = [
+            Note.objects.create(title=f"Note {i}", body=f"Line one\nline, {i}", category=self.category, user=self.user)
+            for i in range(5)
+        ]
+
+    def test_ndjson(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row["id"] for row in rows], [note.id for note in self.notes])
+        self.assertEqual(rows[0]["body"], "Line one\nline, 0")
+        self.assertEqual(rows[0]["category"], "Archive")
+
+    def test_csv(self):
+        response = self.client.get(self.url, {"export_format": "csv"})
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn('filename="notes.csv"', response["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[4]["body"], "Line one\nline, 4")
+
+    def test_empty_csv_has_header(self):
+        Note.objects.filter(user=self.user).delete()
+        response = self.client.get(self.url, {"export_format": "csv"})
+        self.assertEqual(b"".join(response.streaming_content).decode().strip(), ",".join(export.FIELDS))
+
+    def test_only_own_notes(self):
+        other = User.objects.create_user(username="export-other@example.com", password="password")
+        Note.objects.create(title="Private", body="Body", category=other.categories.first(), user=other)
+        response = self.client.get(self.url)
+        self.assertNotIn(b"Private", b"".join(response.streaming_content))
+
+    def test_invalid_format(self):
+        response = self.client.get(self.url, {"export_format": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_schema(self):
+        """The API schema generates, with a binary response per export format."""
+        out = StringIO()
+        call_command("spectacular", "--format", "openapi-json", "--validate", "--fail-on-warn", stdout=out)
+        content = json.loads(out.getvalue())["paths"][self.url]["get"]["responses"]["200"]["content"]
+        self.assertEqual(set(content), {"application/x-ndjson", "text/csv"})
+        self.assertEqual(content["text/csv"]["schema"], {"type": "string", "format": "binary"})
+
+    async def test_streams_asynchronously_under_asgi(self):
+        response = await AsyncClient().get(self.url, headers={"Authorization": f"Token {self.token.key}"})
+        self.assertTrue(response.is_async)
+        lines = [line async for chunk in response.streaming_content for line in chunk.splitlines()]
+        self.assertEqual(len(lines), 5)
+
+
+class NoteImportTestCase(APITestCase):
+    """Tests for the import endpoint and the import_notes command."""
+
+    url = "/api/notes/import/"
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="import@example.com", email="import@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def upload(self, name, content, **data):
+        return self.client.post(self.url, {"file": SimpleUploadedFile(name, content), **data}, format="multipart")
+
+    def ndjson(self, *records):
+        return "\n".join(record if isinstance(record, str) else json.dumps(record) for record in records).encode()
+
+    def test_ndjson(self):
+        content = self.ndjson(
+            {"title": "One", "body": "Body", "category": "School"},
+            {"title": "Two", "body": "Body", "category": "Projects"},
+            {"title": "Three", "body": "Body"},
+            "not json",
+            {"title": "", "body": "Body"},
+        )
+        response = self.upload("notes.ndjson", content)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data["created"], response.data["skipped"]), (3, 2))
+        self.assertEqual([error["source"] for error in response.data["errors"]], [4, 5])
+
+        notes = Note.objects.filter(user=self.user).select_related("category").order_by("id")
+        self.assertEqual([note.category.name for note in notes], ["School", "Projects", "Imported"])
+        # The existing default category is reused; the counts include the imported notes.
+        self.assertEqual(Category.objects.filter(user=self.user, name="School").get().note_count, 1)
+
+    def test_export_round_trip(self):
+        category = Category.objects.get(user=self.user, name="Personal")
+        Note.objects.create(title="Exported", body="Body", category=category, user=self.user)
+        exported = b"".join(self.client.get("/api/notes/export/").streaming_content)
+        response = self.upload("notes.ndjson", exported)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(Note.objects.filter(user=self.user, title="Exported", category=category).count(), 2)
+
+    def test_markdown_zip(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("Recipes/pancakes.md", "# Pancakes\n\nFlour, eggs, milk.")
+            zf.writestr("todo.md", "Buy milk")
+            zf.writestr("Recipes/image.png", b"\x89PNG")
+            zf.writestr("empty.md", "# Only a title")
+        response = self.upload("notes.zip", archive.getvalue())
+        self.assertEqual((response.data["created"], response.data["skipped"]), (2, 1))
+
+        pancakes = Note.objects.get(user=self.user, title="Pancakes")
+        self.assertEqual((pancakes.body, pancakes.category.name), ("Flour, eggs, milk.", "Recipes"))
+        self.assertEqual(Note.objects.get(user=self.user, title="todo").category.name, "Imported")
+
+    def test_invalid_zip(self):
+        response = self.upload("notes.zip", b"not a zip")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batches_take_constant_queries(self):
+        """Each batch is a category lookup and the note inserts, however many notes it holds."""
+        records = [{"title": f"Note {i}", "body": "Body", "category": "Bulk"} for i in range(50)]
+        self.upload("warm.ndjson", self.ndjson(records[0]))  # warm the token cache
+        # category lookup + note insert + note counts, and the batch's savepoint and release
+        with self.assertNumQueries(5):
+            self.upload("notes.ndjson", self.ndjson(*records))
+
+    def test_command(self):
+        path = Path(self.enterContext(tempfile.TemporaryDirectory())) / "notes.ndjson"
+        path.write_bytes(self.ndjson(*({"title": f"Note {i}", "body": "Body"} for i in range(5))))
+        out = StringIO()
+        call_command("import_notes", "import@example.com", str(path), batch_size=2, stdout=out)
+        self.assertEqual(Note.objects.filter(user=self.user).count(), 5)
+        self.assertEqual(out.getvalue().count("Imported "), 4)  # three batches and the summary
+
+
+class ResponseEncodingTestCase(APITestCase):
+    """Tests for the fast JSON renderer/parser and response compression."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="encoding@example.com", email="encoding@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.category = Category.objects.create(name="Encoding", user=self.user)
+        for i in range(20):
+            Note.objects.create(
+                title=f"Note {i}", body="Lorem ipsum dolor sit amet. " * 10, category=self.category, user=self.user
+            )
+
+    def test_renderer_matches_drf(self):
+        data = {
+            "results": [{"id": 1, "title": "Caf\u00e9 \U0001f600", "tags": ["a", None, True]}],
+            "at": timezone.now(),
+            "price": Decimal("1.50"),
+            "label": gettext_lazy("Notes"),
+            1: "non-string key",
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_renderer_escapes_line_separators(self):
+        data = {"body": "one\u2028two\u2029three"}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertIn(b"\\u2028", FastJSONRenderer().render(data))
+
+    def test_renderer_rejects_non_finite_floats(self):
+        for value in (float("nan"), float("inf"), float("-inf")):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                FastJSONRenderer().render({"results": [{"score": value}]})
+
+    def test_parser(self):
+        response = self.client.post(
+            "/api/notes/",
+            json.dumps({"title": "Caf\u00e9", "body": "Body", "category_id": self.category.id}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["title"], "Caf\u00e9")
+
+        response = self.client.post("/api/notes/", "{not json", content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("JSON parse error", response.data["detail"])
+
+    def test_gzip(self):
+        response = self.client.get("/api/notes/", headers={"Accept-Encoding": "gzip, deflate"})
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))["results"]), 20)
+
+    def test_small_responses_are_not_compressed(self):
+        response = self.client.get("/api/categories/", headers={"Accept-Encoding": "gzip"})
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    @skipUnless(middleware.brotli, "brotli is not installed")
+    def test_brotli_preferred_when_available(self):
+        response = self.client.get("/api/notes/", headers={"Accept-Encoding": "gzip, br"})
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(len(json.loads(middleware.brotli.decompress(response.content))["results"]), 20)
+
+        response = self.client.get("/api/notes/", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+    @skipUnless(middleware.brotli, "brotli is not installed")
+    def test_brotli_is_padded(self):
+        """Like Django's gzip, brotli output has a random length, against BREACH."""
+        content = json.dumps({"results": ["note"] * 200}).encode()
+        compressed = [middleware.compress_brotli(content, 4, 100) for _ in range(10)]
+        self.assertEqual({middleware.brotli.decompress(data) for data in compressed}, {content})
+        self.assertGreater(len({len(data) for data in compressed}), 1)
+        compressed = [middleware.compress_brotli(content, 4, 256) for _ in range(50)]
+        self.assertEqual({middleware.brotli.decompress(data) for data in compressed}, {content})
+
+
+def throttle_rates(**rates):
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": rates})
+
+
+class ThrottlingTestCase(APITestCase):
+    """Tests for the per-user request rate limits."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="throttle@example.com", email="throttle@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.category = Category.objects.create(name="Throttle", user=self.user)
+
+    def create_note(self):
+        return self.client.post(
+            "/api/notes/", {"title": "Note", "body": "Body", "category_id": self.category.id}, format="json"
+        )
+
+    @throttle_rates(read="2/min", write="1/min", search="1/min")
+    def test_scopes_have_separate_budgets(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get("/api/notes/").status_code, status.HTTP_200_OK)
+        response = self.client.get("/api/notes/")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn(int(response["Retry-After"]), range(1, 31))
+
+        self.assertEqual(self.client.get("/api/notes/", {"search": "note"}).status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.client.get("/api/notes/", {"search": "note"}).status_code, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+
+        self.assertEqual(self.create_note().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.create_note().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(Note.objects.count(), 1)
+
+    @throttle_rates(read="1/min")
+    def test_budgets_are_per_user(self):
+        self.assertEqual(self.client.get("/api/categories/").status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get("/api/categories/").status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        other = User.objects.create_user(username="other@example.com", email="other@example.com", password="pw")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=other).key}")
+        self.assertEqual(self.client.get("/api/categories/").status_code, status.HTTP_200_OK)
+
+    @throttle_rates(read=None)
+    def test_scope_without_rate_is_not_limited(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get("/api/categories/").status_code, status.HTTP_200_OK)
+
+    def test_bucket_refills(self):
+        now = 1000.0
+        with mock.patch("core.throttling.time.monotonic", side_effect=lambda: now):
+            self.assertEqual(limiter.hit("read", 1, 2, 60), 0)
+            self.assertEqual(limiter.hit("read", 1, 2, 60), 0)
+            self.assertEqual(limiter.hit("read", 1, 2, 60), 30)
+            now += 15
+            self.assertEqual(limiter.hit("read", 1, 2, 60), 15)
+            now += 15
+            self.assertEqual(limiter.hit("read", 1, 2, 60), 0)
+            # Idle time refills the bucket up to its size only.
+            now += 600
+            self.assertEqual([limiter.hit("read", 1, 2, 60) for _ in range(3)], [0, 0, 30])
+
+    @override_settings(THROTTLING={"MAX_SIZE": 100, "SHARED_CACHE": "default"})
+    def test_shared_cache_limits_across_workers(self):
+        workers = [RateLimiter(), RateLimiter()]
+        self.assertEqual(workers[0].hit("write", 1, 2, 60), 0)
+        self.assertEqual(workers[1].hit("write", 1, 2, 60), 0)
+        self.assertGreater(workers[1].hit("write", 1, 2, 60), 0)
+        self.assertGreater(workers[0].hit("write", 1, 2, 60), 0)
+        self.assertEqual(workers[0].hit("write", 2, 2, 60), 0)
+
+    @throttle_rates(read="1/min")
+    async def test_async_views_are_throttled(self):
+        headers = {"Authorization": f"Token {self.token.key}"}
+        response = await AsyncClient().get("/api/async/notes/", headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = await AsyncClient().get("/api/async/categories/", headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn(int(response["Retry-After"]), range(1, 61))
+
+    @throttle_rates(read="1/min")
+    async def test_async_views_follow_the_throttle_classes_setting(self):
+        headers = {"Authorization": f"Token {self.token.key}"}
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_CLASSES": []}):
+            for _ in range(2):
+                response = await AsyncClient().get("/api/async/notes/", headers=headers)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(THROTTLING={"MAX_SIZE": 100, "SHARED_CACHE": "default"})
+    @throttle_rates(read="1/min")
+    async def test_async_views_with_shared_cache(self):
+        headers = {"Authorization": f"Token {self.token.key}"}
+        response = await AsyncClient().get("/api/async/notes/", headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Another worker: its own buckets are empty, the shared counter isn't.
+        limiter.clear()
+        response = await AsyncClient().get("/api/async/notes/", headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+def server_timing(response):
+    """``{name: (duration in ms, description)}`` from a ``Server-Timing`` header."""
+    timings = {}
+    for metric in response["Server-Timing"].split(","):
+        name, *params = metric.strip().split(";")
+        params = dict(param.split("=", 1) for param in params)
+        timings[name] = (float(params["dur"]), params.get("desc", "").strip('"'))
+    return timings
+
+
+class PerformanceInstrumentationTestCase(APITestCase):
+    """Tests for the request instrumentation middleware and /metrics/."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="metrics@example.com", email="metrics@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.category = Category.objects.create(name="Metrics", user=self.user)
+        for i in range(5):
+            Note.objects.create(title=f"Note {i}", body="Body", category=self.category, user=self.user)
+
+    def test_server_timing_counts_queries(self):
+        self.client.get("/api/categories/")  # warm the token cache
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/notes/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timings = server_timing(response)
+        self.assertEqual(timings["db"][1], f"{len(queries)} queries")
+        self.assertGreater(timings["serializer"][0], 0)
+        self.assertGreaterEqual(timings["total"][0], timings["db"][0] + timings["serializer"][0])
+
+    def test_metrics_are_recorded_per_view(self):
+        before = metrics.snapshot().get('http_request_duration_seconds{view="note-detail"}', {"count": 0})
+        note = Note.objects.first()
+        self.client.get(f"/api/notes/{note.id}/")
+        response = self.client.get(f"/api/notes/{note.id}/")
+
+        after = metrics.snapshot()
+        self.assertEqual(after['http_request_duration_seconds{view="note-detail"}']["count"], before["count"] + 2)
+        self.assertGreaterEqual(after['http_response_size_bytes{view="note-detail"}']["sum"], len(response.content))
+
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer secret")
+        with override_settings(PERFORMANCE={**settings.PERFORMANCE, "METRICS_TOKEN": "secret"}):
+            response = self.client.get("/metrics/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = response.content.decode()
+        self.assertIn("# TYPE http_request_queries histogram", body)
+        self.assertIn(f'http_request_duration_seconds_count{{view="note-detail"}} {before["count"] + 2}', body)
+        self.assertIn('http_request_queries_bucket{view="note-detail",le="+Inf"}', body)
+
+    def test_metrics_exposition(self):
+        counter = metrics.counter("test_escaped_total", "Labels are escaped", {"path": 'a"b\\c'})
+        counter.reset()
+        counter.inc(3)
+        self.assertIn('test_escaped_total{path="a\\"b\\\\c"} 3\n', metrics.exposition())
+
+    @override_settings(PERFORMANCE={**settings.PERFORMANCE, "METRICS_TOKEN": None})
+    def test_metrics_are_off_without_a_token(self):
+        self.assertEqual(self.client.get("/metrics/").status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(PERFORMANCE={**settings.PERFORMANCE, "METRICS_TOKEN": "secret"})
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get("/metrics/").status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer secret")
+        response = self.client.get("/metrics/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(PERFORMANCE={**settings.PERFORMANCE, "QUERY_BUDGET": 0})
+    def test_requests_over_budget_are_logged(self):
+        with self.assertLogs("core.middleware", "WARNING") as logs:
+            self.client.get("/api/notes/")
+        self.assertIn("Slow request GET /api/notes/ (note-list-create)", logs.output[0])
+
+        with self.assertNoLogs("core.middleware", "WARNING"):
+            self.client.get("/health/")
+
+    async def test_async_views_are_instrumented(self):
+        response = await AsyncClient().get("/api/async/notes/", headers={"Authorization": f"Token {self.token.key}"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(server_timing(response)["serializer"][0], 0)
+        self.assertIn('http_request_duration_seconds{view="async-note-list-create"}', metrics.snapshot())
+
+
+class NoteEventsTestCase(APITestCase):
+    """Tests for the push channel."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="events@example.com", email="events@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.category = Category.objects.create(name="Events", user=self.user)
+        self.published = self.enterContext(mock.patch.object(events.get_broker(), "publish"))
+
+    def events(self):
+        return [call.args for call in self.published.call_args_list]
+
+    def test_note_writes_publish_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            note = Note.objects.create(title="Note", body="Body", category=self.category, user=self.user)
+        self.assertEqual(self.events(), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.events(), [(self.user.id, {"type": "note.saved", "id": note.id, "version": 1})])
+
+        self.published.reset_mock()
+        note_id = note.id
+        with self.captureOnCommitCallbacks(execute=True):
+            Note.objects.filter(user=self.user).update(title="Renamed")
+            note.delete()
+        self.assertEqual(
+            self.events(),
+            [(self.user.id, {"type": "notes.changed"}), (self.user.id, {"type": "note.deleted", "id": note_id})],
+        )
+
+    def test_category_writes_publish(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            category = Category.objects.create(name="New", user=self.user)
+            category_id = category.id
+            category.delete()
+        self.assertEqual(
+            self.events(),
+            [
+                (self.user.id, {"type": "category.saved", "id": category_id}),
+                (self.user.id, {"type": "category.deleted", "id": category_id}),
+            ],
+        )
+
+    def test_rolled_back_writes_are_not_published(self):
+        # The callbacks are dropped, as on a rollback.
+        with self.captureOnCommitCallbacks():
+            Note.objects.create(title="Note", body="Body", category=self.category, user=self.user)
+            Note.objects.filter(user=self.user).delete()
+        self.assertEqual(self.events(), [])
+
+
+class NoteEventStreamTestCase(APITestCase):
+    """Tests for the server-sent events endpoint and the brokers."""
+
+    url = "/api/notes/events/"
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="stream@example.com", email="stream@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    async def ticket(self):
+        response = await AsyncClient().post(f"{self.url}ticket/", headers={"Authorization": f"Token {self.token.key}"})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.json()["ticket"]
+
+    async def test_stream(self):
+        response = await AsyncClient().get(self.url, {"ticket": await self.ticket()})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b'event: ready\ndata: {"type":"ready"}\n\n')
+
+        events.get_broker().publish(self.user.id, {"type": "note.saved", "id": 7, "version": 2})
+        events.get_broker().publish(self.user.id + 1, {"type": "note.saved", "id": 8, "version": 1})
+        chunk = await asyncio.wait_for(anext(chunks), 1)
+        self.assertEqual(chunk, b'event: note.saved\ndata: {"type":"note.saved","id":7,"version":2}\n\n')
+
+    @override_settings(NOTES_EVENTS={**settings.NOTES_EVENTS, "HEARTBEAT": 0.01})
+    async def test_heartbeat(self):
+        response = await AsyncClient().get(self.url, headers={"Authorization": f"Token {self.token.key}"})
+        chunks = aiter(response.streaming_content)
+        await anext(chunks)
+        self.assertEqual(await asyncio.wait_for(anext(chunks), 1), b": ping\n\n")
+
+    async def test_requires_authentication(self):
+        response = await AsyncClient().get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await AsyncClient().get(self.url, {"ticket": "invalid"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        # The API token isn't accepted in the query string.
+        response = await AsyncClient().get(self.url, {"token": self.token.key})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_tickets_are_single_use(self):
+        ticket = await self.ticket()
+        response = await AsyncClient().get(self.url, {"ticket": ticket})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = await AsyncClient().get(self.url, {"ticket": ticket})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_tickets_expire(self):
+        ticket = await self.ticket()
+        await EventStreamTicket.objects.filter(key=ticket).aupdate(created_at=timezone.now() - timedelta(minutes=1))
+        response = await AsyncClient().get(self.url, {"ticket": ticket})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        # Issuing a ticket removes expired ones.
+        await self.ticket()
+        self.assertFalse(await EventStreamTicket.objects.filter(key=ticket).aexists())
+
+    @override_settings(NOTES_EVENTS={**settings.NOTES_EVENTS, "QUEUE_SIZE": 2})
+    async def test_slow_stream_is_told_to_resync(self):
+        broker = events.InMemoryBroker()
+        subscription = broker.subscribe(self.user.id)
+        for i in range(3):
+            broker.publish(self.user.id, {"type": "note.saved", "id": i})
+        await asyncio.sleep(0)
+        self.assertEqual(await subscription.get(), {"type": "resync"})
+        subscription.close()
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    def start_relay(self):
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+        servers = []
+
+        def run():
+            with contextlib.suppress(asyncio.CancelledError):
+                loop.run_until_complete(
+                    events.run_relay("127.0.0.1", 0, lambda server: (servers.append(server), started.set()))
+                )
+            loop.close()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        started.wait(5)
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(loop.call_soon_threadsafe, servers[0].close)
+        return servers[0].sockets[0].getsockname()[1]
+
+    async def test_relay_broker(self):
+        port = self.start_relay()
+        with override_settings(NOTES_EVENTS={**settings.NOTES_EVENTS, "RELAY": f"127.0.0.1:{port}"}):
+            subscriber, publisher = events.RelayBroker(), events.RelayBroker()
+        self.addCleanup(subscriber.close)
+        self.addCleanup(publisher.close)
+
+        subscription = subscriber.subscribe(self.user.id)
+        # Wait for the subscriber's connection, so the relay knows where to forward to.
+        await asyncio.to_thread(subscriber._connected.wait, 5)
+        await asyncio.to_thread(publisher.publish, self.user.id, {"type": "notes.changed"})
+        self.assertEqual(await asyncio.wait_for(subscription.get(), 5), {"type": "notes.changed"})
+
+    @override_settings(NOTES_EVENTS={**settings.NOTES_EVENTS, "RELAY": "127.0.0.1:9", "SEND_QUEUE_SIZE": 2})
+    def test_relay_publish_does_not_block(self):
+        """Events are queued for the sender thread, and dropped once the queue is full."""
+        broker = events.RelayBroker()
+        self.addCleanup(broker.close)
+        with mock.patch.object(broker, "start"), self.assertLogs("notes.events", "WARNING") as logs:
+            for i in range(3):
+                broker.publish(self.user.id, {"type": "note.saved", "id": i})
+        self.assertEqual(broker._outbox.qsize(), 2)
+        self.assertIn("send queue full, dropped note.saved", logs.output[0])
+
+    def test_gunicorn_needs_a_shared_broker(self):
+        """Several workers only start with a broker that reaches all of them."""
+        hooks = runpy.run_path(str(settings.BASE_DIR / "gunicorn.conf.py"))
+        server = SimpleNamespace(cfg=SimpleNamespace(workers=4), log=mock.Mock())
+        with self.assertRaises(SystemExit):
+            hooks["on_starting"](server)
+        self.assertIn("only delivers push events within one worker", server.log.error.call_args.args[0])
+
+        server.cfg.workers = 1
+        hooks["on_starting"](server)
+        relay = {**settings.NOTES_EVENTS, "BACKEND": "notes.events.RelayBroker", "RELAY": "relay.internal:8766"}
+        with override_settings(NOTES_EVENTS=relay):
+            server.cfg.workers = 4
+            hooks["on_starting"](server)
+        # The relay runs on another host, so none is started here.
+        self.assertIsNone(hooks["on_starting"].__globals__["relay"])
+
+
+class SeedNotesTestCase(APITestCase):
+    """Tests for the seed_notes command."""
+
+    def test_seed_notes(self):
+        out = StringIO()
+        call_command("seed_notes", "250", users=4, categories=3, password="password123", stdout=out)
+        self.assertIn("Created 4 users and 250 notes", out.getvalue())
+
+        users = User.objects.filter(username__startswith="seed-")
+        self.assertEqual(users.count(), 4)
+        self.assertTrue(users.get(username="seed-1@example.com").check_password("password123"))
+        self.assertEqual(Category.objects.filter(user__in=users).count(), 12)
+        self.assertEqual(Note.objects.count(), 250)
+        # Note counts are recomputed, and every note is in one of its owner's categories.
+        self.assertEqual(sum(Category.objects.values_list("note_count", flat=True)), 250)
+        self.assertFalse(Note.objects.exclude(category__user=F("user")).exists())
+        self.assertFalse(Note.objects.filter(updated_at__lt=F("created_at")).exists())
+        self.assertFalse(Note.objects.filter(version=1).exclude(updated_at=F("created_at")).exists())
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=users.first()).key}")
+        response = self.client.get("/api/notes/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_same_seed_same_notes(self):
+        now = timezone.now()
+        seeder = Seeder(users=3, categories=2, notes=100, seed=7, owners=[(1, [1, 2]), (2, [3, 4]), (3, [5, 6])])
+        notes = list(seeder.generate(0, now))
+        self.assertEqual(len(notes), 100)
+        self.assertEqual(list(seeder.generate(0, now)), notes)
+        self.assertNotEqual(list(dataclasses.replace(seeder, seed=8).generate(0, now)), notes)
+
+    def test_existing_users_are_rejected(self):
+        call_command("seed_notes", "10", users=2, stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, "already exist"):
+            call_command("seed_notes", "10", users=2, start=2, stdout=StringIO())
+        self.assertEqual(Note.objects.count(), 10)
+
+
+class DefaultCategoriesTestCase(APITestCase):
+    """Tests for the categories created with every user."""
+
+    def test_created_in_one_query(self):
+        users = [User.objects.create_user(username=f"defaults{i}@example.com") for i in range(2)]
+        Category.objects.filter(user__in=users).delete()
+        with self.assertNumQueries(1):
+            Category.objects.create_defaults(users)
+        self.assertEqual(Category.objects.filter(user__in=users).count(), 6)
+
+        user = User.objects.create_user(username="signal@example.com")
+        self.assertEqual(
+            list(Category.objects.filter(user=user).order_by("id").values_list("name", "color")),
+            [("Random Thoughts", "#FFCCB6"), ("School", "#FDFD96"), ("Personal", "#B8E0D2")],
+        )
+
+    @override_settings(NOTES_DEFAULT_CATEGORIES=[{"name": "Inbox", "color": "#FFFFFF"}])
+    def test_configurable(self):
+        user = User.objects.create_user(username="configured@example.com")
+        self.assertEqual(list(Category.objects.filter(user=user).values_list("name", flat=True)), ["Inbox"])
+
+    def test_provision_users(self):
+        User.objects.create_user(username="user2@example.com")
+        path = Path(self.enterContext(tempfile.TemporaryDirectory())) / "tokens.csv"
+        out = StringIO()
+        call_command("provision_users", 5, password="secret-password", batch_size=2, tokens=str(path), stdout=out)
+
+        users = User.objects.filter(username__startswith="user").exclude(username="user2@example.com")
+        self.assertEqual(users.count(), 4)
+        self.assertIn("Created 4 users, skipped 1 existing.", out.getvalue())
+        self.assertTrue(users.get(username="user5@example.com").check_password("secret-password"))
+        self.assertEqual(Category.objects.filter(user__in=users).count(), 12)
+
+        rows = dict(csv.reader(path.open()))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(Token.objects.get(key=rows["user1@example.com"]).user.username, "user1@example.com")
+
+
+@override_settings(NOTES_CACHE={**settings.NOTES_CACHE, "ENABLED": True})
+class AsyncNoteViewsTestCase(APITestCase):
+    """Tests for the async note and category endpoints."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="async@example.com", email="async@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.headers = {"Authorization": f"Token {self.token.key}"}
+        self.category = Category.objects.create(name="Work", color="#FF0000", user=self.user)
+        self.notes = [
+            Note.objects.create(title=f"Note {i}", body="Body", category=self.category, user=self.user)
+            for i in range(3)
+        ]
+
+    async def test_list_matches_sync_view(self):
+        response = await AsyncClient().get("/api/async/notes/", headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sync_response = await AsyncClient().get("/api/notes/", headers=self.headers)
+        self.assertEqual(response.json(), sync_response.json())
+        self.assertEqual(response["ETag"], sync_response["ETag"])
+
+    async def test_list_not_modified(self):
+        response = await AsyncClient().get("/api/async/notes/", headers=self.headers)
+        response = await AsyncClient().get(
+            "/api/async/notes/", headers={**self.headers, "If-None-Match": response["ETag"]}
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+    async def test_list_filters_and_paginates(self):
+        response = await AsyncClient().get(
+            "/api/async/notes/", {"search": "Note 1", "page_size": 1}, headers=self.headers
+        )
+        self.assertEqual([note["title"] for note in response.json()["results"]], ["Note 1"])
+
+        response = await AsyncClient().get("/api/async/notes/", {"page_size": 2}, headers=self.headers)
+        response = await AsyncClient().get(response.json()["next"], headers=self.headers)
+        self.assertEqual([note["id"] for note in response.json()["results"]], [self.notes[0].id])
+
+    async def test_category_list(self):
+        response = await AsyncClient().get("/api/async/categories/", headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        counts = {category["name"]: category["note_count"] for category in response.json()}
+        self.assertEqual(counts["Work"], 3)
+
+    async def test_create_note(self):
+        response = await AsyncClient().post(
+            "/api/async/notes/",
+            {"title": "New", "body": "Body", "category_id": self.category.id},
+            content_type="application/json",
+            headers=self.headers,
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.json())
+        self.assertEqual(await Note.objects.filter(user=self.user).acount(), 4)
+        self.assertEqual((await Category.objects.aget(pk=self.category.pk)).note_count, 4)
+
+    async def test_detail(self):
+        note = self.notes[0]
+        response = await AsyncClient().get(f"/api/async/notes/{note.id}/", headers=self.headers)
+        self.assertEqual(response.json()["title"], "Note 0")
+        self.assertEqual(response["ETag"], f'"{note.version}"')
+
+        response = await AsyncClient().patch(
+            f"/api/async/notes/{note.id}/", {"title": "Renamed"}, content_type="application/json", headers=self.headers
+        )
+        self.assertEqual(response.json()["title"], "Renamed")
+        self.assertEqual(response["ETag"], f'"{note.version + 1}"')
+
+    async def test_autosave(self):
+        note = self.notes[0]
+        response = await AsyncClient().patch(
+            f"/api/async/notes/{note.id}/",
+            {"body": "Draft"},
+            content_type="application/json",
+            headers={**self.headers, "If-Match": f'"{note.version}"'},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["version"], note.version + 1)
+        self.assertEqual(response["ETag"], f'"{note.version + 1}"')
+
+        response = await AsyncClient().patch(
+            f"/api/async/notes/{note.id}/",
+            {"body": "Chained"},
+            content_type="application/json",
+            headers={**self.headers, "If-Match": response["ETag"]},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = await AsyncClient().patch(
+            f"/api/async/notes/{note.id}/",
+            {"body": "Stale"},
+            content_type="application/json",
+            headers={**self.headers, "If-Match": f'"{note.version}"'},
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+    async def test_delete(self):
+        note_id = self.notes[0].id
+        response = await AsyncClient().delete(f"/api/async/notes/{note_id}/", headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertTrue(await NoteTombstone.objects.filter(note_id=note_id).aexists())
+
+    async def test_other_users_note_not_found(self):
+        other = await User.objects.acreate_user(username="other@example.com", email="other@example.com")
+        category = await Category.objects.acreate(name="Other", user=other)
+        note = await Note.objects.acreate(title="Private", body="Body", category=category, user=other)
+        response = await AsyncClient().get(f"/api/async/notes/{note.id}/", headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_requires_authentication(self):
+        response = await AsyncClient().get("/api/async/notes/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response["WWW-Authenticate"], "Token")
+
+        response = await AsyncClient().get("/api/async/notes/", headers={"Authorization": "Token invalid"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_method_not_allowed(self):
+        response = await AsyncClient().put("/api/async/notes/", headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+@skipUnless(connection.vendor == "postgresql", "Full-text search requires PostgreSQL")
+class NoteFullTextSearchTestCase(APITestCase):
+    """Tests for the PostgreSQL full-text search backend."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="fts@example.com", email="fts@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        category = Category.objects.create(name="Search", color="#FFCC00", user=self.user)
+
+        self.in_body = Note.objects.create(
+            title="Weekly sync", body="Planning the roadmap", category=category, user=self.user
+        )
+        self.in_title = Note.objects.create(title="Roadmap", body="Q3 goals", category=category, user=self.user)
+        Note.objects.create(title="Groceries", body="Milk and eggs", category=category, user=self.user)
+
+    def _titles(self, response):
+        return [note["title"] for note in response.data["results"]]
+
+    def test_title_matches_rank_first(self):
+        """Matches in the title outrank matches in the body."""
+        response = self.client.get("/api/notes/?search=roadmap")
+        self.assertEqual(self._titles(response), ["Roadmap", "Weekly sync"])
+
+    def test_prefix_match(self):
+        """Partial words match as prefixes for search-as-you-type."""
+        response = self.client.get("/api/notes/?search=road")
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_stemming(self):
+        """Inflected forms match through stemming."""
+        response = self.client.get("/api/notes/?search=plans")
+        self.assertEqual(self._titles(response), ["Weekly sync"])
+
+    def test_all_terms_must_match(self):
+        """Multiple terms are combined with AND."""
+        response = self.client.get("/api/notes/?search=roadmap goals")
+        self.assertEqual(self._titles(response), ["Roadmap"])
+
+    def test_ranked_results_paginate(self):
+        """Ranked results can be paged through with cursors."""
+        response = self.client.get("/api/notes/?search=roadmap&page_size=1")
+        self.assertEqual(self._titles(response), ["Roadmap"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual(self._titles(response), ["Weekly sync"])
+        self.assertIsNone(response.data["next"])
+
+
+@skipUnless(connection.vendor == "postgresql", "Trigram search requires PostgreSQL")
+class NoteTrigramSearchTestCase(APITestCase):
+    """Tests for search_mode=trigram."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="trigram@example.com", email="trigram@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        category = Category.objects.create(name="Trigram", color="#FFCC00", user=self.user)
+
+        Note.objects.create(title="Kubernetes notes", body="kubectl get pods", category=category, user=self.user)
+        Note.objects.create(title="Deploy checklist", body="Run kubernetes rollout", category=category, user=self.user)
+        Note.objects.create(title="Groceries", body="Milk and eggs", category=category, user=self.user)
+
+    def _titles(self, response):
+        return [note["title"] for note in response.data["results"]]
+
+    def test_typo_matches(self):
+        """Misspelled words still match and better matches rank first."""
+        response = self.client.get("/api/notes/?search=kubernets&search_mode=trigram")
+        self.assertEqual(self._titles(response)[0], "Kubernetes notes")
+        self.assertNotIn("Groceries", self._titles(response))
+
+    def test_partial_word_matches(self):
+        """Fragments inside words match."""
+        response = self.client.get("/api/notes/?search=ubectl&search_mode=trigram")
+        self.assertEqual(self._titles(response), ["Kubernetes notes"])
+
+    def test_threshold(self):
+        """A strict threshold drops weaker matches."""
+        response = self.client.get("/api/notes/?search=kubernets&search_mode=trigram&threshold=0.95")
+        self.assertEqual(self._titles(response), [])
+
+    def test_invalid_threshold(self):
+        """Thresholds outside 0-1 are rejected."""
+        response = self.client.get("/api/notes/?search=kube&search_mode=trigram&threshold=3")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,9 +1,25 @@
 from django.urls import path
 
-from .views import CategoryListView, NoteDetailView, NoteListCreateView
+from .async_views import NoteEventStreamView
+from .views import (
+    CategoryListView,
+    NoteBulkView,
+    NoteDetailView,
+    NoteEventTicketView,
+    NoteExportView,
+    NoteImportView,
+    NoteListCreateView,
+    NoteSyncView,
+)
 
 urlpatterns = [
     path("categories/", CategoryListView.as_view(), name="category-list"),
     path("notes/", NoteListCreateView.as_view(), name="note-list-create"),
+    path("notes/bulk/", NoteBulkView.as_view(), name="note-bulk"),
+    path("notes/events/", NoteEventStreamView.as_view(), name="note-events"),
+    path("notes/events/ticket/", NoteEventTicketView.as_view(), name="note-events-ticket"),
+    path("notes/export/", NoteExportView.as_view(), name="note-export"),
+    path("notes/import/", NoteImportView.as_view(), name="note-import"),
+    path("notes/sync/", NoteSyncView.as_view(), name="note-sync"),
     path("notes/<int:pk>/", NoteDetailView.as_view(), name="note-detail"),
 ]
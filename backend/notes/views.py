@@ -1,17 +1,71 @@
-from django.db.models import Count
-from drf_spectacular.utils import OpenApiParameter, extend_schema
-from rest_framework import generics, permissions
+import re
+from datetime import timedelta
 
-from .filters import NoteFilter
-from .models import Category, Note
-from .serializers import CategorySerializer, NoteSerializer
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema, inline_serializer
+from rest_framework import generics, permissions, serializers, status
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+
+from .caching import ConditionalListMixin
+from .coalescing import FlushAutosavesMixin, StaleVersion
+from .coalescing import buffer as autosave_buffer
+from .export import FORMATS as EXPORT_FORMATS
+from .export import stream_export
+from .filters import NoteFilter, NoteSearchFilter
+from .importing import ImportFormatError, NoteImporter, detect_format
+from .importing import parse as parse_import
+from .models import Category, EventStreamTicket, Note, NoteTombstone
+from .pagination import KeysetPagination, decode_token, encode_token
+from .serializers import (
+    CategorySerializer,
+    NoteAutosaveSerializer,
+    NoteBulkSerializer,
+    NoteCardSerializer,
+    NoteImportSerializer,
+    NoteSerializer,
+)
+
+
+def note_etag(version):
+    return f'"{version}"'
+
+
+def parse_if_match(header):
+    match = re.fullmatch(r'\s*(?:W/)?"(\d+)"\s*', header)
+    if match is None:
+        raise ValidationError({"If-Match": 'Expected a note version, e.g. "3".'})
+    return int(match.group(1))
+
+
+def is_autosave(request):
+    """
+    Whether a request is an autosave: a PATCH with a note version in ``If-Match``.
+    ``If-Match: *`` matches any version of an existing note, so it is a plain update.
+    """
+    return request.method == "PATCH" and request.headers.get("If-Match", "*").strip() != "*"
+
+
+def is_card_list(request):
+    """Whether a note list asks for the card representation (``?fields=card``)."""
+    fields = request.query_params.get("fields")
+    if fields not in (None, "card"):
+        raise ValidationError({"fields": 'Must be "card".'})
+    return fields == "card"
 
 
 @extend_schema(
     summary="List & Create Categories",
     description="Retrieve a list of categories for the authenticated user, including note counts. POST to create a new category.",
 )
-class CategoryListView(generics.ListCreateAPIView):
+class CategoryListView(ConditionalListMixin, generics.ListCreateAPIView):
     """
     List and Create user categories.
     """
@@ -20,7 +74,7 @@ class CategoryListView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return super().get_queryset().filter(user=self.request.user).annotate(note_count=Count("notes"))
+        return super().get_queryset().filter(user=self.request.user)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -30,34 +84,94 @@ class CategoryListView(generics.ListCreateAPIView):
 
 @extend_schema(
     summary="List & Create Notes",
-    description="Retrieve a list of notes for the authenticated user. Supports filtering by category and text search.",
+    description=(
+        "Retrieve a cursor-paginated list of notes for the authenticated user, most recently updated first. "
+        "Supports filtering by category and text search."
+    ),
     parameters=[
         OpenApiParameter(name="category", description="Filter by Category Name", required=False, type=str),
-        OpenApiParameter(name="search", description="Search in title and body", required=False, type=str),
+        OpenApiParameter(
+            name="search",
+            description="Search in title and body. Results are ordered by relevance.",
+            required=False,
+            type=str,
+        ),
+        OpenApiParameter(
+            name="search_mode",
+            description=(
+                "`fulltext` (default) matches words and word prefixes; "
+                "`trigram` matches partial words and typos by similarity."
+            ),
+            required=False,
+            type=str,
+            enum=["fulltext", "trigram"],
+        ),
+        OpenApiParameter(
+            name="threshold",
+            description="Minimum similarity (0-1) for `search_mode=trigram`.",
+            required=False,
+            type=float,
+        ),
+        OpenApiParameter(
+            name="fields",
+            description=(
+                "`card` returns lightweight cards for the dashboard: the body is replaced by `snippet`, its "
+                "first characters, and `truncated` tells whether it was cut. Fetch the full note by id."
+            ),
+            required=False,
+            type=str,
+            enum=["card"],
+        ),
     ],
 )
-class NoteListCreateView(generics.ListCreateAPIView):
+class NoteListCreateView(FlushAutosavesMixin, ConditionalListMixin, generics.ListCreateAPIView):
     """
     List and Create Notes with search and filter support.
     """
 
     serializer_class = NoteSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, NoteSearchFilter]
     filterset_class = NoteFilter
+    pagination_class = KeysetPagination
     search_fields = ["title", "body"]
     queryset = Note.objects.all()
 
     def get_queryset(self):
-        return super().get_queryset().filter(user=self.request.user).order_by("-updated_at")
+        return (
+            super()
+            .get_queryset()
+            .filter(user=self.request.user)
+            .select_related("category")
+            .order_by("-updated_at", "-id")
+        )
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method == "GET" and is_card_list(self.request):
+            queryset = NoteCardSerializer.get_queryset(queryset)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.request.method == "GET" and is_card_list(self.request):
+            return NoteCardSerializer
+        return super().get_serializer_class()
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
 @extend_schema(summary="Retrieve, Update, Delete Note", description="Get, update, or delete a specific note by ID.")
-class NoteDetailView(generics.RetrieveUpdateDestroyAPIView):
+class NoteDetailView(FlushAutosavesMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, Update, and Destroy Notes.
+
+    A PATCH sent with an ``If-Match: "<version>"`` header is an autosave: only the sent
+    fields are written, normally in a single conditional UPDATE, and the write is
+    rejected with 412 if the note has changed since that version. ``If-Match: *`` makes
+    a plain update, which 404s for a missing note. With
+    ``NOTES_AUTOSAVE["COALESCE"]`` enabled, consecutive autosaves are merged in memory
+    (see ``notes.coalescing``).
     """
 
     serializer_class = NoteSerializer
@@ -65,4 +179,413 @@ class NoteDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Note.objects.all()
 
     def get_queryset(self):
-        return super().get_queryset().filter(user=self.request.user)
+        return super().get_queryset().filter(user=self.request.user).select_related("category")
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if isinstance(response.data, dict) and "version" in response.data:
+            response["ETag"] = note_etag(response.data["version"])
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    @extend_schema(
+        summary="Update or Autosave Note",
+        description=(
+            "Partially update a note. With an `If-Match` header carrying the note's version the request is "
+            "an autosave: only the sent fields are written and a lean `{id, version, updated_at}` body is "
+            "returned. Stale versions are rejected with 412."
+        ),
+        parameters=[
+            OpenApiParameter(
+                name="If-Match",
+                location=OpenApiParameter.HEADER,
+                description='Version of the note the edit is based on, e.g. "3"; `*` makes a plain update.',
+                required=False,
+                type=str,
+            )
+        ],
+        responses={
+            200: NoteSerializer,
+            412: OpenApiResponse(description="The note has changed since the given version"),
+        },
+    )
+    def patch(self, request, *args, **kwargs):
+        return super().patch(request, *args, **kwargs)
+
+    def is_autosave(self, request):
+        return is_autosave(request)
+
+    def partial_update(self, request, *args, **kwargs):
+        if not self.is_autosave(request):
+            return super().partial_update(request, *args, **kwargs)
+        return self.autosave(request, parse_if_match(request.headers["If-Match"]))
+
+    def autosave(self, request, version):
+        serializer = NoteAutosaveSerializer(data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        changes = dict(serializer.validated_data)
+        category_id = changes.pop("category_id", None)
+        pk = self.kwargs["pk"]
+
+        if autosave_buffer.enabled:
+            if category_id is None:
+                try:
+                    absorbed = autosave_buffer.absorb(pk, request.user.id, version, changes)
+                except StaleVersion as exc:
+                    return self.precondition_failed(exc.version)
+                if absorbed is not None:
+                    return self.autosave_response(pk, *absorbed)
+            else:
+                # The move is written below, behind the note's entry.
+                autosave_buffer.flush(user_id=request.user.id, forget=True)
+
+        # Common case: one UPDATE, with no category lookup while the category is unchanged.
+        notes = Note.objects.filter(pk=pk, user=request.user)
+        updated_at = timezone.now()
+        unchanged = notes.filter(version=version)
+        if category_id is not None:
+            unchanged = unchanged.filter(category_id=category_id)
+        if unchanged.update(**changes, version=version + 1, updated_at=updated_at):
+            if autosave_buffer.enabled:
+                autosave_buffer.track(pk, request.user.id, version + 1, updated_at)
+            return self.autosave_response(pk, version + 1, updated_at)
+
+        with transaction.atomic():
+            note = notes.select_for_update().first()
+            if note is None:
+                raise NotFound()
+            if note.version != version:
+                return self.precondition_failed(note.version)
+            update_fields = [*changes, "updated_at"]
+            for field, value in changes.items():
+                setattr(note, field, value)
+            if category_id is not None:
+                # The note moves to another category, so ownership has to be checked.
+                if not Category.objects.filter(pk=category_id, user=request.user).exists():
+                    raise ValidationError(
+                        {"category_id": "You cannot create a note in a category that does not belong to you."}
+                    )
+                note.category_id = category_id
+                update_fields.append("category")
+            note.save(update_fields=update_fields)
+        if autosave_buffer.enabled:
+            autosave_buffer.track(pk, request.user.id, note.version, note.updated_at)
+        return self.autosave_response(note.pk, note.version, note.updated_at)
+
+    def precondition_failed(self, version):
+        return Response(
+            {"detail": "The note has changed since this version.", "version": version},
+            status=status.HTTP_412_PRECONDITION_FAILED,
+        )
+
+    def autosave_response(self, pk, version, updated_at):
+        return Response(
+            {"id": pk, "version": version, "updated_at": serializers.DateTimeField().to_representation(updated_at)}
+        )
+
+
+@extend_schema(
+    summary="Issue an Event Stream Ticket",
+    description=(
+        "Return a ticket for opening `GET /api/notes/events/?ticket=...` with `EventSource`, which can't send the "
+        "`Authorization` header. A ticket opens one stream and expires after `expires_in` seconds."
+    ),
+    request=None,
+    responses={
+        201: inline_serializer(
+            name="NoteEventTicket",
+            fields={"ticket": serializers.CharField(), "expires_in": serializers.FloatField()},
+        )
+    },
+)
+class NoteEventTicketView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        ticket = EventStreamTicket.issue(request.user)
+        return Response(
+            {"ticket": ticket.key, "expires_in": settings.NOTES_EVENTS["TICKET_TTL"]}, status=status.HTTP_201_CREATED
+        )
+
+
+@extend_schema(
+    summary="Sync Notes",
+    description=(
+        "Return the notes created or updated since a sync token, the ids of notes deleted since then, and a new "
+        "token. Without `since` every note is returned. While `has_more` is true, call again with the new token "
+        "straight away. A token older than the tombstone retention gets 410; the client must then sync from scratch."
+    ),
+    parameters=[
+        OpenApiParameter(name="since", description="Token from the previous sync", required=False, type=str),
+        OpenApiParameter(name="page_size", description="Maximum number of notes returned", required=False, type=int),
+    ],
+    responses={
+        200: inline_serializer(
+            name="NoteSync",
+            fields={
+                "notes": NoteSerializer(many=True),
+                "deleted": serializers.ListField(child=serializers.IntegerField()),
+                "token": serializers.CharField(),
+                "has_more": serializers.BooleanField(),
+            },
+        ),
+        410: OpenApiResponse(description="The token is too old; sync from scratch"),
+    },
+)
+class NoteSyncView(FlushAutosavesMixin, generics.GenericAPIView):
+    """
+    Delta sync for clients that keep a local copy of their notes.
+
+    Changes are read in ``(updated_at, id)`` order through the same index as the list. A
+    token records how far the client has got in the notes (the last ``(updated_at, id)``
+    sent) and in the tombstones (the time of the sync). The tombstone time, and the note
+    key once a client has caught up, are moved back by ``NOTES_SYNC["OVERLAP"]``, so
+    changes that committed late are sent again rather than missed; clients apply notes
+    and deletions idempotently.
+    """
+
+    serializer_class = NoteSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    ordering = ("updated_at", "id")
+
+    def get(self, request, *args, **kwargs):
+        now = timezone.now()
+        since = self.decode_since(request.query_params.get("since"))
+        if since is not None and since[1] < now - timedelta(days=settings.NOTES_SYNC["TOMBSTONE_DAYS"]):
+            return Response({"detail": "This sync token has expired; sync from scratch."}, status=status.HTTP_410_GONE)
+
+        limit = KeysetPagination().get_page_size(request)
+        notes = Note.objects.filter(user=request.user).select_related("category").order_by(*self.ordering)
+        deleted = []
+        if since is not None:
+            key, deleted_after = since
+            notes = notes.filter(KeysetPagination.seek_filter(self.ordering, key))
+            deleted = list(
+                NoteTombstone.objects.filter(user=request.user, deleted_at__gt=deleted_after, deleted_at__lte=now)
+                .order_by("deleted_at")
+                .values_list("note_id", flat=True)
+            )
+
+        rows = list(notes[: limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        overlap = now - timedelta(seconds=settings.NOTES_SYNC["OVERLAP"])
+        key = [rows[-1].updated_at.isoformat(), rows[-1].id] if has_more else [overlap.isoformat(), 0]
+
+        return Response(
+            {
+                "notes": self.get_serializer(rows, many=True).data,
+                "deleted": deleted,
+                # Deletions are resent over the same overlap as notes.
+                "token": encode_token({"k": key, "d": overlap.isoformat()}),
+                "has_more": has_more,
+            }
+        )
+
+    def decode_since(self, token):
+        """Return ``(note key, deleted after)`` from a sync token, or ``None`` for a full sync."""
+        if not token:
+            return None
+        try:
+            payload = decode_token(token)
+            (updated_at, pk), deleted_after = payload["k"], parse_datetime(payload["d"])
+            if parse_datetime(updated_at) is None or deleted_after is None or not isinstance(pk, int):
+                raise ValueError
+        except (TypeError, ValueError, KeyError):
+            raise ValidationError({"since": "Invalid sync token."}) from None
+        return [updated_at, pk], deleted_after
+
+
+@extend_schema(
+    summary="Bulk Note Operations",
+    description=(
+        "Apply a batch of `create`, `update`, `move` and `delete` operations in one transaction. Either every "
+        "operation is applied, or none is and the response lists the errors of each operation."
+    ),
+    request=NoteBulkSerializer,
+    responses={
+        200: inline_serializer(
+            name="NoteBulkResults",
+            fields={
+                "results": inline_serializer(
+                    name="NoteBulkResult",
+                    fields={
+                        "op": serializers.CharField(),
+                        "id": serializers.IntegerField(),
+                        "version": serializers.IntegerField(required=False),
+                    },
+                    many=True,
+                )
+            },
+        ),
+        400: OpenApiResponse(description="Invalid operations; nothing was applied"),
+    },
+)
+class NoteBulkView(FlushAutosavesMixin, generics.GenericAPIView):
+    """
+    Apply many note operations in a fixed number of queries.
+
+    The categories and notes referenced by the whole batch are each looked up in one
+    query, then creates, updates and moves, and deletes are applied with ``bulk_create``,
+    ``bulk_update`` and a single ``delete()`` respectively, which also keep the note
+    counts, cache stamps and tombstones up to date.
+    """
+
+    serializer_class = NoteBulkSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data["operations"]
+
+        category_ids = {op["category_id"] for op in operations if "category_id" in op}
+        owned = set(Category.objects.filter(user=request.user, pk__in=category_ids).values_list("pk", flat=True))
+
+        with transaction.atomic():
+            note_ids = [op["id"] for op in operations if op["op"] != "create"]
+            notes = Note.objects.filter(user=request.user, pk__in=note_ids).select_for_update().in_bulk()
+            self.check_operations(operations, notes, owned)
+            return Response({"results": self.apply(operations, notes)})
+
+    def check_operations(self, operations, notes, owned):
+        errors = []
+        seen = set()
+        for op in operations:
+            error = {}
+            if "category_id" in op and op["category_id"] not in owned:
+                error["category_id"] = ["You cannot create a note in a category that does not belong to you."]
+            if op["op"] != "create":
+                if op["id"] not in notes:
+                    error["id"] = ["Note not found."]
+                elif op["id"] in seen:
+                    error["id"] = ["A note can only appear once per request."]
+                seen.add(op["id"])
+            errors.append(error)
+        if any(errors):
+            raise ValidationError({"operations": errors})
+
+    def apply(self, operations, notes):
+        now = timezone.now()
+        created, changed, deleted = [], {}, []
+        fields = {"updated_at"}
+        for op in operations:
+            if op["op"] == "create":
+                created.append(
+                    Note(title=op["title"], body=op["body"], category_id=op["category_id"], user=self.request.user)
+                )
+            elif op["op"] == "delete":
+                deleted.append(op["id"])
+            else:
+                note = changed[op["id"]] = notes[op["id"]]
+                for field in ("title", "body", "category_id"):
+                    if field in op:
+                        setattr(note, field, op[field])
+                        fields.add(field)
+                note.updated_at = now
+
+        created = iter(Note.objects.bulk_create(created))
+        if changed:
+            # bulk_update() bumps every version once, like a save.
+            Note.objects.bulk_update(changed.values(), sorted(fields))
+        if deleted:
+            Note.objects.filter(pk__in=deleted).delete()
+
+        results = []
+        for op in operations:
+            if op["op"] == "create":
+                note = next(created)
+                results.append({"op": "create", "id": note.pk, "version": note.version})
+            elif op["op"] == "delete":
+                results.append({"op": "delete", "id": op["id"]})
+            else:
+                results.append({"op": op["op"], "id": op["id"], "version": notes[op["id"]].version + 1})
+        return results
+
+
+@extend_schema(
+    summary="Export Notes",
+    description="Download every note of the authenticated user as NDJSON (one JSON object per line) or CSV.",
+    parameters=[
+        OpenApiParameter(
+            name="export_format",
+            description="Export format",
+            required=False,
+            type=str,
+            enum=list(EXPORT_FORMATS),
+        )
+    ],
+    responses={
+        (200, media_type): OpenApiResponse(response=OpenApiTypes.BINARY, description="The exported notes")
+        for media_type, _ in EXPORT_FORMATS.values()
+    },
+)
+class NoteExportView(FlushAutosavesMixin, generics.GenericAPIView):
+    """
+    Stream all of the user's notes.
+
+    The response is streamed as it is read from the database (see ``notes.export``), so
+    exports of any size use the same memory. ``export_format`` is used rather than
+    ``format``, which DRF reserves for content negotiation.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.query_params.get("export_format", "ndjson")
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({"export_format": f"Must be one of: {', '.join(EXPORT_FORMATS)}."})
+
+        content_type, extension = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            stream_export(request._request, request.user, export_format), content_type=content_type
+        )
+        response["Content-Disposition"] = f'attachment; filename="notes.{extension}"'
+        return response
+
+
+@extend_schema(
+    summary="Import Notes",
+    description=(
+        "Upload an NDJSON file (one `{title, body, category}` object per line, as exported) or a zip of "
+        "Markdown files. Missing categories are created. Invalid records are skipped and reported."
+    ),
+    request={"multipart/form-data": NoteImportSerializer},
+    responses={
+        201: inline_serializer(
+            name="NoteImportResult",
+            fields={
+                "created": serializers.IntegerField(),
+                "skipped": serializers.IntegerField(),
+                "errors": serializers.ListField(child=serializers.DictField()),
+            },
+        ),
+        400: OpenApiResponse(description="The file can't be read"),
+    },
+)
+class NoteImportView(FlushAutosavesMixin, generics.GenericAPIView):
+    """
+    Import notes from an uploaded archive.
+
+    The upload is read one record at a time and written in batches (see
+    ``notes.importing``); Django spools large uploads to disk, so memory use is bounded
+    by the batch size.
+    """
+
+    serializer_class = NoteImportSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data["file"]
+        import_format = serializer.validated_data.get("import_format") or detect_format(upload.name)
+
+        importer = NoteImporter(request.user, default_category=serializer.validated_data.get("default_category"))
+        try:
+            result = importer.run(parse_import(upload, import_format))
+        except ImportFormatError as exc:
+            raise ValidationError({"file": str(exc)}) from None
+        return Response(
+            {"created": result.created, "skipped": result.skipped, "errors": result.errors},
+            status=status.HTTP_201_CREATED,
+        )
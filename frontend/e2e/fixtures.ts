@@ -66,7 +66,7 @@ export const test = base.extend({
         await page.route('**/api/notes/**', async (route) => {
             const method = route.request().method();
             if (method === 'GET') {
-                await route.fulfill({ json: mockNotes });
+                await route.fulfill({ json: { next: null, previous: null, results: mockNotes } });
             } else if (method === 'POST') {
                 const body = route.request().postDataJSON();
                 await route.fulfill({
@@ -86,7 +86,7 @@ export const test = base.extend({
         });
 
         await page.route('**/api/notes/', async (route) => {
-            await route.fulfill({ json: mockNotes });
+            await route.fulfill({ json: { next: null, previous: null, results: mockNotes } });
         });
 
         await use(page);
@@ -87,7 +87,7 @@ export const handlers = [
             );
         }
 
-        return HttpResponse.json(filteredNotes);
+        return HttpResponse.json({ next: null, previous: null, results: filteredNotes });
     }),
 
     http.post(`${API_URL}/notes/`, async ({ request }) => {
@@ -2,7 +2,7 @@
 
 import { useState, useMemo } from "react";
 import Image from "next/image";
-import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
+import { useQuery, useInfiniteQuery, useMutation, useQueryClient } from "@tanstack/react-query";
 import { getCategories } from "@/services/api/categories";
 import { getNotes, deleteNote, NotesFilter } from "@/services/api/notes";
 import { logout } from "@/services/api/auth";
@@ -57,11 +57,25 @@ export default function DashboardPage() {
         queryFn: getCategories,
     });
 
-    const { data: notes, isLoading: loadingNotes } = useQuery({
+    // Notes come a page at a time; "Load more" follows the cursor of the last page
+    const {
+        data: notePages,
+        isLoading: loadingNotes,
+        hasNextPage,
+        fetchNextPage,
+        isFetchingNextPage,
+    } = useInfiniteQuery({
         queryKey: ["notes", filters],
-        queryFn: () => getNotes(filters),
+        queryFn: ({ pageParam }) => getNotes(filters, pageParam),
+        initialPageParam: null as string | null,
+        getNextPageParam: (lastPage) => lastPage.next,
     });
 
+    const notes = useMemo(
+        () => notePages?.pages.flatMap((page) => page.results),
+        [notePages],
+    );
+
     // Mutations
     const deleteNoteMutation = useMutation({
         mutationFn: deleteNote,
@@ -209,6 +223,16 @@ export default function DashboardPage() {
                         )}
                     </div>
                 )}
+
+                {hasNextPage && (
+                    <button
+                        className={styles.loadMoreBtn}
+                        onClick={() => fetchNextPage()}
+                        disabled={isFetchingNextPage}
+                    >
+                        {isFetchingNextPage ? "Loading..." : "Load more"}
+                    </button>
+                )}
             </main>
 
             {/* Modals */}
@@ -1,5 +1,5 @@
 import { client } from './client';
-import { Note } from '@/types';
+import { CursorPage, Note } from '@/types';
 
 /**
  * Parameters for filtering notes
@@ -7,19 +7,29 @@ import { Note } from '@/types';
 export interface NotesFilter {
     category?: string;
     search?: string;
+    /** ISO 8601 date or datetime; notes updated at or after it */
     dateFrom?: string;
+    /** ISO 8601 date or datetime; notes updated before it (exclusive) */
     dateTo?: string;
 }
 
 /**
- * List notes with optional filters
+ * List one page of notes with optional filters
  *
  * @param filters - Optional filters for category, search, and date range
- * @returns Array of filtered notes
+ * @param next - The `next` URL of the previous page, or nothing for the first page
+ * @returns A page of filtered notes, most recently updated first
  */
-export const getNotes = async (filters?: NotesFilter): Promise<Note[]> => {
+export const getNotes = async (filters?: NotesFilter, next?: string | null): Promise<CursorPage<Note>> => {
     const params: Record<string, string> = {};
 
+    // Only the cursor is taken from `next`: the API builds it from the host and scheme it
+    // was reached at, which behind a proxy need not be the client's base URL.
+    const cursor = next ? new URL(next).searchParams.get('cursor') : null;
+    if (cursor) {
+        params.cursor = cursor;
+    }
+
     if (filters?.category && filters.category !== 'All Categories') {
         params.category = filters.category;
     }
@@ -27,13 +37,13 @@ export const getNotes = async (filters?: NotesFilter): Promise<Note[]> => {
         params.search = filters.search;
     }
     if (filters?.dateFrom) {
-        params.date_from = filters.dateFrom;
+        params.updated_after = filters.dateFrom;
     }
     if (filters?.dateTo) {
-        params.date_to = filters.dateTo;
+        params.updated_before = filters.dateTo;
     }
 
-    const response = await client.get<Note[]>('/notes/', { params });
+    const response = await client.get<CursorPage<Note>>('/notes/', { params });
     return response.data;
 };
 
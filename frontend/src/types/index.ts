@@ -25,10 +25,20 @@ export interface Note {
     title: string;
     body: string;
     category: Category;
+    version: number;
     created_at: string;
     updated_at: string;
 }
 
+/**
+ * Cursor-paginated list response
+ */
+export interface CursorPage<T> {
+    next: string | null;
+    previous: string | null;
+    results: T[];
+}
+
 /**
  * Login response (token only)
  */